@@ -0,0 +1,32 @@
+-- ============================================================================
+-- MIGRATION 001 - listings.updated_at = dernier changement de contenu
+-- ============================================================================
+-- Avant: trigger_listings_updated remettait updated_at à NOW() à chaque
+-- UPDATE, y compris un simple passage de scrape (last_seen_at seul).
+-- Après: updated_at ne bouge que si une autre colonne que last_seen_at /
+-- updated_at change (contenu, prix, statut...), pour tous les auteurs
+-- d'UPDATE (listing_loader, n8n, corrections manuelles).
+--
+-- Idempotente, à appliquer sur une base créée avant ce changement:
+--     psql "$VPS_PG_URL" -f shared/migrations/001_listings_updated_at.sql
+-- ============================================================================
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION update_listing_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF to_jsonb(NEW) - 'last_seen_at' - 'updated_at'
+        IS DISTINCT FROM to_jsonb(OLD) - 'last_seen_at' - 'updated_at' THEN
+        NEW.updated_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_listings_updated ON listings;
+CREATE TRIGGER trigger_listings_updated
+    BEFORE UPDATE ON listings
+    FOR EACH ROW EXECUTE FUNCTION update_listing_updated_at();
+
+COMMIT;
@@ -10,14 +10,20 @@ Pipeline hybride:
 Auteur: Léon 🏝️
 """
 
+import asyncio
 import json
 import hashlib
+import heapq
 import re
+import time
+from collections import Counter
 from decimal import Decimal
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterable, AsyncIterator, ClassVar, Iterable, Set, Tuple, Union
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator, model_validator
-from dataclasses import dataclass
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+from dataclasses import asdict, dataclass, field
+
+from alias_matcher import AliasMatcher
 
 # Import PydanticAI (avec fallback si non installé)
 try:
@@ -32,6 +38,23 @@ except ImportError:
 # SCHÉMAS PYDANTIC - Validation stricte
 # ============================================================================
 
+# Motifs compilés une fois (validateurs et règles)
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NUMBER_PATTERN = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def normalize_project_name(name: str) -> str:
+    """Lowercase, sans ponctuation, espaces normalisés"""
+    normalized = PUNCTUATION_PATTERN.sub(' ', name.lower())
+    return WHITESPACE_PATTERN.sub(' ', normalized).strip()
+
+
+def _external_id(raw_data: Dict[str, Any]) -> str:
+    """ID de l'annonce dans sa source (champ id ou listing_id), '' si absent"""
+    return str(raw_data.get('id') or raw_data.get('listing_id') or '')
+
+
 class ThaiAddress(BaseModel):
     """Adresse thaïlandaise normalisée avec validation"""
     raw: str = Field(description="Adresse brute originale")
@@ -42,22 +65,23 @@ class ThaiAddress(BaseModel):
     microzone: Optional[str] = Field(default=None, description="Micro-zone (Soi, etc.)")
     postal_code: Optional[str] = Field(default=None, pattern=r"^\d{5}$")
 
+    PROVINCE_ALIASES: ClassVar[Dict[str, str]] = {
+        'bkk': 'Bangkok',
+        'กรุงเทพ': 'Bangkok',
+        'กรุงเทพมหานคร': 'Bangkok',
+        'phuket': 'Phuket',
+        'ภูเก็ต': 'Phuket',
+        'samui': 'Surat Thani',
+        'koh samui': 'Surat Thani',
+    }
+
     @field_validator('province', mode='before')
     @classmethod
     def normalize_province(cls, v):
         """Normalise les noms de provinces"""
         if not v:
             return "Bangkok"
-        aliases = {
-            'bkk': 'Bangkok',
-            'กรุงเทพ': 'Bangkok',
-            'กรุงเทพมหานคร': 'Bangkok',
-            'phuket': 'Phuket',
-            'ภูเก็ต': 'Phuket',
-            'samui': 'Surat Thani',
-            'koh samui': 'Surat Thani',
-        }
-        return aliases.get(v.lower(), v)
+        return cls.PROVINCE_ALIASES.get(v.lower(), v)
 
 
 class PropertySpecs(BaseModel):
@@ -71,20 +95,21 @@ class PropertySpecs(BaseModel):
     orientation: Optional[str] = Field(default=None)
     view_types: List[str] = Field(default_factory=list)
 
+    TYPE_ALIASES: ClassVar[Dict[str, str]] = {
+        'condominium': 'condo',
+        'apartment': 'condo',
+        'house': 'villa',
+        'home': 'villa',
+        'townhome': 'townhouse',
+    }
+
     @field_validator('property_type', mode='before')
     @classmethod
     def normalize_type(cls, v):
         """Normalise le type de bien"""
         if not v:
             return "condo"
-        aliases = {
-            'condominium': 'condo',
-            'apartment': 'condo',
-            'house': 'villa',
-            'home': 'villa',
-            'townhome': 'townhouse',
-        }
-        return aliases.get(v.lower(), v.lower())
+        return cls.TYPE_ALIASES.get(v.lower(), v.lower())
 
     @model_validator(mode='after')
     def compute_land_area(self):
@@ -122,9 +147,19 @@ class Project(BaseModel):
         name = info.data.get('name', v or '')
         if not name:
             return ""
-        # Lowercase, remove punctuation, normalize spaces
-        normalized = re.sub(r'[^\w\s]', ' ', name.lower())
-        return re.sub(r'\s+', ' ', normalized).strip()
+        return normalize_project_name(name)
+
+
+def canonical_hash(project: Project, specs: PropertySpecs) -> str:
+    """Hash de matching (projet normalisé, chambres, surface, étage)"""
+    components = [
+        project.name_normalized,
+        str(specs.bedrooms or ''),
+        str(specs.floor_area_sqm or ''),
+        str(specs.floor_number or ''),
+    ]
+    data = '|'.join(components).lower()
+    return hashlib.md5(data.encode()).hexdigest()
 
 
 class CanonicalProperty(BaseModel):
@@ -135,14 +170,7 @@ class CanonicalProperty(BaseModel):
 
     def compute_hash(self) -> str:
         """Génère hash pour matching"""
-        components = [
-            self.project.name_normalized,
-            str(self.specs.bedrooms or ''),
-            str(self.specs.floor_area_sqm or ''),
-            str(self.specs.floor_number or ''),
-        ]
-        data = '|'.join(components).lower()
-        return hashlib.md5(data.encode()).hexdigest()
+        return canonical_hash(self.project, self.specs)
 
     @model_validator(mode='after')
     def set_hash(self):
@@ -190,9 +218,8 @@ class PropertyListing(BaseModel):
     @model_validator(mode='after')
     def compute_hash_and_price(self):
         """Calcule hash et prix/m²"""
-        # Hash
-        canonical = CanonicalProperty(project=self.project, specs=self.specs)
-        self.canonical_hash = canonical.canonical_hash
+        # Hash (même calcul que CanonicalProperty, sans modèle intermédiaire)
+        self.canonical_hash = canonical_hash(self.project, self.specs)
 
         # Prix/m²
         if self.specs.floor_area_sqm and self.price.thb:
@@ -205,6 +232,9 @@ class PropertyListing(BaseModel):
 # AGENT PYDANTIC AI - Pour cas complexes
 # ============================================================================
 
+# Modèle de l'agent (fait partie de la clé du cache LLM)
+NORMALIZER_MODEL = 'ollama:llama3.3'
+
 # Prompt système pour l'agent
 NORMALIZATION_INSTRUCTIONS = """
 Tu es un expert en normalisation de données immobilières thaïlandaises.
@@ -239,13 +269,32 @@ Retourne TOUJOURS un PropertyListing valide.
 """
 
 
-def create_normalizer_agent():
-    """Crée l'agent PydanticAI si disponible"""
+# Mode lots: une liste d'annonces en entrée, une liste de résultats en
+# sortie. Sortie non typée côté agent pour valider chaque élément à part
+# (un élément invalide ne fait pas échouer le lot): le schéma est donc
+# donné dans le prompt.
+BATCH_INSTRUCTIONS = NORMALIZATION_INSTRUCTIONS + f"""
+Mode lots: tu reçois une liste JSON d'annonces.
+Retourne une liste: un objet PropertyListing par annonce, avec pour
+external_id le champ id (ou listing_id) de l'annonce, selon ce schéma JSON:
+{json.dumps(PropertyListing.model_json_schema(), ensure_ascii=False)}
+"""
+
+
+def create_normalizer_agent(model: str = NORMALIZER_MODEL, batch: bool = False):
+    """Crée l'agent PydanticAI si disponible (batch: une liste d'annonces par appel)"""
     if not PYDANTIC_AI_AVAILABLE:
         return None
 
+    if batch:
+        return Agent(
+            model,
+            output_type=List[Dict[str, Any]],
+            instructions=BATCH_INSTRUCTIONS,
+        )
+
     agent = Agent(
-        'ollama:llama3.3',
+        model,
         output_type=PropertyListing,
         instructions=NORMALIZATION_INSTRUCTIONS,
     )
@@ -257,15 +306,113 @@ def create_normalizer_agent():
 # PIPELINE HYBRIDE
 # ============================================================================
 
+# normalize_many: appels LLM simultanés (Ollama CPU: peu) et listings en vol
+DEFAULT_LLM_CONCURRENCY = 2
+DEFAULT_MAX_PENDING = 64
+# Attente max d'un lot LLM incomplet (secondes)
+DEFAULT_LLM_BATCH_WAIT = 1.0
+# Confiance des règles sous laquelle un enregistrement passe au LLM
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+TITLE_BEDROOMS_PATTERN = re.compile(r'(\d+)\s*(?:bed|br\b)', re.I)
+AREA_UNIT_PATTERN = re.compile(r'\d+\s*(?:sqm|sq\.?\s?m|m²|m2|ตร\.?\s?ม)', re.I)
+
+
+@dataclass
+class Triage:
+    """Confiance du chemin règles pour un enregistrement"""
+    confidence: float                                   # 0 (à refaire) .. 1 (sûr)
+    reasons: List[str] = field(default_factory=list)    # Signaux pénalisants
+    value: float = 1.0                                  # Poids du listing (prix)
+
+    @property
+    def priority(self) -> float:
+        """Intérêt d'un appel LLM: faible confiance, valeur élevée"""
+        return (1.0 - self.confidence) * self.value
+
+
+@dataclass
+class TriageReport:
+    """Bilan d'un run normalize_many: dépense du budget LLM"""
+    budget: Optional[int] = None
+    processed: int = 0
+    rules_only: int = 0          # Confiance suffisante (ou pas d'agent)
+    rejected: int = 0            # Sans listing en sortie
+    llm_candidates: int = 0      # Confiance sous le seuil
+    cache_hits: int = 0
+    llm_sent: int = 0
+    llm_succeeded: int = 0
+    llm_failed: int = 0          # Sortie règles rendue
+    over_budget: int = 0         # Candidats non envoyés: sortie règles rendue
+    sent_reasons: Dict[str, int] = field(default_factory=dict)
+    skipped_reasons: Dict[str, int] = field(default_factory=dict)
+    sent_confidence: float = 0.0       # Somme (moyenne: to_dict)
+    skipped_confidence: float = 0.0
+
+    def record_sent(self, triage: Triage):
+        self.llm_sent += 1
+        self.sent_confidence += triage.confidence
+        for reason in triage.reasons:
+            self.sent_reasons[reason] = self.sent_reasons.get(reason, 0) + 1
+
+    def record_skipped(self, triage: Triage):
+        self.over_budget += 1
+        self.skipped_confidence += triage.confidence
+        for reason in triage.reasons:
+            self.skipped_reasons[reason] = self.skipped_reasons.get(reason, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['sent_confidence'] = round(self.sent_confidence / self.llm_sent, 4) if self.llm_sent else None
+        data['skipped_confidence'] = round(self.skipped_confidence / self.over_budget, 4) if self.over_budget else None
+        data['budget_used'] = round(self.llm_sent / self.budget, 4) if self.budget else None
+        return data
+
+
+async def _aiter(records: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """Itère indifféremment un itérable synchrone ou asynchrone"""
+    if hasattr(records, '__aiter__'):
+        async for record in records:
+            yield record
+    else:
+        for record in records:
+            yield record
+
 class HybridNormalizer:
     """
     Normaliseur hybride:
     - Règles rapides pour cas simples (90%)
     - PydanticAI pour cas ambigus (10%)
+
+    normalize_many traite un flux: règles au fil de l'eau, appels LLM en
+    parallèle borné (async for index, listing in normalizer.normalize_many(...)).
     """
 
-    def __init__(self):
+    # Pénalités de confiance par signal (triage)
+    TRIAGE_PENALTIES = {
+        'currency_unclear': 0.1,
+        'project_missing': 0.3,
+        'zone_missing': 0.1,
+        'bedrooms_missing': 0.15,
+        'bedrooms_conflict': 0.25,
+        'area_missing': 0.2,
+        'area_unit_missing': 0.1,
+        'price_out_of_range': 0.5,
+        'price_per_sqm_out_of_range': 0.3,
+    }
+    CURRENCY_MARKERS = ('THB', 'USD', 'EUR', '$', '฿', 'บาท')
+    PRICE_RANGE_THB = (Decimal('100000'), Decimal('2000000000'))
+    PRICE_PER_SQM_RANGE_THB = (Decimal('10000'), Decimal('1000000'))
+    # Prix à partir duquel un listing compte double dans la priorité LLM
+    VALUE_SCALE_THB = Decimal('50000000')
+
+    def __init__(self, llm_cache=None, min_confidence: float = DEFAULT_MIN_CONFIDENCE):
         self.agent = create_normalizer_agent()
+        self.batch_agent = create_normalizer_agent(batch=True)
+        # Cache des résultats LLM (LLMResultCache de llm_cache, optionnel)
+        self.llm_cache = llm_cache
+        # Sous ce seuil de confiance, un enregistrement passe au LLM
+        self.min_confidence = min_confidence
         self._init_rules()
 
     def _init_rules(self):
@@ -288,6 +435,20 @@ class HybridNormalizer:
             'siam': {'default': 'Pathum Wan'},
         }
 
+        # Provinces hors Bangkok (défaut)
+        self.province_aliases = {
+            'phuket': 'Phuket',
+            'samui': 'Surat Thani',
+        }
+
+        # Matchers compilés une fois (priorité = ordre des dicts)
+        self.province_matcher = AliasMatcher(self.province_aliases)
+        self.zone_matcher = AliasMatcher({zone_name: zone_name for zone_name in self.zone_district_map})
+        self.soi_patterns = {
+            zone_name: re.compile(rf'{re.escape(zone_name)}\s*(?:soi)?\s*(\d+)')
+            for zone_name in self.zone_district_map
+        }
+
         # Conversion devises
         self.currency_rates = {
             'THB': Decimal('1'),
@@ -306,36 +467,32 @@ class HybridNormalizer:
         addr_lower = raw.lower()
 
         # Détecter province
-        province = "Bangkok"
-        for alias, prov in [('phuket', 'Phuket'), ('samui', 'Surat Thani')]:
-            if alias in addr_lower:
-                province = prov
-                break
+        province = self.province_matcher.first(addr_lower, "Bangkok")
 
         # Détecter zone et district
         zone = None
         district = None
 
-        for zone_name, mapping in self.zone_district_map.items():
-            if zone_name in addr_lower:
-                zone = zone_name.capitalize()
-
-                # Chercher soi number pour Bangkok
-                soi_match = re.search(rf'{zone_name}\s*(?:soi)?\s*(\d+)', addr_lower)
-                if soi_match and 'soi_range' in mapping:
-                    soi_num = int(soi_match.group(1))
-                    for (low, high), dist in mapping['soi_range'].items():
-                        if low <= soi_num <= high:
-                            district = dist
-                            zone = f"{zone_name} {soi_num}"
-                            break
-                else:
-                    district = mapping['default']
-                break
+        zone_name = self.zone_matcher.first(addr_lower)
+        if zone_name is not None:
+            mapping = self.zone_district_map[zone_name]
+            zone = zone_name.capitalize()
+
+            # Chercher soi number pour Bangkok
+            soi_match = self.soi_patterns[zone_name].search(addr_lower)
+            if soi_match and 'soi_range' in mapping:
+                soi_num = int(soi_match.group(1))
+                for (low, high), dist in mapping['soi_range'].items():
+                    if low <= soi_num <= high:
+                        district = dist
+                        zone = f"{zone_name} {soi_num}"
+                        break
+            else:
+                district = mapping['default']
 
         return ThaiAddress(
             raw=raw,
-            normalized=re.sub(r'\s+', ' ', addr_lower).strip(),
+            normalized=WHITESPACE_PATTERN.sub(' ', addr_lower).strip(),
             province=province,
             district=district,
             zone=zone,
@@ -350,11 +507,11 @@ class HybridNormalizer:
         clean = price_str.replace(',', '').replace(' ', '')
 
         # Extraire nombre
-        numbers = re.findall(r'\d+(?:\.\d+)?', clean)
-        if not numbers:
+        match = NUMBER_PATTERN.search(clean)
+        if not match:
             return None
 
-        value = Decimal(numbers[0])
+        value = Decimal(match.group(1))
 
         # Convertir en THB
         rate = self.currency_rates.get(currency.upper(), Decimal('1'))
@@ -373,14 +530,14 @@ class HybridNormalizer:
         if 'studio' in bed_str.lower():
             bedrooms = Decimal('0')
         else:
-            bed_match = re.search(r'(\d+(?:\.\d+)?)', bed_str)
+            bed_match = NUMBER_PATTERN.search(bed_str)
             if bed_match:
                 bedrooms = Decimal(bed_match.group(1))
 
         # Surface
         area = None
         area_str = str(data.get('size', ''))
-        area_match = re.search(r'(\d+(?:\.\d+)?)', area_str)
+        area_match = NUMBER_PATTERN.search(area_str)
         if area_match:
             area = Decimal(area_match.group(1))
 
@@ -390,35 +547,270 @@ class HybridNormalizer:
             floor_area_sqm=area,
         )
 
+    def triage(self, raw_data: Dict[str, Any], listing: Optional[PropertyListing]) -> Triage:
+        """
+        Confiance dans la sortie règles d'un enregistrement
+
+        Part de 1 et retire une pénalité par signal (TRIAGE_PENALTIES):
+        champs manquants, désaccord titre / champs, prix hors plage.
+        """
+        if listing is None:
+            return Triage(0.0, ['price_missing'])
+
+        reasons = []
+        price_text = str(raw_data.get('price', '')).upper()
+        if not any(marker in price_text for marker in self.CURRENCY_MARKERS):
+            reasons.append('currency_unclear')
+
+        if listing.project.name == 'Unknown':
+            reasons.append('project_missing')
+        if listing.address.zone is None:
+            reasons.append('zone_missing')
+
+        specs = listing.specs
+        if specs.bedrooms is None:
+            reasons.append('bedrooms_missing')
+        else:
+            title_match = TITLE_BEDROOMS_PATTERN.search(listing.title)
+            if title_match and Decimal(title_match.group(1)) != specs.bedrooms:
+                reasons.append('bedrooms_conflict')
+
+        if specs.floor_area_sqm is None:
+            reasons.append('area_missing')
+        elif 'size' in raw_data and not AREA_UNIT_PATTERN.search(str(raw_data['size'])):
+            reasons.append('area_unit_missing')
+
+        price = listing.price
+        low, high = self.PRICE_RANGE_THB
+        if not low <= price.thb <= high:
+            reasons.append('price_out_of_range')
+        elif price.per_sqm is not None:
+            low, high = self.PRICE_PER_SQM_RANGE_THB
+            if not low <= price.per_sqm <= high:
+                reasons.append('price_per_sqm_out_of_range')
+
+        confidence = max(0.0, 1.0 - sum(self.TRIAGE_PENALTIES[reason] for reason in reasons))
+        value = 1.0 + min(1.0, float(price.thb / self.VALUE_SCALE_THB))
+        return Triage(round(confidence, 4), reasons, value)
+
     def is_ambiguous(self, raw_data: Dict[str, Any]) -> bool:
-        """Détecte si les données sont ambigües et nécessitent LLM"""
-        ambiguous_patterns = [
-            # Prix sans devise claire
-            lambda d: 'price' in d and not any(c in str(d['price']).upper() for c in ['THB', 'USD', 'EUR', '$', '฿']),
-            # Titre sans projet clair
-            lambda d: 'title' in d and ' at ' not in d.get('title', '').lower(),
-            # Surface ambiguë
-            lambda d: 'size' in d and not re.search(r'\d+\s*(?:sqm|m²|m2)', str(d['size']), re.I),
-        ]
-
-        return any(pattern(raw_data) for pattern in ambiguous_patterns)
+        """Confiance des règles sous le seuil (min_confidence): cas pour le LLM"""
+        _, triage = self._normalize_rules(raw_data, raw_data.get('source') or 'unknown')
+        return triage is not None and triage.confidence < self.min_confidence
 
     async def normalize(self, raw_data: Dict[str, Any], source: str) -> Optional[PropertyListing]:
         """
         Normalise un listing avec stratégie hybride:
         1. Essayer règles rapides
-        2. Si ambigu, utiliser PydanticAI
+        2. Si confiance insuffisante, utiliser PydanticAI (sortie règles
+           conservée si le LLM échoue)
+        """
+        listing, triage = self._normalize_rules(raw_data, source, with_triage=bool(self.agent))
+        if triage is not None and triage.confidence < self.min_confidence:
+            return await self._normalize_with_llm(raw_data, source) or listing
+        return listing
+
+    async def normalize_many(
+        self,
+        records: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        source: str,
+        llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        ordered: bool = False,
+        llm_batch_size: int = 1,
+        llm_batch_wait: float = DEFAULT_LLM_BATCH_WAIT,
+        llm_budget: Optional[int] = None,
+        report: Optional[TriageReport] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[PropertyListing]]]:
+        """
+        Normalise un flux de listings (itérateur asynchrone de (index, listing))
+
+        Les règles tournent au fil de l'eau; les enregistrements dont la
+        confiance (triage) est sous min_confidence partent dans une voie LLM
+        séparée, au plus `llm_concurrency` appels simultanés, sans bloquer
+        les listings suivants. listing vaut None si rejeté; si le LLM échoue
+        ou n'est pas appelé, la sortie règles est rendue.
+
+        Les candidats LLM attendent dans une file de priorité (faible
+        confiance × prix élevé d'abord). llm_budget plafonne le nombre
+        d'annonces envoyées au LLM sur le run (un lot de N compte N): une
+        fois la file pleine au regard du budget, le candidat le moins
+        prioritaire garde sa sortie règles. La priorité joue dans la fenêtre
+        max_pending (max_pending >= taille du run: priorité globale).
+        report (TriageReport) reçoit le bilan du budget.
+
+        llm_batch_size > 1 regroupe les candidats en lots (un appel pour N
+        annonces, voir _call_llm_batch); un lot incomplet part après
+        llm_batch_wait secondes (minuterie: même si le flux ne produit plus
+        rien) ou en fin de flux.
+
+        max_pending borne les listings en attente du LLM (+ résultats retenus
+        si ordered): au-delà, la lecture du flux attend. ordered=True rend les
+        résultats dans l'ordre d'entrée (un appel LLM lent retient alors les
+        suivants); sinon dès qu'ils sont prêts.
+        """
+        llm_concurrency = max(1, llm_concurrency)
+        max_pending = max(1, max_pending)
+        llm_batch_size = max(1, llm_batch_size)
+        report = report if report is not None else TriageReport()
+        report.budget = llm_budget
+        loop = asyncio.get_running_loop()
+        in_flight: Set[asyncio.Task] = set()
+        flush_timer: Optional[asyncio.TimerHandle] = None
+        held: Dict[int, Optional[PropertyListing]] = {}
+        # Tas (-priorité, index, brut, sortie règles, triage): plus prioritaire d'abord
+        waiting: List[Tuple[float, int, Dict[str, Any], Optional[PropertyListing], Triage]] = []
+        waiting_since = 0.0
+        sent = 0  # Annonces envoyées au LLM (budget)
+        outstanding = 0  # Annonces en file ou en appel LLM
+        next_index = 0
+
+        async def llm_lane(entries):
+            listings = await self._call_llm_batch([entry[2] for entry in entries], source)
+            return [(entry[1], listing, entry[3]) for entry, listing in zip(entries, listings)]
+
+        def release(index: int, listing: Optional[PropertyListing]):
+            nonlocal next_index
+            if listing is None:
+                report.rejected += 1
+            if not ordered:
+                return [(index, listing)]
+            held[index] = listing
+            ready = []
+            while next_index in held:
+                ready.append((next_index, held.pop(next_index)))
+                next_index += 1
+            return ready
+
+        def enqueue(entry) -> list:
+            """Ajoute un candidat; retourne les résultats du candidat écarté (budget)"""
+            nonlocal waiting_since, outstanding, flush_timer
+            if llm_budget is not None and sent + len(waiting) >= llm_budget:
+                # Budget entièrement réservé: le moins prioritaire garde la sortie règles
+                if waiting:
+                    lowest = max(range(len(waiting)), key=waiting.__getitem__)
+                    if entry < waiting[lowest]:
+                        entry, waiting[lowest] = waiting[lowest], entry
+                        heapq.heapify(waiting)
+                report.record_skipped(entry[4])
+                return release(entry[1], entry[3])
+
+            if not waiting:
+                waiting_since = time.monotonic()
+                if flush_timer is not None:
+                    flush_timer.cancel()
+                flush_timer = loop.call_later(llm_batch_wait, flush_expired)
+            heapq.heappush(waiting, entry)
+            outstanding += 1
+            return []
+
+        def dispatch(force: bool):
+            """Lance des lots tant qu'il y a des slots (force: lot incomplet autorisé)"""
+            nonlocal sent
+            # Slots comptés sur les appels non terminés (in_flight garde aussi
+            # les terminés pas encore collectés)
+            running = sum(not task.done() for task in in_flight)
+            while waiting and running < llm_concurrency and (force or len(waiting) >= llm_batch_size):
+                entries = [heapq.heappop(waiting) for _ in range(min(llm_batch_size, len(waiting)))]
+                sent += len(entries)
+                for entry in entries:
+                    report.record_sent(entry[4])
+                task = asyncio.create_task(llm_lane(entries))
+                task.add_done_callback(lane_done)
+                in_flight.add(task)
+                running += 1
+
+        def flush_expired():
+            """Minuterie: lot incomplet parti après llm_batch_wait, sans attendre le flux"""
+            if waiting and time.monotonic() - waiting_since >= llm_batch_wait:
+                dispatch(force=True)
+
+        def lane_done(task: asyncio.Task):
+            # Slot libéré: un lot expiré en attente part tout de suite
+            if not task.cancelled():
+                flush_expired()
+
+        async def collect(block: bool):
+            nonlocal outstanding
+            if block and in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                done = [task for task in in_flight if task.done()]
+            in_flight.difference_update(done)
+            ready = []
+            for task in done:
+                results = task.result()
+                outstanding -= len(results)
+                for index, listing, fallback in results:
+                    if listing is None:
+                        report.llm_failed += 1
+                        listing = fallback
+                    else:
+                        report.llm_succeeded += 1
+                    ready.extend(release(index, listing))
+            return ready
+
+        try:
+            index = 0
+            async for raw_data in _aiter(records):
+                report.processed += 1
+                listing, triage = self._normalize_rules(raw_data, source, with_triage=bool(self.agent))
+                if triage is not None and triage.confidence < self.min_confidence:
+                    report.llm_candidates += 1
+                    cached = self.llm_cache.get(raw_data, source) if self.llm_cache is not None else None
+                    if cached is not None:
+                        report.cache_hits += 1
+                        results = release(index, cached)
+                    else:
+                        results = enqueue((-triage.priority, index, raw_data, listing, triage))
+                else:
+                    report.rules_only += 1
+                    results = release(index, listing)
+                for result in results:
+                    yield result
+                index += 1
+
+                if waiting:
+                    dispatch(force=time.monotonic() - waiting_since >= llm_batch_wait)
+                if in_flight:
+                    await asyncio.sleep(0)  # Laisse avancer les appels LLM
+                    for result in await collect(block=False):
+                        yield result
+                # Contre-pression: trop de listings en attente du LLM ou retenus
+                while outstanding and outstanding + len(held) >= max_pending:
+                    dispatch(force=True)
+                    for result in await collect(block=True):
+                        yield result
+
+            while waiting or in_flight:
+                dispatch(force=True)
+                for result in await collect(block=True):
+                    yield result
+        finally:
+            if flush_timer is not None:
+                flush_timer.cancel()
+            for task in in_flight:
+                task.cancel()
+
+    def _normalize_rules(
+        self, raw_data: Dict[str, Any], source: str, with_triage: bool = True
+    ) -> Tuple[Optional[PropertyListing], Optional[Triage]]:
+        """
+        Chemin règles: (listing ou None, triage)
+
+        Triage None si sans titre ni ID (pas de recours LLM) ou si
+        with_triage=False (pas d'agent: inutile de le calculer).
         """
         try:
             # === ÉTAPE 1: Règles rapides ===
 
             # Titre et ID
             title = raw_data.get('title', '')
-            external_id = raw_data.get('id') or raw_data.get('listing_id') or ''
+            external_id = _external_id(raw_data)
             external_url = raw_data.get('url', '')
 
             if not title or not external_id:
-                return None
+                return None, None
 
             # Projet
             project_name = raw_data.get('project_name') or raw_data.get('building') or self._extract_project_from_title(title)
@@ -442,14 +834,12 @@ class HybridNormalizer:
 
             if not price:
                 # Essayer extraction avancée si prix non détecté
-                if self.agent and self.is_ambiguous(raw_data):
-                    return await self._normalize_with_llm(raw_data, source)
-                return None
+                return None, self.triage(raw_data, None) if with_triage else None
 
             # Créer le listing
             listing = PropertyListing(
                 source=source,
-                external_id=str(external_id),
+                external_id=external_id,
                 external_url=external_url,
                 title=title,
                 description=raw_data.get('description', ''),
@@ -464,19 +854,24 @@ class HybridNormalizer:
                 raw_data=raw_data,
             )
 
-            return listing
+            return listing, self.triage(raw_data, listing) if with_triage else None
 
         except Exception as e:
             print(f"Erreur normalisation: {e}")
 
-            # === ÉTAPE 2: Fallback LLM si ambigu ===
-            if self.agent and self.is_ambiguous(raw_data):
-                return await self._normalize_with_llm(raw_data, source)
-
-            return None
+            # === ÉTAPE 2: Fallback LLM (confiance nulle) ===
+            return None, Triage(0.0, ['rules_error']) if with_triage else None
 
     async def _normalize_with_llm(self, raw_data: Dict[str, Any], source: str) -> Optional[PropertyListing]:
-        """Utilise PydanticAI pour les cas complexes"""
+        """Utilise PydanticAI pour les cas complexes (cache LLM d'abord)"""
+        if self.llm_cache is not None:
+            listing = self.llm_cache.get(raw_data, source)
+            if listing is not None:
+                return listing
+        return await self._call_llm(raw_data, source)
+
+    async def _call_llm(self, raw_data: Dict[str, Any], source: str) -> Optional[PropertyListing]:
+        """Appel de l'agent; le résultat validé est mis en cache"""
         if not self.agent:
             return None
 
@@ -497,12 +892,78 @@ class HybridNormalizer:
             listing.source = source
             listing.raw_data = raw_data
 
-            return listing
-
         except Exception as e:
             print(f"Erreur LLM normalisation: {e}")
             return None
 
+        if self.llm_cache is not None:
+            self.llm_cache.put(raw_data, source, listing)
+
+        return listing
+
+    async def _call_llm_batch(self, raws: List[Dict[str, Any]], source: str) -> List[Optional[PropertyListing]]:
+        """
+        Un appel de l'agent pour plusieurs annonces (prompt système amorti)
+
+        Les résultats sont rattachés aux annonces par external_id, pas par
+        position (le modèle peut en omettre, en ajouter ou les réordonner).
+        Une annonce sans résultat à son ID, ou au résultat invalide, est
+        refaite seule (_call_llm); seuls les résultats rattachés sont mis en
+        cache. Un lot en échec (erreur, aucun ID reconnu) est coupé en deux
+        et retenté.
+        """
+        if len(raws) == 1 or not self.batch_agent:
+            return [await self._call_llm(raw_data, source) for raw_data in raws]
+
+        try:
+            prompt = f"""
+            Normalise ces {len(raws)} annonces immobilières:
+            {json.dumps(raws, ensure_ascii=False, indent=2)}
+
+            Source: {source}
+            """
+            result = await self.batch_agent.run(prompt)
+
+            # Premier résultat par external_id (doublons ignorés)
+            by_id: Dict[str, Dict[str, Any]] = {}
+            for item in result.output:
+                if isinstance(item, dict) and item.get('external_id') not in (None, ''):
+                    by_id.setdefault(str(item['external_id']), item)
+            if not by_id:
+                raise ValueError(f"aucun external_id reconnu dans {len(result.output)} résultats")
+
+        except Exception as e:
+            print(f"Erreur LLM lot de {len(raws)}: {e}")
+            middle = len(raws) // 2
+            return (
+                await self._call_llm_batch(raws[:middle], source)
+                + await self._call_llm_batch(raws[middle:], source)
+            )
+
+        ids = [_external_id(raw_data) for raw_data in raws]
+        id_counts = Counter(ids)
+
+        listings = []
+        for raw_data, external_id in zip(raws, ids):
+            # ID absent ou partagé par deux annonces du lot: rattachement impossible
+            item = by_id.get(external_id) if external_id and id_counts[external_id] == 1 else None
+            if item is None:
+                listings.append(await self._call_llm(raw_data, source))
+                continue
+
+            try:
+                listing = PropertyListing.model_validate({**item, 'source': source, 'external_id': external_id})
+            except ValidationError:
+                listings.append(await self._call_llm(raw_data, source))
+                continue
+
+            listing.raw_data = raw_data
+            if self.llm_cache is not None:
+                self.llm_cache.put(raw_data, source, listing)
+            listings.append(listing)
+
+        return listings
+
     def _extract_project_from_title(self, title: str) -> str:
         """Extrait le nom du projet depuis le titre"""
         # Pattern: "2 Bed Condo at Project Name"
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Matching d'alias compilé - Palantir Thaïlande
+=============================================
+
+Remplace les boucles `for alias in table: if alias in text` par une seule
+regex en forme de trie, compilée une fois par table.
+
+Le balayage trouve à chaque position l'alias le plus long qui y commence.
+Les alias contenus dans un alias trouvé (préfixes, sous-chaînes) sont déduits
+de tables précalculées: on obtient TOUS les alias présents, puis la priorité
+de la table (ordre d'insertion) décide, exactement comme l'ancienne boucle.
+
+Sous LINEAR_SCAN_MAX alias, la boucle `in` reste plus rapide que le coût fixe
+d'un balayage regex: le matcher l'utilise alors directement.
+
+Auteur: Léon 🏝️
+"""
+
+import re
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional
+
+# Taille de table sous laquelle la boucle `in` bat le balayage regex (mesuré)
+LINEAR_SCAN_MAX = 24
+
+
+def _build_trie(aliases) -> Dict[str, Any]:
+    """Construit un trie {caractère: sous-trie}; la clé '' marque une fin d'alias"""
+    trie: Dict[str, Any] = {}
+    for alias in aliases:
+        node = trie
+        for ch in alias:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    return trie
+
+
+def _trie_to_regex(node: Dict[str, Any]) -> str:
+    """Convertit un trie en regex (quantificateurs gourmands = alias le plus long)"""
+    branches = [re.escape(ch) + _trie_to_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        body = f'(?:{body})?'
+    return body
+
+
+class AliasMatcher:
+    """Table d'alias {alias: valeur} compilée pour recherche en une passe"""
+
+    def __init__(self, table: Mapping[str, Any]):
+        # L'ordre d'insertion de la table définit la priorité
+        self.table = dict(table)
+        self._priority = {alias: rank for rank, alias in enumerate(self.table)}
+        self._linear = len(self.table) < LINEAR_SCAN_MAX
+
+        aliases = [alias for alias in self.table if alias]
+        trie = _build_trie(aliases)
+        self._pattern = re.compile(_trie_to_regex(trie)) if aliases else None
+
+        # Un alias vide est contenu dans n'importe quel texte
+        self._always: FrozenSet[str] = frozenset([''] if '' in self.table else [])
+
+        # Pour chaque alias: les alias qu'il contient (lui-même compris), et
+        # la position où reprendre le balayage. Si un suffixe de l'alias peut
+        # commencer un alias plus long, la reprise se fait à ce suffixe pour
+        # ne pas manquer une correspondance chevauchante; sinon après l'alias.
+        self._contained: Dict[str, FrozenSet[str]] = {}
+        self._resume: Dict[str, int] = {}
+        for alias in aliases:
+            contained = set(self._always)
+            resume = len(alias)
+            for start in range(len(alias)):
+                node = trie
+                for end in range(start, len(alias)):
+                    node = node.get(alias[end])
+                    if node is None:
+                        break
+                    if '' in node:
+                        contained.add(alias[start:end + 1])
+                else:
+                    if start > 0 and len(node) > ('' in node):
+                        resume = min(resume, start)
+            self._contained[alias] = frozenset(contained)
+            self._resume[alias] = resume
+
+        self._overlapping = any(resume < len(alias) for alias, resume in self._resume.items())
+
+        # Meilleur alias (priorité) contenu dans chaque alias
+        self._best: Dict[str, str] = {
+            alias: min(contained, key=self._priority.__getitem__)
+            for alias, contained in self._contained.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def _matches(self, text: str) -> List[str]:
+        """Alias les plus longs trouvés à chaque position de départ"""
+        if self._pattern is None or not text:
+            return []
+
+        if not self._overlapping:
+            return self._pattern.findall(text)
+
+        found = []
+        search = self._pattern.search
+        pos = 0
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return found
+            alias = match.group()
+            found.append(alias)
+            pos = match.start() + self._resume[alias]
+
+    def find_all(self, text: str) -> List[str]:
+        """Tous les alias présents, par ordre de priorité"""
+        if self._linear:
+            return [alias for alias in self.table if alias in text]
+
+        present = set(self._always)
+        for alias in self._matches(text):
+            present |= self._contained[alias]
+        return sorted(present, key=self._priority.__getitem__)
+
+    def first_alias(self, text: str) -> Optional[str]:
+        """Alias présent de plus haute priorité (None si aucun)"""
+        if self._linear:
+            for alias in self.table:
+                if alias in text:
+                    return alias
+            return None
+
+        candidates = [self._best[alias] for alias in self._matches(text)]
+        candidates.extend(self._always)
+        if not candidates:
+            return None
+        return min(candidates, key=self._priority.__getitem__)
+
+    def first(self, text: str, default: Any = None) -> Any:
+        """Valeur de l'alias de plus haute priorité présent dans le texte"""
+        alias = self.first_alias(text)
+        return default if alias is None else self.table[alias]
+
+    def values(self, text: str) -> List[Any]:
+        """Valeurs de tous les alias présents, par ordre de priorité"""
+        if self._linear:
+            return [value for alias, value in self.table.items() if alias in text]
+        return [self.table[alias] for alias in self.find_all(text)]
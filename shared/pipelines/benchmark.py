@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Benchmarks du pipeline - Palantir Thaïlande
+===========================================
+
+Mesure le débit (enregistrements/s) et la mémoire (pic RSS) de:
+
+- pipeline:      RealEstatePipeline.process_stream (dicts Supabase)
+- hybrid_rules:  HybridNormalizer.normalize, chemin règles (sans LLM)
+- dedup:         DedupIndex (scoreur par blocs NumPy) + clusters()
+
+sur des listings générés par listing_generator (seed fixe), à 10k, 100k
+et 1M enregistrements. Chaque mesure tourne dans un processus séparé
+(pic RSS propre); seul le traitement est chronométré, pas la génération.
+Jusqu'à 100k, le meilleur de 3 essais est retenu (bruit de la machine).
+
+Les résultats sont comparés aux références de benchmark_baselines.json:
+un débit plus bas ou une mémoire plus haute que la référence au-delà du
+seuil (20% par défaut) est une régression (code de sortie 1).
+
+Usage:
+    python benchmark.py                                  # 10k et 100k
+    python benchmark.py --sizes 10000 100000 1000000
+    python benchmark.py --only pipeline dedup --save     # nouvelle référence
+
+Les références dépendent de la machine: les régénérer (--save) sur la
+machine où les benchmarks tournent.
+
+Auteur: Léon 🏝️
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional
+
+from listing_generator import GeneratedListing, ListingGenerator
+
+BENCHMARKS = ('pipeline', 'hybrid_rules', 'dedup')
+DEFAULT_SIZES = (10_000, 100_000)
+DEFAULT_SEED = 42
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_REPEAT = 3
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baselines.json')
+
+# Génération et traitement par blocs: mémoire bornée hors données retenues
+CHUNK_SIZE = 10_000
+
+# Tolérance mémoire absolue (bruit de l'allocateur sur les petites tailles)
+MEMORY_SLACK_MB = 8.0
+
+
+@dataclass
+class BenchResult:
+    """Mesure d'un benchmark à une taille"""
+    name: str
+    size: int
+    seconds: float
+    records_per_second: float
+    peak_rss_mb: float
+
+
+def _chunks(size: int, seed: int) -> Iterator[List[GeneratedListing]]:
+    generator = ListingGenerator(seed=seed)
+    remaining = size
+    while remaining > 0:
+        n = min(CHUNK_SIZE, remaining)
+        yield list(generator.generate(n))
+        remaining -= n
+
+
+def _by_source(chunk: List[GeneratedListing]) -> Dict[str, list]:
+    groups = defaultdict(list)
+    for item in chunk:
+        groups[item.source].append(item.raw)
+    return groups
+
+
+# ============================================================================
+# BENCHMARKS (retournent le temps de traitement en secondes)
+# ============================================================================
+
+def bench_pipeline(size: int, seed: int) -> float:
+    from real_estate_normalizer import RealEstatePipeline
+
+    pipeline = RealEstatePipeline()
+    elapsed = 0.0
+    for chunk in _chunks(size, seed):
+        groups = _by_source(chunk)
+        start = perf_counter()
+        for source, raws in groups.items():
+            for _ in pipeline.process_stream(raws, source, as_dict=True):
+                pass
+        elapsed += perf_counter() - start
+    return elapsed
+
+
+def bench_hybrid_rules(size: int, seed: int) -> float:
+    from ai_entity_resolver import HybridNormalizer
+
+    normalizer = HybridNormalizer()
+    normalizer.agent = None  # Chemin règles uniquement
+
+    async def run(items: List[GeneratedListing]):
+        for item in items:
+            await normalizer.normalize(item.raw, item.source)
+
+    loop = asyncio.new_event_loop()
+    elapsed = 0.0
+    try:
+        for chunk in _chunks(size, seed):
+            start = perf_counter()
+            loop.run_until_complete(run(chunk))
+            elapsed += perf_counter() - start
+    finally:
+        loop.close()
+    return elapsed
+
+
+def bench_dedup(size: int, seed: int) -> float:
+    from real_estate_normalizer import DedupIndex, RealEstatePipeline
+    from similarity_batch import BatchSimilarityScorer
+
+    pipeline = RealEstatePipeline()
+    index = DedupIndex(batch_scorer=BatchSimilarityScorer())
+    elapsed = 0.0
+    for chunk in _chunks(size, seed):
+        listings = [
+            listing
+            for source, raws in _by_source(chunk).items()
+            for listing in pipeline.process_stream(raws, source)
+        ]
+        start = perf_counter()
+        index.add_many(listings)
+        elapsed += perf_counter() - start
+
+    start = perf_counter()
+    index.clusters()
+    return elapsed + perf_counter() - start
+
+
+BENCH_FUNCTIONS: Dict[str, Callable[[int, int], float]] = {
+    'pipeline': bench_pipeline,
+    'hybrid_rules': bench_hybrid_rules,
+    'dedup': bench_dedup,
+}
+
+
+# ============================================================================
+# EXÉCUTION
+# ============================================================================
+
+def _current_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        return 0.0
+
+
+def _run_child(name: str, size: int, seed: int, queue):
+    logging.disable(logging.WARNING)  # Rejets journalisés: hors mesure
+    base_rss = _current_rss_mb()
+    seconds = BENCH_FUNCTIONS[name](size, seed)
+    # ru_maxrss: Ko sous Linux, octets sous macOS
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    queue.put((seconds, max(0.0, peak_rss - base_rss)))
+
+
+def run_benchmark(name: str, size: int, seed: int = DEFAULT_SEED, repeat: int = 1) -> BenchResult:
+    """Exécute un benchmark dans un processus dédié (meilleur temps sur `repeat` essais)"""
+    context = multiprocessing.get_context('fork' if sys.platform != 'win32' else 'spawn')
+    best_seconds, best_peak = None, None
+    for _ in range(max(1, repeat)):
+        queue = context.Queue()
+        process = context.Process(target=_run_child, args=(name, size, seed, queue))
+        process.start()
+        seconds, peak_mb = queue.get()
+        process.join()
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        best_peak = peak_mb if best_peak is None else min(best_peak, peak_mb)
+
+    return BenchResult(
+        name, size, round(best_seconds, 3),
+        round(size / best_seconds, 1) if best_seconds else 0.0, round(best_peak, 1),
+    )
+
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as fp:
+        return json.load(fp).get('results', {})
+
+
+def save_baselines(results: List[BenchResult], path: str = BASELINE_PATH):
+    """Met à jour les références (les autres entrées sont conservées)"""
+    merged = load_baselines(path)
+    merged.update({f"{r.name}:{r.size}": asdict(r) for r in results})
+    data = {
+        'machine': ' '.join(filter(None, (platform.machine(), platform.processor(), f"{os.cpu_count()} CPU"))),
+        'python': platform.python_version(),
+        'updated_at': time.strftime('%Y-%m-%d'),
+        'results': dict(sorted(merged.items())),
+    }
+    with open(path, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp, indent=2)
+        fp.write('\n')
+
+
+def compare(result: BenchResult, baseline: Optional[dict], threshold: float) -> List[str]:
+    """Régressions d'une mesure par rapport à sa référence"""
+    if not baseline:
+        return []
+    problems = []
+    if result.records_per_second < baseline['records_per_second'] * (1 - threshold):
+        problems.append(
+            f"débit {result.records_per_second:,.0f}/s < référence {baseline['records_per_second']:,.0f}/s"
+        )
+    if result.peak_rss_mb > baseline['peak_rss_mb'] * (1 + threshold) + MEMORY_SLACK_MB:
+        problems.append(f"mémoire {result.peak_rss_mb} Mo > référence {baseline['peak_rss_mb']} Mo")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline de normalisation")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="essais par mesure, meilleur retenu (1 seul au-delà de 100k)")
+    parser.add_argument('--save', action='store_true', help="enregistre les mesures comme références")
+    parser.add_argument('--json', action='store_true', help="résultats en JSON sur stdout")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baseline)
+    results, regressions = [], []
+
+    for name in args.only:
+        for size in args.sizes:
+            result = run_benchmark(name, size, args.seed, args.repeat if size <= 100_000 else 1)
+            results.append(result)
+            baseline = baselines.get(f"{name}:{size}")
+            problems = compare(result, baseline, args.threshold)
+            regressions.extend(f"{name}:{size}: {p}" for p in problems)
+
+            if not args.json:
+                reference = f" (réf. {baseline['records_per_second']:,.0f}/s)" if baseline else ""
+                status = "RÉGRESSION" if problems else "ok"
+                print(
+                    f"{name:<13} {size:>9,}  {result.records_per_second:>11,.0f} enr/s{reference:<22} "
+                    f"{result.peak_rss_mb:>8.1f} Mo  {status}",
+                    flush=True,
+                )
+
+    if args.json:
+        print(json.dumps({'results': [asdict(r) for r in results], 'regressions': regressions}, indent=2))
+    if args.save:
+        save_baselines(results, args.baseline)
+        print(f"Références enregistrées: {args.baseline}", file=sys.stderr)
+        return 0
+    for regression in regressions:
+        print(f"⚠️ {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Embeddings des listings par lots - Palantir Thaïlande
+=====================================================
+
+Remplace `embed_single_unit.py` (WF-008: un appel modèle + un upsert Qdrant
+par unité, même quand rien n'a changé) par une étape de pipeline:
+
+1. Texte d'embedding construit depuis le Listing normalisé
+   (titre, projet, zone, specs, description)
+2. Empreinte du texte (+ modèle) et du payload (prix, projet...): les
+   listings inchangés depuis le dernier passage sont ignorés
+   (FingerprintStore); si seul le payload a changé, il est réécrit sans
+   recalculer le vecteur
+3. Les autres, une fois filtrés, sont envoyés par lots pleins au modèle
+   puis au sink vectoriel (Qdrant, ou mémoire pour les tests)
+
+Les empreintes ne sont enregistrées qu'après une écriture réussie: un lot
+en échec sera retenté au prochain passage.
+
+Usage:
+    stage = EmbeddingStage(
+        OllamaEmbedder('nomic-embed-text'),
+        QdrantVectorSink('listings', url='http://localhost:6333'),
+        FingerprintStore('embeddings.sqlite', table='embedding_hashes'),
+    )
+    report = stage.process(pipeline.process_stream('dump.ndjson', 'fazwaz'))
+
+Auteur: Léon 🏝️
+"""
+
+import hashlib
+import json
+import logging
+import os
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from real_estate_normalizer import Listing
+from fingerprint_store import FingerprintStore
+
+try:
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, PointStruct, SetPayload, SetPayloadOperation, VectorParams
+    QDRANT_AVAILABLE = True
+except ImportError:
+    QDRANT_AVAILABLE = False
+    print("⚠️ qdrant-client non installé. Sink Qdrant indisponible.")
+
+logger = logging.getLogger(__name__)
+
+# Espace de noms des identifiants de points (stables entre passages)
+POINT_NAMESPACE = uuid.UUID('6ba7b811-9dad-11d1-80b4-00c04fd430c8')  # uuid.NAMESPACE_URL
+
+# Longueur max de la description dans le texte d'embedding
+DESCRIPTION_MAX_CHARS = 1000
+
+
+# ============================================================================
+# TEXTE ET EMPREINTE
+# ============================================================================
+
+def embedding_text(listing: Listing) -> str:
+    """Texte d'embedding: uniquement les champs qui portent le sens de l'annonce"""
+    loc, specs = listing.location, listing.specs
+
+    place = ', '.join(part for part in (loc.microzone, loc.zone, loc.district, loc.province) if part)
+
+    spec_parts = [specs.property_type]
+    if specs.bedrooms is not None:
+        spec_parts.append(f"{specs.bedrooms.normalize():f} chambres")
+    if specs.floor_area_sqm is not None:
+        spec_parts.append(f"{specs.floor_area_sqm.normalize():f} m²")
+    if specs.view_types:
+        spec_parts.append('vue ' + ', '.join(specs.view_types))
+
+    lines = [
+        listing.title,
+        listing.project_name_normalized or listing.project_name,
+        place,
+        ' | '.join(part for part in spec_parts if part),
+        (listing.description or '')[:DESCRIPTION_MAX_CHARS],
+    ]
+    return '\n'.join(line.strip() for line in lines if line and line.strip())
+
+
+def text_fingerprint(text: str, model: str = "") -> bytes:
+    """Empreinte (16 octets) d'un texte pour un modèle donné"""
+    return hashlib.blake2b(f"{model}\x00{text}".encode(), digest_size=16).digest()
+
+
+def payload_fingerprint(payload: Dict[str, Any]) -> bytes:
+    """Empreinte (16 octets) d'un payload de point"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+
+def point_id(listing: Listing) -> str:
+    """Identifiant de point stable: uuid5(source:external_id)"""
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{listing.source}:{listing.external_id}"))
+
+
+def point_payload(listing: Listing) -> Dict[str, Any]:
+    """Payload de filtrage stocké avec le vecteur"""
+    return {
+        'source': listing.source,
+        'external_id': listing.external_id,
+        'project': listing.project_name_normalized,
+        'province': listing.location.province,
+        'zone': listing.location.zone,
+        'property_type': listing.specs.property_type,
+        'bedrooms': float(listing.specs.bedrooms) if listing.specs.bedrooms is not None else None,
+        'price_thb': float(listing.price.price_thb) if listing.price.price_thb else None,
+        'url': listing.external_url,
+    }
+
+
+# ============================================================================
+# MODÈLES ET SINKS
+# ============================================================================
+
+@dataclass
+class VectorPoint:
+    """Point à écrire dans le sink"""
+    id: str
+    vector: List[float]
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+class OllamaEmbedder:
+    """Embeddings par lots via l'API Ollama (/api/embed, entrée multiple)"""
+
+    def __init__(self, model: str = 'nomic-embed-text', base_url: Optional[str] = None, timeout: float = 120):
+        self.model = model
+        self.base_url = (base_url or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/')
+        self.timeout = timeout
+
+    def __call__(self, texts: Sequence[str]) -> List[List[float]]:
+        body = json.dumps({'model': self.model, 'input': list(texts)}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/embed", data=body, headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())['embeddings']
+
+
+class InMemoryVectorSink:
+    """Sink en mémoire (tests, dry-run)"""
+
+    def __init__(self):
+        self.points: Dict[str, VectorPoint] = {}
+        self.upserts = 0
+
+    def upsert(self, points: List[VectorPoint]):
+        self.upserts += 1
+        for point in points:
+            self.points[point.id] = point
+
+    def set_payload(self, payloads: List[Tuple[str, Dict[str, Any]]]):
+        for point_id, payload in payloads:
+            self.points[point_id].payload = payload
+
+
+class QdrantVectorSink:
+    """Sink Qdrant: une requête upsert par lot (collection créée si absente)"""
+
+    def __init__(self, collection: str, url: Optional[str] = None, client=None, distance: str = 'Cosine'):
+        if client is None:
+            if not QDRANT_AVAILABLE:
+                raise RuntimeError("qdrant-client requis pour QdrantVectorSink")
+            client = QdrantClient(url=url or os.getenv('QDRANT_URL', 'http://localhost:6333'))
+
+        self.client = client
+        self.collection = collection
+        self.distance = distance
+        self._ready = False
+
+    def _ensure_collection(self, size: int):
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(
+                self.collection, vectors_config=VectorParams(size=size, distance=Distance(self.distance))
+            )
+            logger.info(f"Collection Qdrant créée: {self.collection} ({size} dimensions)")
+        self._ready = True
+
+    def upsert(self, points: List[VectorPoint]):
+        if not points:
+            return
+        if not self._ready:
+            self._ensure_collection(len(points[0].vector))
+        self.client.upsert(
+            self.collection,
+            points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+            wait=True,
+        )
+
+    def set_payload(self, payloads: List[Tuple[str, Dict[str, Any]]]):
+        """Réécrit les payloads de points existants (une requête par lot)"""
+        if not payloads:
+            return
+        self.client.batch_update_points(
+            self.collection,
+            update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point_id]))
+                for point_id, payload in payloads
+            ],
+            wait=True,
+        )
+
+
+# ============================================================================
+# ÉTAPE DE PIPELINE
+# ============================================================================
+
+@dataclass
+class EmbeddingReport:
+    """Bilan d'un passage"""
+    seen: int = 0
+    skipped: int = 0   # Texte et payload inchangés depuis le dernier passage
+    payload_updated: int = 0  # Texte inchangé, payload réécrit sans embedding
+    embedded: int = 0
+    batches: int = 0
+
+
+class EmbeddingStage:
+    """Texte → empreinte → embeddings par lots des seuls listings modifiés"""
+
+    def __init__(
+        self,
+        embedder: Callable[[Sequence[str]], List[List[float]]],
+        sink,
+        store: Optional[FingerprintStore] = None,
+        batch_size: int = 64,
+        model: Optional[str] = None,
+    ):
+        self.embedder = embedder
+        self.sink = sink
+        self.store = store
+        self.batch_size = batch_size
+        # Changer de modèle invalide toutes les empreintes
+        self.model = model if model is not None else getattr(embedder, 'model', '')
+
+    def process(self, listings: Iterable[Listing]) -> EmbeddingReport:
+        """
+        Traite un flux de listings (mémoire bornée à deux lots)
+
+        Les listings sont lus par blocs de batch_size et filtrés; les
+        modifiés s'accumulent jusqu'à former un lot plein pour le modèle.
+        """
+        report = EmbeddingReport()
+        listings = iter(listings)
+        pending: List[Tuple[Listing, str, Dict[str, Any], bytes]] = []
+
+        while True:
+            chunk = list(islice(listings, self.batch_size))
+            if not chunk:
+                break
+            report.seen += len(chunk)
+
+            # Empreinte stockée: texte (16 octets) + payload (16 octets)
+            texts = [embedding_text(listing) for listing in chunk]
+            payloads = [point_payload(listing) for listing in chunk]
+            fingerprints = [
+                text_fingerprint(text, self.model) + payload_fingerprint(payload)
+                for text, payload in zip(texts, payloads)
+            ]
+
+            known = {}
+            if self.store is not None:
+                for source in {listing.source for listing in chunk}:
+                    ids = [listing.external_id for listing in chunk if listing.source == source]
+                    for external_id, fp in self.store.get_many(source, ids).items():
+                        known[(source, external_id)] = fp
+
+            payload_only = []
+            for listing, text, payload, fingerprint in zip(chunk, texts, payloads, fingerprints):
+                previous = known.get((listing.source, listing.external_id))
+                if previous == fingerprint:
+                    report.skipped += 1
+                elif previous is not None and previous[:16] == fingerprint[:16]:
+                    payload_only.append((listing, payload, fingerprint))
+                else:
+                    pending.append((listing, text, payload, fingerprint))
+
+            if payload_only:
+                self.sink.set_payload([(point_id(listing), payload) for listing, payload, _ in payload_only])
+                self._remember([(listing, fingerprint) for listing, _, fingerprint in payload_only])
+                report.payload_updated += len(payload_only)
+
+            while len(pending) >= self.batch_size:
+                self._embed(pending[:self.batch_size], report)
+                del pending[:self.batch_size]
+
+        if pending:
+            self._embed(pending, report)
+
+        logger.info(
+            f"Embeddings: {report.embedded} calculés en {report.batches} lots, "
+            f"{report.payload_updated} payloads réécrits, {report.skipped} inchangés sur {report.seen}"
+        )
+        return report
+
+    def _embed(self, items: List[Tuple[Listing, str, Dict[str, Any], bytes]], report: EmbeddingReport):
+        """Un appel modèle + un upsert pour un lot de listings modifiés"""
+        vectors = self.embedder([text for _, text, _, _ in items])
+        self.sink.upsert([
+            VectorPoint(point_id(listing), list(vector), payload)
+            for (listing, _, payload, _), vector in zip(items, vectors)
+        ])
+        self._remember([(listing, fingerprint) for listing, _, _, fingerprint in items])
+        report.embedded += len(items)
+        report.batches += 1
+
+    def _remember(self, written: List[Tuple[Listing, bytes]]):
+        """Enregistre les empreintes des points écrits"""
+        if self.store is None:
+            return
+        for source in {listing.source for listing, _ in written}:
+            self.store.put_many(
+                source, ((listing.external_id, fp) for listing, fp in written if listing.source == source)
+            )
+        self.store.conn.commit()
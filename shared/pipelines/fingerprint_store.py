@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Empreintes de contenu des listings bruts - Palantir Thaïlande
+=============================================================
+
+La plupart des annonces re-scrapées chaque nuit sont identiques à la veille.
+Ce magasin SQLite garde, par (source, external_id), une empreinte du payload
+brut canonicalisé: seules les annonces nouvelles ou modifiées repassent par
+la normalisation (règles et LLM), et les annonces disparues sont listées.
+Les identifiants écartés (inchangés) restent disponibles pour rafraîchir
+last_seen_at en base sans les recharger.
+
+Usage:
+    store = FingerprintStore('fingerprints.sqlite', version=RULES_VERSION)
+    run = store.begin_run('fazwaz')
+    with open('dump.ndjson') as fp:
+        rows = pipeline.process_stream(run.filter(fp), 'fazwaz', as_dict=True)
+        loader = BulkListingLoader(conn)
+        loader.load(rows)
+    loader.touch('fazwaz', run.summary.skipped)   # inchangés: last_seen_at
+    summary = run.commit()        # après chargement réussi en base
+    summary.disappeared           # external_id absents de ce scrape
+
+Changer `version` (règles de normalisation modifiées) invalide toutes les
+empreintes: chaque annonce est alors considérée comme modifiée.
+
+Auteur: Léon 🏝️
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Champs qui changent à chaque scrape sans changer l'annonce
+VOLATILE_FIELDS = ('scraped_at', 'crawled_at', 'fetched_at')
+
+# Taille des lots de requêtes SQLite (limite de variables liées)
+_SQL_CHUNK = 500
+
+
+def canonical_fingerprint(raw_data: Dict[str, Any], version: str = "", ignore: Sequence[str] = VOLATILE_FIELDS) -> bytes:
+    """Empreinte (16 octets) d'un payload brut: clés triées, champs volatils ignorés"""
+    payload = {key: value for key, value in raw_data.items() if key not in ignore}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.blake2b(f"{version}\x00{canonical}".encode(), digest_size=16).digest()
+
+
+def _external_id(raw_data: Dict[str, Any]) -> str:
+    """Même extraction d'identifiant que RealEstatePipeline"""
+    return str(raw_data.get('id', '') or raw_data.get('listing_id', '') or '')
+
+
+def _decode(item: Any) -> Any:
+    """Ligne NDJSON → dict (inchangée si illisible)"""
+    if isinstance(item, (str, bytes)):
+        try:
+            return json.loads(item)
+        except ValueError:
+            return item
+    return item
+
+
+@dataclass
+class RunSummary:
+    """Bilan d'un passage"""
+    source: str
+    run_id: int
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    unkeyed: int = 0  # Sans identifiant: transmis tels quels au pipeline
+    skipped: List[str] = field(default_factory=list)  # external_id inchangés, écartés par filter
+    disappeared: List[str] = field(default_factory=list)
+
+
+class FingerprintStore:
+    """Magasin SQLite {(source, external_id): empreinte, dernier passage}"""
+
+    def __init__(self, path: str, version: str = "", table: str = 'listing_fingerprints'):
+        self.path = path
+        self.version = version
+        self.table = table
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                source TEXT NOT NULL,
+                external_id TEXT NOT NULL,
+                fingerprint BLOB NOT NULL,
+                last_seen_run INTEGER NOT NULL,
+                PRIMARY KEY (source, external_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table}_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def fingerprint(self, raw_data: Dict[str, Any]) -> bytes:
+        return canonical_fingerprint(raw_data, self.version)
+
+    def get_many(self, source: str, external_ids: Sequence[str]) -> Dict[str, bytes]:
+        """Empreintes connues pour une liste d'identifiants"""
+        known: Dict[str, bytes] = {}
+        ids = iter(external_ids)
+        while True:
+            chunk = list(islice(ids, _SQL_CHUNK))
+            if not chunk:
+                return known
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT external_id, fingerprint FROM {self.table} "
+                f"WHERE source = ? AND external_id IN ({placeholders})",
+                [source, *chunk],
+            )
+            known.update(rows)
+
+    def put_many(self, source: str, items: Iterable[Tuple[str, bytes]], run_id: int = 0):
+        """Enregistre des empreintes (sans commit)"""
+        self.conn.executemany(
+            f"INSERT INTO {self.table} (source, external_id, fingerprint, last_seen_run) VALUES (?, ?, ?, ?) "
+            f"ON CONFLICT (source, external_id) DO UPDATE SET "
+            f"fingerprint = excluded.fingerprint, last_seen_run = excluded.last_seen_run",
+            ((source, external_id, fingerprint, run_id) for external_id, fingerprint in items),
+        )
+
+    def begin_run(self, source: str) -> 'FingerprintRun':
+        """Démarre un passage (un scrape complet d'une source)"""
+        cur = self.conn.execute(
+            f"INSERT INTO {self.table}_runs (source, started_at) VALUES (?, ?)", (source, time.time())
+        )
+        self.conn.commit()
+        return FingerprintRun(self, source, cur.lastrowid)
+
+
+class FingerprintRun:
+    """Filtre les enregistrements d'un passage; rien n'est persisté avant commit()"""
+
+    def __init__(self, store: FingerprintStore, source: str, run_id: int, chunk_size: int = 1000):
+        self.store = store
+        self.summary = RunSummary(source=source, run_id=run_id)
+        self.chunk_size = chunk_size
+
+    def filter(self, records: Iterable[Any]) -> Iterator[Any]:
+        """
+        Ne laisse passer que les enregistrements nouveaux ou modifiés
+
+        Accepte des dicts ou des lignes NDJSON; les éléments illisibles ou
+        sans identifiant sont transmis tels quels (le pipeline les rejettera).
+        Les identifiants écartés s'accumulent dans summary.skipped.
+        """
+        store, summary = self.store, self.summary
+        records = (_decode(item) for item in records)
+
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                return
+
+            keyed = []
+            for raw_data in chunk:
+                external_id = _external_id(raw_data) if isinstance(raw_data, dict) else ''
+                if not external_id:
+                    summary.unkeyed += 1
+                    yield raw_data
+                    continue
+                keyed.append((external_id, store.fingerprint(raw_data), raw_data))
+
+            known = store.get_many(summary.source, [external_id for external_id, _, _ in keyed])
+
+            # Tous les enregistrements vus sont marqués (détection des disparus)
+            store.put_many(summary.source, ((external_id, fp) for external_id, fp, _ in keyed), summary.run_id)
+
+            for external_id, fp, raw_data in keyed:
+                previous = known.get(external_id)
+                if previous == fp:
+                    summary.unchanged += 1
+                    summary.skipped.append(external_id)
+                    continue
+                if previous is None:
+                    summary.new += 1
+                else:
+                    summary.changed += 1
+                yield raw_data
+
+    def commit(self, forget_disappeared: bool = False) -> RunSummary:
+        """Persiste les empreintes et calcule les annonces disparues"""
+        store, summary = self.store, self.summary
+
+        rows = store.conn.execute(
+            f"SELECT external_id FROM {store.table} WHERE source = ? AND last_seen_run < ?",
+            (summary.source, summary.run_id),
+        )
+        summary.disappeared = [external_id for (external_id,) in rows]
+
+        if forget_disappeared:
+            store.conn.execute(
+                f"DELETE FROM {store.table} WHERE source = ? AND last_seen_run < ?",
+                (summary.source, summary.run_id),
+            )
+
+        store.conn.execute(
+            f"UPDATE {store.table}_runs SET finished_at = ? WHERE id = ?", (time.time(), summary.run_id)
+        )
+        store.conn.commit()
+
+        logger.info(
+            f"Passage {summary.source}#{summary.run_id}: {summary.new} nouveaux, {summary.changed} modifiés, "
+            f"{summary.unchanged} inchangés, {len(summary.disappeared)} disparus"
+        )
+        return summary
+
+    def rollback(self):
+        """Abandonne le passage (ex: échec du chargement en base)"""
+        self.store.conn.rollback()
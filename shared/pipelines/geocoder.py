@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Géocodage hors ligne - Palantir Thaïlande
+=========================================
+
+Remplit Location.latitude / longitude / geo_point sans appel réseau, depuis
+un gazetteer local:
+
+    projet connu > station BTS/MRT > soi Sukhumvit > zone > district > province
+
+- Index de recherche précompilé (AliasMatcher, une regex par niveau)
+- Projets et zones de la base (projects.geo_point, geo_zones.geo_center)
+  chargés en mémoire une fois et prioritaires sur le gazetteer intégré
+- Cache LRU sur (adresse, province, district, zone, projet)
+- Chaque point porte un niveau de précision (rayon indicatif en mètres)
+
+Les coordonnées intégrées sont des centres approximatifs (quartier, station):
+elles suffisent au rattachement zone/microzone et aux rayons de recherche,
+pas à la localisation d'un immeuble.
+
+Auteur: Léon 🏝️
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from alias_matcher import AliasMatcher
+from project_name_index import normalize_project_name
+from real_estate_normalizer import Location
+
+# Niveaux de précision, du plus fin au plus grossier (rayon indicatif en mètres)
+PRECISION_RADIUS_M = OrderedDict([
+    ('project', 50),
+    ('station', 400),
+    ('soi', 500),
+    ('zone', 1500),
+    ('district', 3000),
+    ('province', 25000),
+])
+
+# ============================================================================
+# GAZETTEER INTÉGRÉ
+# ============================================================================
+# (nom, province, latitude, longitude, alias...)
+
+STATIONS = [
+    # BTS Sukhumvit
+    ('BTS Mo Chit', 'Bangkok', 13.8026, 100.5538, 'mo chit', 'หมอชิต'),
+    ('BTS Ari', 'Bangkok', 13.7797, 100.5446, 'bts ari'),
+    ('BTS Victory Monument', 'Bangkok', 13.7628, 100.5372, 'victory monument', 'อนุสาวรีย์'),
+    ('BTS Siam', 'Bangkok', 13.7456, 100.5340, 'bts siam', 'siam station'),
+    ('BTS Chit Lom', 'Bangkok', 13.7441, 100.5430, 'bts chit lom', 'bts chidlom'),
+    ('BTS Phloen Chit', 'Bangkok', 13.7430, 100.5490, 'bts ploenchit', 'bts phloen chit'),
+    ('BTS Nana', 'Bangkok', 13.7405, 100.5550, 'bts nana'),
+    ('BTS Asok', 'Bangkok', 13.7370, 100.5603, 'bts asok', 'bts asoke'),
+    ('BTS Phrom Phong', 'Bangkok', 13.7305, 100.5697, 'bts phrom phong', 'bts phromphong'),
+    ('BTS Thong Lo', 'Bangkok', 13.7243, 100.5784, 'bts thong lo', 'bts thonglor'),
+    ('BTS Ekkamai', 'Bangkok', 13.7195, 100.5850, 'bts ekkamai'),
+    ('BTS Phra Khanong', 'Bangkok', 13.7152, 100.5917, 'phra khanong'),
+    ('BTS On Nut', 'Bangkok', 13.7056, 100.6010, 'on nut', 'onnut'),
+    ('BTS Punnawithi', 'Bangkok', 13.6893, 100.6093, 'punnawithi'),
+    ('BTS Udom Suk', 'Bangkok', 13.6798, 100.6097, 'udom suk', 'udomsuk'),
+    ('BTS Bearing', 'Bangkok', 13.6613, 100.6016, 'bts bearing'),
+    # BTS Silom
+    ('BTS National Stadium', 'Bangkok', 13.7466, 100.5290, 'national stadium'),
+    ('BTS Ratchadamri', 'Bangkok', 13.7395, 100.5393, 'ratchadamri'),
+    ('BTS Sala Daeng', 'Bangkok', 13.7285, 100.5343, 'sala daeng'),
+    ('BTS Chong Nonsi', 'Bangkok', 13.7237, 100.5294, 'chong nonsi'),
+    ('BTS Surasak', 'Bangkok', 13.7194, 100.5215, 'surasak'),
+    ('BTS Saphan Taksin', 'Bangkok', 13.7187, 100.5143, 'saphan taksin'),
+    # MRT Bleue
+    ('MRT Sukhumvit', 'Bangkok', 13.7380, 100.5614, 'mrt sukhumvit'),
+    ('MRT Queen Sirikit', 'Bangkok', 13.7230, 100.5600, 'queen sirikit'),
+    ('MRT Khlong Toei', 'Bangkok', 13.7224, 100.5538, 'mrt khlong toei'),
+    ('MRT Lumphini', 'Bangkok', 13.7256, 100.5456, 'lumphini', 'lumpini'),
+    ('MRT Silom', 'Bangkok', 13.7294, 100.5365, 'mrt silom'),
+    ('MRT Phetchaburi', 'Bangkok', 13.7487, 100.5633, 'mrt phetchaburi'),
+    ('MRT Phra Ram 9', 'Bangkok', 13.7573, 100.5650, 'phra ram 9', 'rama 9', 'rama ix'),
+    ('MRT Thailand Cultural Centre', 'Bangkok', 13.7660, 100.5700, 'cultural centre', 'cultural center'),
+    ('MRT Huai Khwang', 'Bangkok', 13.7787, 100.5736, 'huai khwang', 'huay kwang'),
+    ('MRT Sutthisan', 'Bangkok', 13.7894, 100.5741, 'sutthisan'),
+    ('MRT Lat Phrao', 'Bangkok', 13.8066, 100.5731, 'mrt lat phrao', 'mrt ladprao'),
+]
+
+ZONES = [
+    # Bangkok
+    ('Sukhumvit', 'Bangkok', 13.7370, 100.5603, 'sukhumvit', 'สุขุมวิท'),
+    ('Asoke', 'Bangkok', 13.7380, 100.5614, 'asoke', 'asok'),
+    ('Phrom Phong', 'Bangkok', 13.7305, 100.5697, 'phrom phong', 'phromphong'),
+    ('Thonglor', 'Bangkok', 13.7320, 100.5810, 'thonglor', 'thong lo', 'thonglo'),
+    ('Ekkamai', 'Bangkok', 13.7250, 100.5880, 'ekkamai', 'ekamai'),
+    ('Sathorn', 'Bangkok', 13.7200, 100.5300, 'sathorn', 'sathon', 'สาทร'),
+    ('Silom', 'Bangkok', 13.7270, 100.5330, 'silom', 'สีลม'),
+    ('Riverside', 'Bangkok', 13.7200, 100.5100, 'riverside', 'charoen krung'),
+    ('Ratchada', 'Bangkok', 13.7700, 100.5700, 'ratchada', 'ratchadaphisek'),
+    ('Ladprao', 'Bangkok', 13.8100, 100.5800, 'ladprao', 'lat phrao'),
+    ('Ari', 'Bangkok', 13.7797, 100.5446, 'ari', 'aree'),
+    ('Phahonyothin', 'Bangkok', 13.7900, 100.5500, 'phahonyothin', 'phaholyothin'),
+    ('Siam', 'Bangkok', 13.7456, 100.5340, 'siam', 'สยาม'),
+    ('Chit Lom', 'Bangkok', 13.7441, 100.5430, 'chit lom', 'chidlom'),
+    ('Ploenchit', 'Bangkok', 13.7430, 100.5490, 'ploenchit', 'phloen chit'),
+    ('Wireless Road', 'Bangkok', 13.7380, 100.5470, 'wireless road', 'wireless rd'),
+    ('Nana', 'Bangkok', 13.7405, 100.5550, 'nana'),
+    ('Bang Na', 'Bangkok', 13.6680, 100.6040, 'bang na', 'bangna'),
+    # Phuket
+    ('Patong', 'Phuket', 7.8964, 98.2964, 'patong', 'ป่าตอง'),
+    ('Kata', 'Phuket', 7.8205, 98.2980, 'kata'),
+    ('Karon', 'Phuket', 7.8470, 98.2940, 'karon'),
+    ('Kamala', 'Phuket', 7.9500, 98.2830, 'kamala'),
+    ('Surin', 'Phuket', 7.9770, 98.2790, 'surin beach', 'surin'),
+    ('Bang Tao', 'Phuket', 8.0000, 98.2950, 'bang tao', 'bangtao', 'laguna'),
+    ('Layan', 'Phuket', 8.0290, 98.2960, 'layan'),
+    ('Rawai', 'Phuket', 7.7790, 98.3250, 'rawai', 'ราไวย์'),
+    ('Nai Harn', 'Phuket', 7.7770, 98.3050, 'nai harn', 'naiharn'),
+    ('Chalong', 'Phuket', 7.8450, 98.3380, 'chalong', 'ฉลอง'),
+    ('Kathu', 'Phuket', 7.9100, 98.3330, 'kathu'),
+    ('Phuket Town', 'Phuket', 7.8804, 98.3923, 'phuket town', 'old town'),
+    # Koh Samui
+    ('Chaweng', 'Surat Thani', 9.5300, 100.0620, 'chaweng'),
+    ('Lamai', 'Surat Thani', 9.4700, 100.0400, 'lamai'),
+    ('Bophut', 'Surat Thani', 9.5550, 100.0280, 'bophut', 'bo phut', 'fisherman'),
+    ('Maenam', 'Surat Thani', 9.5700, 99.9950, 'maenam', 'mae nam'),
+    ('Choeng Mon', 'Surat Thani', 9.5700, 100.0750, 'choeng mon'),
+    ('Nathon', 'Surat Thani', 9.5350, 99.9360, 'nathon'),
+]
+
+DISTRICTS = [
+    ('Watthana', 'Bangkok', 13.7420, 100.5850, 'watthana', 'wattana'),
+    ('Khlong Toei Nuea', 'Bangkok', 13.7450, 100.5600, 'khlong toei nuea'),
+    ('Khlong Tan Nuea', 'Bangkok', 13.7300, 100.5850, 'khlong tan nuea'),
+    ('Khlong Toei', 'Bangkok', 13.7100, 100.5600, 'khlong toei', 'klong toey'),
+    ('Sathon', 'Bangkok', 13.7080, 100.5260, 'sathon district'),
+    ('Bang Rak', 'Bangkok', 13.7300, 100.5240, 'bang rak', 'bangrak'),
+    ('Din Daeng', 'Bangkok', 13.7700, 100.5600, 'din daeng'),
+    ('Lat Phrao', 'Bangkok', 13.8200, 100.6000, 'lat phrao district'),
+    ('Phaya Thai', 'Bangkok', 13.7800, 100.5400, 'phaya thai', 'phayathai'),
+    ('Pathum Wan', 'Bangkok', 13.7450, 100.5300, 'pathum wan', 'pathumwan'),
+    ('Huai Khwang', 'Bangkok', 13.7760, 100.5790, 'huai khwang district'),
+    ('Phra Khanong', 'Bangkok', 13.7050, 100.6000, 'phra khanong district'),
+    ('Koh Samui', 'Surat Thani', 9.5120, 100.0136, 'koh samui', 'ko samui', 'samui', 'เกาะสมุย'),
+    ('Thalang', 'Phuket', 8.0320, 98.3350, 'thalang'),
+]
+
+PROVINCES = [
+    ('Bangkok', 'Bangkok', 13.7563, 100.5018, 'bangkok', 'bkk', 'กรุงเทพ'),
+    ('Phuket', 'Phuket', 7.8804, 98.3923, 'phuket', 'ภูเก็ต'),
+    ('Surat Thani', 'Surat Thani', 9.1382, 99.3215, 'surat thani', 'สุราษฎร์ธานี'),
+]
+
+# Repères le long de Sukhumvit: numéro de soi → (lat, lon), interpolés
+# linéairement (sois impairs au nord, pairs au sud, numérotation vers l'est)
+SUKHUMVIT_SOI_ANCHORS = [
+    (1, 13.7420, 100.5520),
+    (21, 13.7375, 100.5610),
+    (39, 13.7305, 100.5697),
+    (55, 13.7243, 100.5784),
+    (63, 13.7195, 100.5850),
+    (77, 13.7056, 100.6010),
+    (101, 13.6893, 100.6093),
+    (115, 13.6700, 100.6100),
+]
+
+SOI_PATTERN = re.compile(r'sukhumvit\s*(?:soi\s*)?(\d{1,3})\b')
+_NON_WORD = re.compile(r'[^\w\u0E00-\u0E7F]+')  # Voyelles et tons thaïs (non \w) conservés
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    """Point géocodé"""
+    latitude: float
+    longitude: float
+    precision: str  # clé de PRECISION_RADIUS_M
+    matched: str    # Entrée du gazetteer retenue
+
+    @property
+    def radius_m(self) -> int:
+        return PRECISION_RADIUS_M[self.precision]
+
+    @property
+    def geo_point(self) -> str:
+        """EWKT accepté par une colonne GEOMETRY(POINT, 4326)"""
+        return f"SRID=4326;POINT({self.longitude} {self.latitude})"
+
+
+def interpolate_soi(soi: int) -> Optional[Tuple[float, float]]:
+    """Position approximative d'un soi de Sukhumvit"""
+    anchors = SUKHUMVIT_SOI_ANCHORS
+    if soi < anchors[0][0] or soi > anchors[-1][0]:
+        return None
+    for (n0, lat0, lon0), (n1, lat1, lon1) in zip(anchors, anchors[1:]):
+        if n0 <= soi <= n1:
+            t = (soi - n0) / (n1 - n0)
+            return round(lat0 + t * (lat1 - lat0), 6), round(lon0 + t * (lon1 - lon0), 6)
+    return None
+
+
+def _search_text(text: str) -> str:
+    """Texte de recherche: mots séparés par un espace, bordé d'espaces"""
+    return f" {_NON_WORD.sub(' ', text.lower()).strip()} "
+
+
+class _Level:
+    """Un niveau du gazetteer: entrées + matcher d'alias"""
+
+    def __init__(self, precision: str, entries: Iterable[tuple]):
+        self.precision = precision
+        self.entries: Dict[str, Tuple[str, float, float]] = {}
+        self.aliases: Dict[str, str] = {}
+        for name, province, lat, lon, *aliases in entries:
+            self.add(name, province, lat, lon, aliases)
+        self.matcher = None
+
+    def add(self, name: str, province: str, lat: float, lon: float, aliases: Iterable[str] = ()):
+        self.entries[name] = (province, lat, lon)
+        for alias in [name.lower(), *aliases]:
+            # Alias latins bornés par des espaces (mot entier), alias thaïs tels quels
+            key = _search_text(alias) if alias.isascii() else alias
+            self.aliases.setdefault(key, name)
+        self.matcher = None
+
+    def compile(self):
+        self.matcher = AliasMatcher(self.aliases)
+
+    def lookup(self, text: str, province: str) -> Optional[GeocodeResult]:
+        """Première entrée présente dans le texte, dans la province si connue"""
+        if self.matcher is None:
+            self.compile()
+        for name in self.matcher.values(text):
+            entry_province, lat, lon = self.entries[name]
+            if not province or entry_province == province:
+                return GeocodeResult(lat, lon, self.precision, name)
+        return None
+
+
+class Geocoder:
+    """Géocodeur hors ligne: gazetteer intégré + projets/zones de la base"""
+
+    def __init__(self, cache_size: int = 65536):
+        self.cache_size = cache_size
+        self.projects: Dict[str, Tuple[float, float]] = {}
+        self.levels = [
+            _Level('station', STATIONS),
+            _Level('zone', ZONES),
+            _Level('district', DISTRICTS),
+            _Level('province', PROVINCES),
+        ]
+        self._zones = self.levels[1]
+        self._cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __getstate__(self):
+        # Le cache LRU n'est pas sérialisable (process_many): recréé à la lecture
+        state = self.__dict__.copy()
+        del state['_cached']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cached = lru_cache(maxsize=self.cache_size)(self._resolve)
+
+    # ------------------------------------------------------------------
+    # Chargement
+    # ------------------------------------------------------------------
+
+    def add_project(self, name: str, latitude: float, longitude: float):
+        """Ajoute (ou remplace) les coordonnées d'un projet connu"""
+        key = normalize_project_name(name)
+        if key:
+            self.projects[key] = (latitude, longitude)
+            self._cached.cache_clear()
+
+    def add_zone(self, name: str, province: str, latitude: float, longitude: float, aliases: Iterable[str] = ()):
+        """Ajoute (ou remplace) le centre d'une zone"""
+        self._zones.add(name, province, latitude, longitude, aliases)
+        self._cached.cache_clear()
+
+    @classmethod
+    def from_connection(cls, conn, cache_size: int = 65536) -> 'Geocoder':
+        """Gazetteer intégré complété par projects.geo_point et geo_zones.geo_center"""
+        geocoder = cls(cache_size)
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT COALESCE(name_normalized, name), ST_Y(geo_point), ST_X(geo_point)
+                FROM projects WHERE geo_point IS NOT NULL
+            """)
+            for name, lat, lon in cur:
+                geocoder.add_project(name, lat, lon)
+
+            cur.execute("""
+                SELECT z.name_en, p.name_en, ST_Y(z.geo_center), ST_X(z.geo_center)
+                FROM geo_zones z
+                LEFT JOIN geo_districts d ON d.id = z.district_id
+                LEFT JOIN geo_provinces p ON p.id = d.province_id
+                WHERE z.geo_center IS NOT NULL
+            """)
+            for name, province, lat, lon in cur:
+                geocoder.add_zone(name, province or '', lat, lon)
+        return geocoder
+
+    # ------------------------------------------------------------------
+    # Géocodage
+    # ------------------------------------------------------------------
+
+    def _resolve(
+        self, address: str, province: str, district: str, zone: str, project: str
+    ) -> Optional[GeocodeResult]:
+        """Résolution non cachée (voir geocode)"""
+        if project:
+            point = self.projects.get(normalize_project_name(project))
+            if point:
+                return GeocodeResult(point[0], point[1], 'project', project)
+
+        text = _search_text(address)
+        stations, zones, districts, provinces = self.levels
+
+        result = stations.lookup(text, province)
+        if result:
+            return result
+
+        # Soi de Sukhumvit (zone "Sukhumvit 23" ou adresse "sukhumvit soi 23")
+        if not province or province == 'Bangkok':
+            soi_match = SOI_PATTERN.search(zone.lower()) or SOI_PATTERN.search(text)
+            if soi_match:
+                point = interpolate_soi(int(soi_match.group(1)))
+                if point:
+                    return GeocodeResult(point[0], point[1], 'soi', f"Sukhumvit {soi_match.group(1)}")
+
+        result = zones.lookup(text, province) or zones.lookup(_search_text(zone), province)
+        if result:
+            return result
+
+        result = districts.lookup(text, province) or districts.lookup(_search_text(district), province)
+        if result:
+            return result
+
+        return provinces.lookup(text, '') or provinces.lookup(_search_text(province), '')
+
+    def geocode(self, location: Location, project_name: str = "") -> Optional[GeocodeResult]:
+        """Point le plus précis trouvé pour une Location normalisée (caché)"""
+        address = location.address_normalized or location.address_raw or ''
+        return self._cached(address, location.province, location.district, location.zone, project_name or '')
+
+    def apply(self, location: Location, project_name: str = "") -> Optional[GeocodeResult]:
+        """Remplit latitude/longitude/geo_point/geo_precision de la Location"""
+        result = self.geocode(location, project_name)
+        if result:
+            location.latitude = result.latitude
+            location.longitude = result.longitude
+            location.geo_point = result.geo_point
+            location.geo_precision = result.precision
+        return result
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+    def precision_counts(self, locations: Iterable[Location]) -> Dict[str, int]:
+        """Répartition des niveaux de précision (contrôle de couverture)"""
+        counts: Dict[str, int] = {level: 0 for level in PRECISION_RADIUS_M}
+        counts['none'] = 0
+        for location in locations:
+            counts[location.geo_precision or 'none'] += 1
+        return counts
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Service d'ingestion résident - Palantir Thaïlande
+=================================================
+
+Remplace les nœuds n8n `executeCommand` (un `python3 -c` par événement, qui
+réimporte dotenv/psycopg2 et ouvre une connexion Postgres à chaque fois) par
+un service asyncio qui reste en mémoire:
+
+- RealEstatePipeline chargé une fois (tables de règles, matchers)
+- pool de connexions Postgres (ThreadedConnectionPool)
+- file d'attente: les événements concurrents sont regroupés en micro-lots
+  (max_batch enregistrements ou max_wait_ms d'attente) puis chargés par
+  BulkListingLoader (COPY + MERGE)
+- /stats expose profondeur de file, taille des lots et latence
+
+Endpoints:
+    POST /listings?source=fazwaz      un listing, une liste, ou
+                                      {"source": "...", "listings": [...]}
+                                      (?wait=0 → 202 sans attendre le chargement)
+    GET  /health                      ping base
+    GET  /stats                       compteurs et latences
+    GET  /metrics                     métriques du pipeline (Prometheus,
+                                      ?format=json pour du JSON)
+
+Lancement:
+    VPS_PG_URL=postgresql://... python ingest_service.py
+    curl -X POST 'localhost:8765/listings?source=fazwaz' -d @listing.json
+
+Auteur: Léon 🏝️
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from real_estate_normalizer import RealEstatePipeline
+from listing_loader import BulkListingLoader, LoadReport
+from pipeline_metrics import PipelineMetrics
+
+try:
+    import psycopg2
+    from psycopg2.pool import ThreadedConnectionPool
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+    print("⚠️ psycopg2 non installé. Service d'ingestion indisponible.")
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    print("⚠️ aiohttp non installé. Endpoints HTTP indisponibles.")
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# STATISTIQUES
+# ============================================================================
+
+@dataclass
+class ServiceStats:
+    """Compteurs du service depuis le démarrage"""
+    received: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    failed: int = 0       # Enregistrements d'un lot dont le chargement a échoué
+    batches: int = 0
+    report: LoadReport = field(default_factory=LoadReport)
+    rejections: Dict[str, int] = field(default_factory=dict)
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=2000))
+    started_at: float = field(default_factory=time.time)
+
+    def snapshot(self, queue_depth: int) -> Dict[str, Any]:
+        """Vue JSON des compteurs (latences sur les 2000 derniers événements)"""
+        latencies = sorted(self.latencies_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+
+        return {
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'queue_depth': queue_depth,
+            'received': self.received,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'rejections': dict(self.rejections),
+            'batches': self.batches,
+            'avg_batch_size': round((self.accepted + self.rejected + self.failed) / self.batches, 1) if self.batches else 0,
+            'inserted': self.report.inserted,
+            'updated': self.report.updated,
+            'unchanged': self.report.unchanged,
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)},
+        }
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+# Élément de file: (listing brut, source, instant d'arrivée, future du résultat)
+_QueueItem = Tuple[Dict[str, Any], str, float, asyncio.Future]
+
+
+class IngestService:
+    """Normalisation + chargement en micro-lots derrière une file asyncio"""
+
+    def __init__(
+        self,
+        dsn: str,
+        pipeline: Optional[RealEstatePipeline] = None,
+        max_batch: int = 500,
+        max_wait_ms: float = 20,
+        pool_size: int = 4,
+        max_queue: int = 10000,
+    ):
+        if not PSYCOPG2_AVAILABLE:
+            raise RuntimeError("psycopg2 requis pour IngestService")
+
+        self.dsn = dsn
+        self.pipeline = pipeline or RealEstatePipeline()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self.stats = ServiceStats()
+
+        self.pool = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+        self._loaders: Dict[int, BulkListingLoader] = {}  # Un loader (cache des sources) par connexion
+
+        # Le pipeline (métriques, compteurs, cache memo) n'est pas thread-safe:
+        # normalisation sérialisée entre threads (liée au GIL de toute façon),
+        # seuls les chargements en base se font en parallèle
+        self._pipeline_lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Ouvre le pool et lance la boucle de regroupement"""
+        loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='ingest')
+        self.pool = await loop.run_in_executor(
+            self._executor, lambda: ThreadedConnectionPool(1, self.pool_size, self.dsn)
+        )
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        logger.info(f"Service d'ingestion démarré (lots de {self.max_batch}, pool de {self.pool_size})")
+
+    async def stop(self):
+        """Vide la file, attend les chargements en cours et ferme le pool"""
+        if self._batcher:
+            await self._queue.join()
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        if self.pool:
+            self.pool.closeall()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        logger.info("Service d'ingestion arrêté")
+
+    async def submit(self, records: List[Dict[str, Any]], source: str) -> List[asyncio.Future]:
+        """
+        Met des listings en file; retourne une future par listing
+
+        La future donne {'external_id', 'status': 'accepted'|'rejected', 'reason'}
+        une fois le lot chargé en base, ou lève l'erreur du chargement.
+        File pleine → attente (contre-pression sur les appelants).
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for raw_data in records:
+            future = loop.create_future()
+            await self._queue.put((raw_data, source, time.perf_counter(), future))
+            futures.append(future)
+        self.stats.received += len(records)
+        return futures
+
+    async def ingest(self, records: List[Dict[str, Any]], source: str) -> List[Dict[str, Any]]:
+        """submit() puis attente des résultats"""
+        return list(await asyncio.gather(*await self.submit(records, source)))
+
+    async def _batch_loop(self):
+        """Regroupe les éléments de la file en micro-lots"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[_QueueItem] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Une connexion libre par lot en cours: au-delà, la file s'allonge
+            await self._slots.acquire()
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[_QueueItem]):
+        """Charge un lot dans un thread et résout les futures"""
+        loop = asyncio.get_running_loop()
+        try:
+            results, report = await loop.run_in_executor(self._executor, self._load_batch, batch)
+        except Exception as e:
+            logger.error(f"Échec du chargement d'un lot de {len(batch)}: {e}")
+            self.stats.failed += len(batch)
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.stats.batches += 1
+            self.stats.report.add(report)
+            now = time.perf_counter()
+            for (_, _, enqueued_at, future), result in zip(batch, results):
+                self.stats.latencies_ms.append((now - enqueued_at) * 1000)
+                if result['status'] == 'accepted':
+                    self.stats.accepted += 1
+                else:
+                    self.stats.rejected += 1
+                    self.stats.rejections[result['reason']] = self.stats.rejections.get(result['reason'], 0) + 1
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _load_batch(self, batch: List[_QueueItem]) -> Tuple[List[Dict[str, Any]], LoadReport]:
+        """Normalise et charge un lot (exécuté dans un thread du pool)"""
+        results = []
+        rows = []
+        with self._pipeline_lock:
+            for position, (raw_data, source, _, _) in enumerate(batch, start=1):
+                row, rejected = self.pipeline._process_item(position, raw_data, False, source, True)
+                if rejected is not None:
+                    external_id = raw_data.get('id', '') if isinstance(raw_data, dict) else ''
+                    results.append({'external_id': external_id, 'status': 'rejected', 'reason': rejected.reason})
+                else:
+                    results.append({'external_id': row['external_id'], 'status': 'accepted', 'reason': ''})
+                    rows.append(row)
+
+        report = LoadReport()
+        if rows:
+            conn = self.pool.getconn()
+            try:
+                loader = self._loaders.get(id(conn))
+                if loader is None:
+                    loader = self._loaders[id(conn)] = BulkListingLoader(conn, batch_size=self.max_batch)
+                try:
+                    report = loader.load_batch(rows)
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                self.pool.putconn(conn)
+        return results, report
+
+    def export_metrics(self, as_json: bool = False) -> Union[str, Dict[str, Any]]:
+        """Métriques du pipeline, lues sous le verrou (modifiées par les threads de chargement)"""
+        with self._pipeline_lock:
+            metrics = self.pipeline.metrics
+            return metrics.to_dict() if as_json else metrics.to_prometheus()
+
+    def ping(self) -> bool:
+        """SELECT 1 sur une connexion du pool"""
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        finally:
+            self.pool.putconn(conn)
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+def _parse_payload(payload: Any, source: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Un listing, une liste, ou {"source", "listings"}"""
+    if isinstance(payload, dict) and 'listings' in payload:
+        return list(payload['listings']), payload.get('source') or source
+    if isinstance(payload, list):
+        return payload, source
+    return [payload], source
+
+
+def create_app(service: IngestService) -> 'web.Application':
+    """Application aiohttp exposant le service"""
+    if not AIOHTTP_AVAILABLE:
+        raise RuntimeError("aiohttp requis pour les endpoints HTTP")
+
+    routes = web.RouteTableDef()
+
+    @routes.post('/listings')
+    async def post_listings(request):
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.json_response({'error': 'JSON invalide'}, status=400)
+
+        records, source = _parse_payload(payload, request.query.get('source'))
+        if not source:
+            return web.json_response({'error': 'source manquante'}, status=400)
+
+        futures = await service.submit(records, source)
+
+        if request.query.get('wait', '1') in ('0', 'false'):
+            for future in futures:
+                # Erreur de chargement déjà comptée et journalisée par le service
+                future.add_done_callback(lambda f: f.exception())
+            return web.json_response({'queued': len(futures)}, status=202)
+
+        try:
+            results = await asyncio.gather(*futures)
+        except Exception as e:
+            return web.json_response({'error': f"Chargement échoué: {e}"}, status=500)
+
+        return web.json_response({
+            'accepted': sum(1 for r in results if r['status'] == 'accepted'),
+            'rejected': sum(1 for r in results if r['status'] == 'rejected'),
+            'results': results,
+        })
+
+    @routes.get('/health')
+    async def health(request):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(service._executor, service.ping)
+        except Exception as e:
+            return web.json_response({'status': 'error', 'error': str(e)}, status=503)
+        return web.json_response({'status': 'ok', 'queue_depth': service.queue_depth})
+
+    @routes.get('/stats')
+    async def stats(request):
+        return web.json_response(service.stats.snapshot(service.queue_depth))
+
+    @routes.get('/metrics')
+    async def metrics(request):
+        if service.pipeline.metrics is None:
+            return web.json_response({'error': 'métriques désactivées'}, status=404)
+        # Hors boucle: le verrou peut être tenu le temps de normaliser un lot
+        loop = asyncio.get_running_loop()
+        if request.query.get('format') == 'json':
+            return web.json_response(await loop.run_in_executor(None, service.export_metrics, True))
+        text = await loop.run_in_executor(None, service.export_metrics)
+        return web.Response(text=text, content_type='text/plain')
+
+    async def on_startup(app):
+        await service.start()
+
+    async def on_cleanup(app):
+        await service.stop()
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.add_routes(routes)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Le pipeline journalise chaque listing: trop bavard pour un service
+    logging.getLogger('real_estate_normalizer').setLevel(logging.WARNING)
+
+    dsn = os.getenv('VPS_PG_URL') or os.getenv('DATABASE_URL')
+    if not dsn:
+        print("VPS_PG_URL ou DATABASE_URL requis")
+        raise SystemExit(1)
+
+    metrics = PipelineMetrics() if os.getenv('INGEST_METRICS', '1') != '0' else None
+    service = IngestService(
+        dsn,
+        pipeline=RealEstatePipeline(metrics=metrics),
+        max_batch=int(os.getenv('INGEST_MAX_BATCH', '500')),
+        max_wait_ms=float(os.getenv('INGEST_MAX_WAIT_MS', '20')),
+        pool_size=int(os.getenv('INGEST_POOL_SIZE', '4')),
+    )
+    web.run_app(
+        create_app(service),
+        host=os.getenv('INGEST_HOST', '0.0.0.0'),
+        port=int(os.getenv('INGEST_PORT', '8765')),
+    )
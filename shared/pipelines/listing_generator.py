@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Générateur de listings synthétiques - Palantir Thaïlande
+========================================================
+
+Produit des listings bruts réalistes aux formats des sources scrapées
+(thailand-property, fazwaz, ddproperty, propertyhub), pour les benchmarks
+et les essais de bout en bout sans dump réel.
+
+Paramètres contrôlés (tous reproductibles via `seed`):
+- duplicate_rate: part des annonces qui re-publient un bien déjà émis
+  (autre source, prix légèrement différent)
+- thai_share: part des annonces rédigées en thaï (titre, adresse, prix)
+- foreign_currency_share: part des prix en USD / EUR / GBP
+- ambiguous_share: part des annonces ambiguës (prix sans devise, surface
+  sans unité, titre sans projet: HybridNormalizer.is_ambiguous)
+- invalid_share: part des annonces inexploitables (sans titre ou sans prix)
+
+Usage:
+    gen = ListingGenerator(seed=42, duplicate_rate=0.2, thai_share=0.1)
+    for item in gen.generate(10_000):
+        pipeline.process_raw_listing(item.raw, item.source)
+
+    python listing_generator.py 100000 > dump.ndjson     # {"source": ..., "raw": {...}}
+
+Auteur: Léon 🏝️
+"""
+
+import json
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Sequence, Tuple
+
+SOURCES = ('thailand-property', 'fazwaz', 'ddproperty', 'propertyhub')
+
+# (projet, zone, soi, district, province, standing)
+PROJECTS = [
+    ('The Davis Bangkok', 'Sukhumvit', 24, 'Khlong Tan Nuea', 'Bangkok', 'premium'),
+    ('Park 24', 'Sukhumvit', 24, 'Khlong Tan Nuea', 'Bangkok', 'premium'),
+    ('The Lumpini 24', 'Sukhumvit', 24, 'Khlong Tan Nuea', 'Bangkok', 'mid_range'),
+    ('Noble Ploenchit', 'Ploenchit', None, 'Pathum Wan', 'Bangkok', 'luxury'),
+    ('Ashton Asoke', 'Sukhumvit', 21, 'Khlong Toei Nuea', 'Bangkok', 'luxury'),
+    ('Rhythm Sukhumvit 42', 'Sukhumvit', 42, 'Khlong Tan Nuea', 'Bangkok', 'premium'),
+    ('Life One Wireless', 'Wireless Road', None, 'Pathum Wan', 'Bangkok', 'mid_range'),
+    ('Ideo Mobi Sukhumvit', 'Sukhumvit', 81, 'Phra Khanong', 'Bangkok', 'mid_range'),
+    ('The Esse Asoke', 'Sukhumvit', 21, 'Khlong Toei Nuea', 'Bangkok', 'luxury'),
+    ('Quattro by Sansiri', 'Thonglor', None, 'Watthana', 'Bangkok', 'luxury'),
+    ('Noble Refine', 'Sukhumvit', 26, 'Khlong Toei', 'Bangkok', 'premium'),
+    ('Siamese Exclusive', 'Sukhumvit', 31, 'Watthana', 'Bangkok', 'premium'),
+    ('The Room Sathorn', 'Sathorn', None, 'Sathon', 'Bangkok', 'premium'),
+    ('Rhythm Sathorn', 'Sathorn', None, 'Sathon', 'Bangkok', 'mid_range'),
+    ('Ashton Silom', 'Silom', None, 'Bang Rak', 'Bangkok', 'premium'),
+    ('Magnolias Waterfront', 'Riverside', None, 'Bang Rak', 'Bangkok', 'luxury'),
+    ('Rhythm Ratchada', 'Ratchada', None, 'Din Daeng', 'Bangkok', 'mid_range'),
+    ('Lumpini Park Ladprao', 'Ladprao', None, 'Lat Phrao', 'Bangkok', 'budget'),
+    ('Noble Around Ari', 'Ari', None, 'Phaya Thai', 'Bangkok', 'premium'),
+    ('Chapter One Eco', 'Ladprao', None, 'Lat Phrao', 'Bangkok', 'budget'),
+    ('Twinpalms Residences', 'Surin', None, 'Thalang', 'Phuket', 'luxury'),
+    ('Laguna Skyview', 'Laguna', None, 'Thalang', 'Phuket', 'premium'),
+    ('The Title Rawai', 'Rawai', None, 'Mueang Phuket', 'Phuket', 'mid_range'),
+    ('Patong Tower', 'Patong', None, 'Kathu', 'Phuket', 'mid_range'),
+    ('Samui Bayside', 'Chaweng', None, 'Ko Samui', 'Koh Samui', 'premium'),
+]
+
+# Projets supplémentaires: marque × emplacement (volumes de blocs réalistes
+# pour la déduplication: quelques centaines de projets, pas 25)
+PROJECT_BRANDS = (
+    ('Noble', 'premium'), ('Ideo', 'mid_range'), ('Rhythm', 'premium'), ('The Base', 'mid_range'),
+    ('Life', 'mid_range'), ('Aspire', 'budget'), ('Supalai', 'budget'), ('Lumpini Place', 'budget'),
+    ('Knightsbridge', 'mid_range'), ('Q House', 'premium'), ('Via', 'premium'), ('Park Origin', 'luxury'),
+    ('Whizdom', 'mid_range'), ('Elio', 'budget'), ('KnightsBridge Prime', 'premium'), ('The Line', 'mid_range'),
+)
+PROJECT_LOCATIONS = (
+    ('Sukhumvit', 11, 'Khlong Toei Nuea', 'Bangkok'), ('Sukhumvit', 24, 'Khlong Tan Nuea', 'Bangkok'),
+    ('Sukhumvit', 36, 'Khlong Tan Nuea', 'Bangkok'), ('Sukhumvit', 49, 'Khlong Tan Nuea', 'Bangkok'),
+    ('Sukhumvit', 64, 'Phra Khanong', 'Bangkok'), ('Sukhumvit', 101, 'Phra Khanong', 'Bangkok'),
+    ('Thonglor', None, 'Watthana', 'Bangkok'), ('Ekkamai', None, 'Watthana', 'Bangkok'),
+    ('Sathorn', None, 'Sathon', 'Bangkok'), ('Silom', None, 'Bang Rak', 'Bangkok'),
+    ('Ratchada', None, 'Din Daeng', 'Bangkok'), ('Ladprao', None, 'Lat Phrao', 'Bangkok'),
+    ('Ari', None, 'Phaya Thai', 'Bangkok'), ('Phahonyothin', None, 'Phaya Thai', 'Bangkok'),
+    ('Rama 9', None, 'Huai Khwang', 'Bangkok'), ('Bang Na', None, 'Bang Na', 'Bangkok'),
+    ('On Nut', None, 'Suan Luang', 'Bangkok'), ('Riverside', None, 'Khlong San', 'Bangkok'),
+    ('Kata', None, 'Mueang Phuket', 'Phuket'), ('Kamala', None, 'Kathu', 'Phuket'),
+    ('Bophut', None, 'Ko Samui', 'Koh Samui'),
+)
+PROJECTS += [
+    (f"{brand} {zone}{f' {soi}' if soi else ''}", zone, soi, district, province, standing)
+    for brand, standing in PROJECT_BRANDS
+    for zone, soi, district, province in PROJECT_LOCATIONS
+]
+
+# Noms thaïs (annonces en thaï)
+THAI_NAMES = {
+    'Sukhumvit': 'สุขุมวิท',
+    'Sathorn': 'สาทร',
+    'Silom': 'สีลม',
+    'Bangkok': 'กรุงเทพ',
+    'Phuket': 'ภูเก็ต',
+    'Koh Samui': 'เกาะสมุย',
+}
+
+# Prix/m² médian par standing (THB)
+STANDING_PRICE_PER_SQM = {'budget': 60_000, 'mid_range': 110_000, 'premium': 180_000, 'luxury': 300_000}
+
+# Surface typique par nombre de chambres (m²)
+BEDROOM_AREAS = {0: (24, 35), 1: (30, 55), 2: (55, 95), 3: (90, 160), 4: (140, 260)}
+
+FOREIGN_RATES = {'USD': 35, 'EUR': 38, 'GBP': 44}
+FOREIGN_SYMBOLS = {'USD': '$', 'EUR': '€', 'GBP': '£'}
+
+VIEWS = ('city view', 'pool view', 'garden view', 'river view', 'sea view', '')
+
+AGENTS = ('John Smith', 'Nok Srisuk', 'Ploy Chaiyaporn', 'Mark Davies', 'Aom Wongsa')
+AGENCIES = ('Bangkok Prime', 'Siam Realty', 'Phuket Homes', 'Century Estates')
+
+
+@dataclass
+class GeneratedListing:
+    """Listing brut émis par le générateur"""
+    source: str
+    raw: Dict[str, Any]
+    property_id: int          # Bien sous-jacent (doublons = même property_id)
+    duplicate: bool = False
+    thai: bool = False
+    ambiguous: bool = False
+    invalid: bool = False
+
+
+@dataclass
+class _Property:
+    id: int
+    project: Tuple
+    bedrooms: int
+    area: int
+    price_thb: int
+    floor: int
+    view: str
+
+
+class ListingGenerator:
+    """Flux reproductible de listings bruts multi-sources"""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        duplicate_rate: float = 0.15,
+        thai_share: float = 0.1,
+        foreign_currency_share: float = 0.05,
+        ambiguous_share: float = 0.1,
+        invalid_share: float = 0.01,
+        sources: Sequence[str] = SOURCES,
+        duplicate_window: int = 5000,
+    ):
+        self.rng = random.Random(seed)
+        self.duplicate_rate = duplicate_rate
+        self.thai_share = thai_share
+        self.foreign_currency_share = foreign_currency_share
+        self.ambiguous_share = ambiguous_share
+        self.invalid_share = invalid_share
+        self.sources = tuple(sources)
+        # Biens récents candidats à une re-publication
+        self._recent: Deque[Tuple[_Property, str]] = deque(maxlen=duplicate_window)
+        self._next_property = 0
+        self._counters = dict.fromkeys(self.sources, 0)
+
+    def generate(self, n: int) -> Iterator[GeneratedListing]:
+        for _ in range(n):
+            yield self.next()
+
+    def next(self) -> GeneratedListing:
+        rng = self.rng
+
+        duplicate = bool(self._recent) and rng.random() < self.duplicate_rate
+        if duplicate:
+            prop, first_source = self._recent[rng.randrange(len(self._recent))]
+            others = [s for s in self.sources if s != first_source] or list(self.sources)
+            source = rng.choice(others)
+            # Même bien, prix affiché à ±2%
+            price_thb = int(prop.price_thb * rng.uniform(0.98, 1.02)) // 1000 * 1000
+        else:
+            prop = self._new_property()
+            source = rng.choice(self.sources)
+            price_thb = prop.price_thb
+            self._recent.append((prop, source))
+
+        thai = rng.random() < self.thai_share
+        currency = 'THB'
+        if not thai and rng.random() < self.foreign_currency_share:
+            currency = rng.choice(tuple(FOREIGN_RATES))
+
+        self._counters[source] += 1
+        raw = self._render(source, self._counters[source], prop, price_thb, currency, thai)
+
+        ambiguous = rng.random() < self.ambiguous_share
+        if ambiguous:
+            self._make_ambiguous(raw)
+        invalid = rng.random() < self.invalid_share
+        if invalid:
+            raw.pop(rng.choice(('title', 'price')), None)
+
+        return GeneratedListing(source, raw, prop.id, duplicate, thai, ambiguous, invalid)
+
+    # ------------------------------------------------------------------
+    # Biens
+    # ------------------------------------------------------------------
+
+    def _new_property(self) -> _Property:
+        rng = self.rng
+        project = rng.choice(PROJECTS)
+        bedrooms = rng.choices((0, 1, 2, 3, 4), weights=(15, 40, 30, 12, 3))[0]
+        low, high = BEDROOM_AREAS[bedrooms]
+        area = rng.randint(low, high)
+        price_per_sqm = STANDING_PRICE_PER_SQM[project[5]] * rng.lognormvariate(0, 0.18)
+        price_thb = int(area * price_per_sqm) // 10_000 * 10_000
+
+        prop = _Property(self._next_property, project, bedrooms, area, price_thb, rng.randint(2, 45), rng.choice(VIEWS))
+        self._next_property += 1
+        return prop
+
+    # ------------------------------------------------------------------
+    # Rendu par source
+    # ------------------------------------------------------------------
+
+    def _price_text(self, source: str, price_thb: int, currency: str, thai: bool) -> str:
+        if thai:
+            return f"{price_thb / 1_000_000:g} ล้านบาท"
+        if currency != 'THB':
+            value = round(price_thb / FOREIGN_RATES[currency], -2)
+            return f"{FOREIGN_SYMBOLS[currency]}{value:,.0f}" if self.rng.random() < 0.5 else f"{currency} {value:,.0f}"
+        if source == 'thailand-property':
+            return f"THB {price_thb:,}"
+        if source == 'fazwaz':
+            return f"฿{price_thb:,}"
+        if source == 'ddproperty':
+            return f"฿ {price_thb / 1_000_000:.2f}M".replace('.00M', 'M')
+        return f"{price_thb:,} บาท"
+
+    def _address(self, prop: _Property, thai: bool) -> str:
+        name, zone, soi, district, province, _ = prop.project
+        if thai:
+            street = THAI_NAMES.get(zone, zone)
+            return f"{street} {soi} {THAI_NAMES.get(province, province)}" if soi else f"{street} {THAI_NAMES.get(province, province)}"
+        street = f"{zone} {soi}" if soi else zone
+        return f"{street}, {district}, {province}"
+
+    def _render(self, source: str, n: int, prop: _Property, price_thb: int, currency: str, thai: bool) -> Dict[str, Any]:
+        rng = self.rng
+        name, zone, soi, district, province, _ = prop.project
+        beds = 'Studio' if prop.bedrooms == 0 else f"{prop.bedrooms} Bedroom"
+        price = self._price_text(source, price_thb, currency, thai)
+        description = f"{beds} unit on floor {prop.floor}, {prop.area} sqm, {prop.view or 'quiet'}, near BTS"
+
+        if thai:
+            thai_beds = 'สตูดิโอ' if prop.bedrooms == 0 else f"{prop.bedrooms} ห้องนอน"
+            title = f"ขายคอนโด {name} {thai_beds} {prop.area} ตร.ม."
+        else:
+            title = None
+
+        if source == 'thailand-property':
+            return {
+                'id': f"TP{n}",
+                'url': f"https://www.thailand-property.com/condo/{n}",
+                'title': title or f"{beds} Condo for Sale at {name} {zone}{f' {soi}' if soi else ''}",
+                'description': description,
+                'project_name': name,
+                'address': self._address(prop, thai),
+                'price': price,
+                'size': f"{prop.area} sqm",
+                'bedrooms': str(prop.bedrooms),
+                'bathrooms': str(max(1, prop.bedrooms)),
+                'type': 'Condominium',
+                'images': [f"https://img.thailand-property.com/{n}/{i}.jpg" for i in range(rng.randint(1, 6))],
+                'agent_name': rng.choice(AGENTS),
+            }
+        if source == 'fazwaz':
+            return {
+                'listing_id': f"FZ{n}",
+                'url': f"https://www.fazwaz.com/property-for-sale/thailand/{n}",
+                'title': title or f"{name} - {prop.bedrooms} Bed Condo for Sale at {name}",
+                'description': description,
+                'building': name,
+                'location': self._address(prop, thai),
+                'price': price,
+                'size': f"{prop.area} SqM",
+                'bedrooms': 'Studio' if prop.bedrooms == 0 else f"{prop.bedrooms} Beds",
+                'type': 'condo',
+                'agency': rng.choice(AGENCIES),
+            }
+        if source == 'ddproperty':
+            return {
+                'id': f"DD{n}",
+                'url': f"https://www.ddproperty.com/en/property/{n}",
+                'title': title or f"{name}, {beds}, {prop.area} sq.m.",
+                'description': description,
+                'project_name': name,
+                'address': self._address(prop, thai),
+                'price': price,
+                'size': f"{prop.area} sq.m.",
+                'bedrooms': str(prop.bedrooms),
+                'type': 'Condo',
+                'agent_name': rng.choice(AGENTS),
+                'agent_phone': f"08{rng.randint(10_000_000, 99_999_999)}",
+            }
+        return {
+            'id': f"PH{n}",
+            'url': f"https://propertyhub.in.th/en/listings/{n}",
+            'title': title or f"For sale {name} {beds} {prop.area} m2",
+            'description': description,
+            'project_name': name,
+            'location': self._address(prop, thai),
+            'price': price,
+            'size': f"{prop.area} ตร.ม." if thai else f"{prop.area} m2",
+            'bedrooms': str(prop.bedrooms),
+            'type': 'คอนโด' if thai else 'condo',
+        }
+
+    def _make_ambiguous(self, raw: Dict[str, Any]):
+        kind = self.rng.randrange(3)
+        if kind == 0:
+            # Prix sans devise
+            digits = ''.join(c for c in str(raw.get('price', '')) if c.isdigit() or c in ',.')
+            raw['price'] = digits or raw.get('price', '')
+        elif kind == 1:
+            # Surface sans unité
+            raw['size'] = str(raw.get('size', '')).split(' ')[0]
+        else:
+            # Titre sans " at <projet>"
+            raw['title'] = raw.get('title', '').split(' at ')[0]
+
+
+if __name__ == '__main__':
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    for item in ListingGenerator(seed=seed).generate(count):
+        sys.stdout.write(json.dumps({'source': item.source, 'raw': item.raw}, ensure_ascii=False) + '\n')
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Cache des normalisations LLM - Palantir Thaïlande
+=================================================
+
+Un appel llama3.3 sur CPU prend plusieurs secondes, et les mêmes annonces
+ambigües reviennent à chaque scrape quotidien. Ce cache SQLite garde le
+PropertyListing validé rendu par l'agent, par clé:
+
+    hash(raw_data canonique + source) + modèle + empreinte du prompt
+
+raw_data canonique: même empreinte que fingerprint_store (clés triées,
+champs volatils scraped_at/crawled_at/fetched_at ignorés), sinon la même
+annonce re-scrapée chaque jour ne serait jamais retrouvée.
+
+L'empreinte du prompt couvre NORMALIZATION_INSTRUCTIONS et le schéma
+PropertyListing: modifier l'un ou l'autre rend les anciennes entrées
+inaccessibles (elles sortent ensuite par TTL ou éviction).
+
+- TTL: entrée expirée = miss (supprimée à la lecture ou par purge_expired)
+- taille: au-delà de max_entries, les entrées les moins récemment lues
+  sont évincées
+- compteurs hits / misses / expirées / évictions
+
+Usage:
+    cache = LLMResultCache('llm_cache.sqlite', ttl_days=30)
+    normalizer = HybridNormalizer(llm_cache=cache)
+    ...
+    cache.report()   # {'hits': ..., 'misses': ..., 'hit_rate': ..., 'entries': ...}
+
+Auteur: Léon 🏝️
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from pydantic import ValidationError
+
+from ai_entity_resolver import NORMALIZATION_INSTRUCTIONS, NORMALIZER_MODEL, PropertyListing
+from fingerprint_store import canonical_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Éviction par lots: évite un DELETE à chaque écriture une fois plein
+EVICTION_FRACTION = 0.05
+
+
+def prompt_stamp(instructions: str = NORMALIZATION_INSTRUCTIONS) -> str:
+    """Empreinte du prompt système et du schéma de sortie"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(instructions.encode())
+    digest.update(json.dumps(PropertyListing.model_json_schema(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def canonical_key(raw_data: Dict[str, Any], source: str, model: str, stamp: str) -> str:
+    """Clé d'un enregistrement brut (ordre des clés et champs volatils indifférents)"""
+    return canonical_fingerprint(raw_data, version=f"{model}\x00{stamp}\x00{source}").hex()
+
+
+@dataclass
+class LLMCacheStats:
+    """Compteurs depuis l'ouverture"""
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    writes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LLMResultCache:
+    """Cache SQLite {enregistrement brut: PropertyListing validé}"""
+
+    def __init__(
+        self,
+        path: str,
+        model: str = NORMALIZER_MODEL,
+        ttl_days: Optional[float] = DEFAULT_TTL_DAYS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        instructions: str = NORMALIZATION_INSTRUCTIONS,
+    ):
+        self.path = path
+        self.model = model
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.stamp = prompt_stamp(instructions)
+        self.stats = LLMCacheStats()
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_results (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                stamp TEXT NOT NULL,
+                listing TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_results_accessed ON llm_results (accessed_at)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+
+    def key(self, raw_data: Dict[str, Any], source: str) -> str:
+        return canonical_key(raw_data, source, self.model, self.stamp)
+
+    def get(self, raw_data: Dict[str, Any], source: str) -> Optional[PropertyListing]:
+        """Listing en cache (None si absent, expiré ou invalide)"""
+        key = self.key(raw_data, source)
+        row = self._conn.execute(
+            "SELECT listing, created_at FROM llm_results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+
+        payload, created_at = row
+        now = time.time()
+        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+            self.stats.expired += 1
+            self.stats.misses += 1
+            self._delete(key)
+            return None
+
+        try:
+            listing = PropertyListing.model_validate_json(payload)
+        except ValidationError as e:
+            logger.warning(f"Entrée de cache LLM invalide, supprimée: {e}")
+            self.stats.misses += 1
+            self._delete(key)
+            return None
+
+        with self._conn:
+            self._conn.execute("UPDATE llm_results SET accessed_at = ? WHERE key = ?", (now, key))
+        self.stats.hits += 1
+        listing.source = source
+        listing.raw_data = raw_data  # Exclu de la sérialisation
+        return listing
+
+    def put(self, raw_data: Dict[str, Any], source: str, listing: PropertyListing):
+        """Enregistre un listing validé"""
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO llm_results (key, model, stamp, listing, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET listing = excluded.listing, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (self.key(raw_data, source), self.model, self.stamp, listing.model_dump_json(), now, now),
+            )
+        self.stats.writes += 1
+
+        if len(self) > self.max_entries:
+            self._evict(len(self) - self.max_entries + int(self.max_entries * EVICTION_FRACTION))
+
+    def _delete(self, key: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM llm_results WHERE key = ?", (key,))
+
+    def _evict(self, count: int):
+        """Supprime les `count` entrées les moins récemment lues"""
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_results WHERE key IN "
+                "(SELECT key FROM llm_results ORDER BY accessed_at LIMIT ?)",
+                (count,),
+            )
+        self.stats.evictions += cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées; retourne leur nombre"""
+        if self.ttl_seconds is None:
+            return 0
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_results WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+        self.stats.expired += cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM llm_results")
+
+    def report(self) -> Dict[str, Any]:
+        return {**asdict(self.stats), 'hit_rate': round(self.stats.hit_rate, 4), 'entries': len(self)}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Mémoïsation des normalisations - Palantir Thaïlande
+===================================================
+
+Les scrapes répètent quelques milliers d'adresses, de noms de projets et de
+surfaces des millions de fois: leur normalisation (regex, AliasMatcher) est
+recalculée à chaque listing. Ce cache LRU borné garde les résultats par
+espace de noms ('address', 'project', 'area'...) avec compteurs hits/misses,
+et peut être sauvegardé sur disque (SQLite) pour repartir à chaud.
+
+La version du cache est une empreinte des tables de règles (alias,
+patterns, code des fonctions): modifier une règle invalide le cache disque
+au chargement suivant.
+
+Usage:
+    memo = normalization_memo('normalization_memo.sqlite')
+    pipeline = RealEstatePipeline(memo=memo)
+    ...
+    memo.save()
+    memo.report()    # {'address': {'hits': ..., 'misses': ..., 'hit_rate': ...}, ...}
+
+Les workers de process_many reçoivent une copie du cache (chaud) et ne
+remontent pas leurs compteurs.
+
+Auteur: Léon 🏝️
+"""
+
+import hashlib
+import logging
+import pickle
+import re
+import sqlite3
+import types
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from alias_matcher import AliasMatcher
+from real_estate_normalizer import (ListingFieldExtractor, PriceNormalizer, PropertySpecsNormalizer,
+                                    RealEstatePipeline, ThaiAddressNormalizer)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAXSIZE = 200_000
+
+
+def _describe(value: Any) -> str:
+    """
+    Représentation stable d'une règle (dict trié, pattern, code)
+
+    Stable d'un processus à l'autre: pas de repr contenant une adresse
+    mémoire (code imbriqué) ni d'ordre dépendant du hash (ensembles).
+    """
+    if isinstance(value, dict):
+        return repr(sorted((_describe(k), _describe(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return f"{{{', '.join(sorted(_describe(v) for v in value))}}}"
+    if isinstance(value, (tuple, list)):
+        return f"({', '.join(_describe(v) for v in value)})"
+    if isinstance(value, re.Pattern):
+        return f"re({value.pattern!r}, {value.flags})"
+    if isinstance(value, types.CodeType):
+        # Constantes parcourues récursivement (genexpr, lambdas imbriqués)
+        return f"code({value.co_code.hex()}, {_describe(value.co_consts)}, {value.co_names!r})"
+    # staticmethod/classmethod et property: le code de la fonction enveloppée
+    value = getattr(value, '__func__', None) or getattr(value, 'fget', None) or value
+    code = getattr(value, '__code__', None)
+    if code is not None:
+        return _describe(code)
+    return repr(value)
+
+
+def rules_fingerprint(*sources: Any) -> str:
+    """
+    Empreinte des règles de normalisation
+
+    Pour une classe: ses attributs en MAJUSCULES (tables d'alias, patterns)
+    et le code de ses méthodes. Pour une fonction: son code.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for source in sources:
+        if isinstance(source, type):
+            for name in sorted(vars(source)):
+                value = vars(source)[name]
+                if name.isupper() or callable(value):
+                    digest.update(f"{source.__qualname__}.{name}={_describe(value)}\n".encode())
+        else:
+            digest.update(f"{getattr(source, '__qualname__', '')}={_describe(source)}\n".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Compteurs d'un espace de noms"""
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Memoized:
+    """Fonction à un argument mémoïsée dans un MemoCache (sérialisable)"""
+
+    __slots__ = ('cache', 'namespace', 'fn', 'copy', 'stats')
+
+    def __init__(self, cache: 'MemoCache', namespace: str, fn: Callable, copy: Optional[Callable] = None):
+        self.cache = cache
+        self.namespace = namespace
+        self.fn = fn
+        self.copy = copy  # Résultats mutables (Location, listes): copie rendue à l'appelant
+        self.stats = cache.stats_for(namespace)
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def __call__(self, arg: Hashable) -> Any:
+        entries = self.cache._entries
+        key = (self.namespace, arg)
+        try:
+            value = entries[key]
+        except KeyError:
+            self.stats.misses += 1
+            value = self.fn(arg)
+            self.cache.put(self.namespace, arg, value)
+        else:
+            self.stats.hits += 1
+            entries.move_to_end(key)
+        return self.copy(value) if self.copy is not None else value
+
+
+class MemoCache:
+    """Cache LRU borné {(espace de noms, argument): résultat}, persistable"""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, path: Optional[str] = None, version: str = ""):
+        self.maxsize = maxsize
+        self.path = path
+        self.version = version
+        self._entries: 'OrderedDict[tuple, Any]' = OrderedDict()
+        self.stats: Dict[str, CacheStats] = {}
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Connexion SQLite non sérialisable (process_many): rouverte si besoin
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
+
+    def stats_for(self, namespace: str) -> CacheStats:
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = CacheStats()
+        return stats
+
+    def wrap(self, namespace: str, fn: Callable, copy: Optional[Callable] = None) -> Memoized:
+        """Mémoïse une fonction à un argument hashable"""
+        return Memoized(self, namespace, fn, copy)
+
+    def put(self, namespace: str, arg: Hashable, value: Any):
+        self._entries[(namespace, arg)] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Compteurs par espace de noms"""
+        report = {}
+        for namespace, stats in self.stats.items():
+            report[namespace] = {**asdict(stats), 'hit_rate': round(stats.hit_rate, 4)}
+        return report
+
+    # ------------------------------------------------------------------
+    # Cache disque
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS memo_meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS memo_entries (
+                    position INTEGER PRIMARY KEY,
+                    value BLOB NOT NULL
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def load(self) -> int:
+        """Charge le cache disque (ignoré si les règles ont changé)"""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM memo_meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            if row is not None:
+                logger.info(f"Règles modifiées ({row[0]} → {self.version}): cache disque invalidé")
+            conn.execute("DELETE FROM memo_entries")
+            conn.commit()
+            return 0
+
+        # Du moins au plus récent: l'ordre LRU est conservé
+        count = 0
+        for (blob,) in conn.execute("SELECT value FROM memo_entries ORDER BY position"):
+            namespace, arg, value = pickle.loads(blob)
+            self.put(namespace, arg, value)
+            count += 1
+        logger.info(f"Cache de normalisation: {count} entrées chargées depuis {self.path}")
+        return count
+
+    def save(self) -> int:
+        """Remplace le cache disque par le contenu courant"""
+        if not self.path:
+            raise RuntimeError("Aucun chemin de cache disque")
+
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM memo_entries")
+            conn.executemany(
+                "INSERT INTO memo_entries (position, value) VALUES (?, ?)",
+                (
+                    (position, pickle.dumps((namespace, arg, value), protocol=pickle.HIGHEST_PROTOCOL))
+                    for position, ((namespace, arg), value) in enumerate(self._entries.items())
+                ),
+            )
+            conn.execute(
+                "INSERT INTO memo_meta (key, value) VALUES ('version', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (self.version,),
+            )
+        return len(self._entries)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def normalization_memo(path: Optional[str] = None, maxsize: int = DEFAULT_MAXSIZE) -> MemoCache:
+    """Cache versionné par les règles de RealEstatePipeline"""
+    version = rules_fingerprint(
+        ThaiAddressNormalizer, PropertySpecsNormalizer, PriceNormalizer, ListingFieldExtractor, AliasMatcher,
+        RealEstatePipeline._normalize_text,
+    )
+    return MemoCache(maxsize=maxsize, path=path, version=version)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Scoring d'opportunités vectorisé - Palantir Thaïlande
+=====================================================
+
+Remplit `opportunity_scores` pour tous les listings actifs en quelques
+passes NumPy:
+
+1. Une requête charge le marché actif en colonnes
+   (prix/m², jours en ligne, zone, chambres, standing, note promoteur)
+2. Statistiques de zone (médiane prix/m², volume par typologie)
+3. Sous-scores 0-100, score total pondéré, percentile
+4. Signal hot / warm / neutral / avoid + raisons lisibles
+5. Écriture en masse (DELETE des anciens scores + COPY)
+
+Mode incrémental: seuls les listings nouveaux, dont le prix/m² a changé ou
+dont la médiane de zone a bougé (> 0.5%) depuis le dernier scoring sont
+réécrits. Le prix et la médiane retenus sont gardés dans
+opportunity_scores.metadata pour la comparaison suivante. Les autres
+listings actifs gardent leurs scores, mais valid_until et score_percentile
+sont rafraîchis dans la même transaction.
+
+Auteur: Léon 🏝️
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from listing_loader import copy_rows
+
+logger = logging.getLogger(__name__)
+
+# Pondération du score total (somme = 1)
+DEFAULT_WEIGHTS = {
+    'price_vs_zone': 0.40,
+    'dom': 0.15,
+    'rarity': 0.10,
+    'location': 0.15,
+    'standing': 0.10,
+    'developer': 0.10,
+}
+
+STANDING_SCORES = {'budget': 25.0, 'mid_range': 50.0, 'premium': 75.0, 'luxury': 100.0}
+
+# Score neutre quand la donnée manque
+NEUTRAL_SCORE = 50.0
+
+# Prix/m² 20% sous la médiane de zone → 100, à la médiane → 50, 20% au-dessus → 0
+PRICE_SCORE_SLOPE = 250.0
+
+# Jours en ligne pour un dom_score de 100 (échelle logarithmique)
+DOM_FULL_SCORE_DAYS = 365
+
+SCORES_SQL = """
+    SELECT
+        l.id, l.residence_id, l.price_per_sqm, l.days_on_market,
+        p.geo_zone_id,
+        COALESCE(r.bedrooms, NULLIF(l.raw_specs->>'bedrooms', '')::numeric),
+        p.standing_level,
+        d.rating_score,
+        prev.metadata
+    FROM listings l
+    LEFT JOIN residences r ON r.id = l.residence_id
+    LEFT JOIN projects p ON p.id = r.project_id
+    LEFT JOIN developers d ON d.id = p.developer_id
+    LEFT JOIN (
+        SELECT DISTINCT ON (listing_id) listing_id, metadata
+        FROM opportunity_scores
+        ORDER BY listing_id, calculated_at DESC
+    ) prev ON prev.listing_id = l.id
+    WHERE l.listing_status = 'active'
+"""
+
+
+def _float(value: Any) -> float:
+    return float(value) if value is not None else np.nan
+
+
+# ============================================================================
+# COLONNES
+# ============================================================================
+
+class MarketColumns:
+    """Listings actifs en colonnes NumPy (NaN = inconnu, zone -1 = inconnue)"""
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        ids, residence_ids, ppsqm, dom, zone_codes, bedrooms, standing, developer = [], [], [], [], [], [], [], []
+        prev_ppsqm, prev_median, scored_before = [], [], []
+        self.zones: List[str] = []
+        zone_index: Dict[str, int] = {}
+
+        for (listing_id, residence_id, price_per_sqm, days, zone, beds,
+             standing_level, rating, previous) in rows:
+            ids.append(str(listing_id))
+            residence_ids.append(str(residence_id) if residence_id else None)
+            ppsqm.append(_float(price_per_sqm))
+            dom.append(_float(days))
+            if zone:
+                zone = str(zone)
+                if zone not in zone_index:
+                    zone_index[zone] = len(self.zones)
+                    self.zones.append(zone)
+                zone_codes.append(zone_index[zone])
+            else:
+                zone_codes.append(-1)
+            bedrooms.append(_float(beds))
+            standing.append(STANDING_SCORES.get(standing_level, np.nan))
+            developer.append(_float(rating) / 5 * 100 if rating is not None else np.nan)
+
+            if isinstance(previous, str):
+                previous = json.loads(previous)
+            scored_before.append(previous is not None)
+            previous = previous or {}
+            prev_ppsqm.append(_float(previous.get('price_per_sqm')))
+            prev_median.append(_float(previous.get('zone_median')))
+
+        self.ids = ids
+        self.residence_ids = residence_ids
+        self.price_per_sqm = np.array(ppsqm, dtype=float)
+        self.days_on_market = np.array(dom, dtype=float)
+        self.zone = np.array(zone_codes, dtype=np.int64)
+        self.bedrooms = np.array(bedrooms, dtype=float)
+        self.standing = np.array(standing, dtype=float)
+        self.developer = np.array(developer, dtype=float)
+        # Valeurs du dernier scoring (mode incrémental)
+        self.prev_price_per_sqm = np.array(prev_ppsqm, dtype=float)
+        self.prev_zone_median = np.array(prev_median, dtype=float)
+        self.scored_before = np.array(scored_before, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_connection(cls, conn) -> 'MarketColumns':
+        with conn.cursor() as cur:
+            cur.execute(SCORES_SQL)
+            return cls(cur)
+
+
+def group_medians(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Médiane de `values` par groupe (codes 0..n_groups-1, NaN et -1 ignorés)"""
+    medians = np.full(n_groups, np.nan)
+    valid = (codes >= 0) & ~np.isnan(values)
+    if not valid.any():
+        return medians
+
+    codes, values = codes[valid], values[valid]
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    medians[present] = (values[lo] + values[hi]) / 2
+    return medians
+
+
+def _reasons(
+    ppsqm: float, median: float, days: float, zoned: bool, group_size: int, standing: float, developer: float
+) -> List[str]:
+    """Raisons lisibles d'un signal (NaN = inconnu)"""
+    reasons = []
+    if ppsqm == ppsqm and median == median and median > 0:
+        gap = (ppsqm / median - 1) * 100
+        if gap <= -5:
+            reasons.append(f"Prix/m² {abs(gap):.0f}% sous la médiane de zone")
+        elif gap >= 5:
+            reasons.append(f"Prix/m² {gap:.0f}% au-dessus de la médiane de zone")
+    if days == days and days >= 90:
+        reasons.append(f"En ligne depuis {days:.0f} jours")
+    if zoned and group_size <= 3:
+        reasons.append(f"Typologie rare dans la zone ({group_size} annonces)")
+    if standing >= 75:
+        reasons.append("Projet premium/luxe")
+    if developer >= 80:
+        reasons.append("Promoteur bien noté")
+    return reasons
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+@dataclass
+class ScoreResult:
+    """Scores du marché (un élément par listing de MarketColumns)"""
+    zone_median: np.ndarray
+    group_size: np.ndarray
+    price_vs_zone: np.ndarray
+    dom: np.ndarray
+    rarity: np.ndarray
+    location: np.ndarray
+    standing: np.ndarray
+    developer: np.ndarray
+    total: np.ndarray
+    percentile: np.ndarray
+    signal: np.ndarray  # 'hot', 'warm', 'neutral', 'avoid'
+
+
+@dataclass
+class ScoringReport:
+    """Bilan d'un passage"""
+    scored: int = 0
+    written: int = 0
+    refreshed: int = 0  # Mode incrémental: valid_until et percentile seuls
+    signals: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class OpportunityScorer:
+    """Sous-scores, total, percentile et signaux pour tout le marché actif"""
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        min_zone_listings: int = 5,
+        hot_threshold: float = 75.0,
+        warm_threshold: float = 60.0,
+        avoid_threshold: float = 35.0,
+        validity_days: int = 7,
+        change_tolerance: float = 0.005,
+    ):
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.min_zone_listings = min_zone_listings
+        self.hot_threshold = hot_threshold
+        self.warm_threshold = warm_threshold
+        self.avoid_threshold = avoid_threshold
+        self.validity_days = validity_days
+        self.change_tolerance = change_tolerance
+
+    def score(self, cols: MarketColumns) -> ScoreResult:
+        """Calcule tous les scores en passes vectorisées"""
+        n_zones = len(cols.zones)
+        zone = cols.zone
+        zoned = zone >= 0
+        ppsqm = cols.price_per_sqm
+
+        # Médiane de zone (repli: médiane du marché si la zone a trop peu d'annonces)
+        zone_counts = np.bincount(zone[zoned & ~np.isnan(ppsqm)], minlength=n_zones)
+        zone_medians = group_medians(zone, ppsqm, n_zones)
+        zone_medians[zone_counts < self.min_zone_listings] = np.nan
+        market_median = np.nanmedian(ppsqm) if (~np.isnan(ppsqm)).any() else np.nan
+
+        median = np.full(len(cols), market_median)
+        median[zoned] = zone_medians[zone[zoned]]
+        median[np.isnan(median)] = market_median
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = ppsqm / median
+        price_vs_zone = np.clip(50 + (1 - ratio) * PRICE_SCORE_SLOPE, 0, 100)
+
+        # Jours en ligne: vendeur plus négociable avec le temps (log)
+        dom = np.clip(
+            100 * np.log1p(np.maximum(cols.days_on_market, 0)) / np.log1p(DOM_FULL_SCORE_DAYS), 0, 100
+        )
+
+        # Rareté: annonces de même zone et même nombre de chambres
+        beds = np.where(np.isnan(cols.bedrooms), -1, np.clip(np.round(cols.bedrooms * 2), 0, 62)).astype(np.int64)
+        group_keys = np.where(zoned, zone * 64 + (beds + 1), -1)
+        _, inverse, group_counts = np.unique(group_keys, return_inverse=True, return_counts=True)
+        group_size = group_counts[inverse]
+        rarity = np.where(zoned, 100 / np.sqrt(group_size), np.nan)
+
+        # Localisation: rang de la médiane de zone parmi les zones (quartiers prime en tête)
+        location = np.full(len(cols), np.nan)
+        ranked = ~np.isnan(zone_medians)
+        if ranked.sum() > 1:
+            zone_rank = np.full(n_zones, np.nan)
+            sorted_medians = np.sort(zone_medians[ranked])
+            zone_rank[ranked] = (
+                np.searchsorted(sorted_medians, zone_medians[ranked], side='left') / (ranked.sum() - 1) * 100
+            )
+            location[zoned] = zone_rank[zone[zoned]]
+
+        subscores = {
+            'price_vs_zone': price_vs_zone,
+            'dom': dom,
+            'rarity': rarity,
+            'location': location,
+            'standing': cols.standing,
+            'developer': cols.developer,
+        }
+        total = sum(self.weights[name] * np.where(np.isnan(values), NEUTRAL_SCORE, values)
+                    for name, values in subscores.items())
+
+        sorted_totals = np.sort(total)
+        percentile = np.searchsorted(sorted_totals, total, side='right') / max(len(total), 1) * 100
+
+        signal = np.full(len(cols), 'neutral', dtype=object)
+        signal[total >= self.warm_threshold] = 'warm'
+        signal[(total >= self.hot_threshold)
+               | ((price_vs_zone >= 90) & (total >= self.warm_threshold))] = 'hot'
+        signal[(total < self.avoid_threshold) | (price_vs_zone <= 15)] = 'avoid'
+
+        return ScoreResult(
+            zone_median=median,
+            group_size=group_size,
+            price_vs_zone=price_vs_zone,
+            dom=dom,
+            rarity=rarity,
+            location=location,
+            standing=cols.standing,
+            developer=cols.developer,
+            total=total,
+            percentile=percentile,
+            signal=signal,
+        )
+
+    def changed_mask(self, cols: MarketColumns, result: ScoreResult) -> np.ndarray:
+        """Listings à réécrire: jamais scorés, prix/m² ou médiane de zone modifiés"""
+        tol = self.change_tolerance
+        never = ~cols.scored_before
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_moved = ~np.isclose(cols.price_per_sqm, cols.prev_price_per_sqm, rtol=1e-9, equal_nan=True)
+            median_moved = np.abs(result.zone_median / cols.prev_zone_median - 1) > tol
+        median_moved |= np.isnan(cols.prev_zone_median) != np.isnan(result.zone_median)
+        return never | price_moved | median_moved
+
+    def reasons(self, cols: MarketColumns, result: ScoreResult, i: int) -> List[str]:
+        """Raisons lisibles du signal d'un listing"""
+        return _reasons(
+            float(cols.price_per_sqm[i]), float(result.zone_median[i]), float(cols.days_on_market[i]),
+            int(cols.zone[i]) >= 0, int(result.group_size[i]), float(cols.standing[i]), float(cols.developer[i]),
+        )
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def write(self, conn, cols: MarketColumns, result: ScoreResult, mask: Optional[np.ndarray] = None) -> int:
+        """
+        Remplace les scores des listings sélectionnés (DELETE + COPY, une transaction)
+
+        Avec un masque, les listings déjà scorés hors masque restent valides:
+        valid_until et score_percentile (rang dans le marché courant) mis à
+        jour en masse dans la même transaction.
+        """
+        selected = np.flatnonzero(mask) if mask is not None else np.arange(len(cols))
+        kept = np.flatnonzero(~mask & cols.scored_before) if mask is not None else np.arange(0)
+        if not len(selected) and not len(kept):
+            return 0
+
+        valid_until = (datetime.now(timezone.utc) + timedelta(days=self.validity_days)).isoformat()
+
+        # Colonnes converties une fois en listes Python (DECIMAL(5,2), NaN → NULL)
+        def column(values: np.ndarray) -> List[Optional[float]]:
+            return [None if v != v else v for v in np.round(values[selected], 2).tolist()]
+
+        ids = [cols.ids[i] for i in selected]
+        residence_ids = [cols.residence_ids[i] for i in selected]
+        ppsqm = column(cols.price_per_sqm)
+        median = column(result.zone_median)
+        days = cols.days_on_market[selected].tolist()
+        zoned = (cols.zone[selected] >= 0).tolist()
+        group_size = result.group_size[selected].tolist()
+        standing = cols.standing[selected].tolist()
+        developer = cols.developer[selected].tolist()
+
+        rows = zip(
+            ids,
+            residence_ids,
+            column(result.price_vs_zone),
+            column(result.dom),
+            column(result.standing),
+            column(result.rarity),
+            column(result.developer),
+            column(result.location),
+            column(result.total),
+            column(result.percentile),
+            result.signal[selected].tolist(),
+            (
+                _reasons(*values)
+                for values in zip(
+                    (v if v is not None else np.nan for v in ppsqm),
+                    (v if v is not None else np.nan for v in median),
+                    days, zoned, group_size, standing, developer,
+                )
+            ),
+            (valid_until for _ in ids),
+            ({'price_per_sqm': p, 'zone_median': m} for p, m in zip(ppsqm, median)),
+        )
+
+        with conn.cursor() as cur:
+            if len(kept):
+                cur.execute(
+                    """
+                    UPDATE opportunity_scores o
+                    SET valid_until = %s, score_percentile = k.percentile
+                    FROM unnest(%s::uuid[], %s::numeric[]) AS k(listing_id, percentile)
+                    WHERE o.listing_id = k.listing_id
+                    """,
+                    (valid_until, [cols.ids[i] for i in kept], np.round(result.percentile[kept], 2).tolist()),
+                )
+            cur.execute(
+                "DELETE FROM opportunity_scores WHERE listing_id = ANY(%s::uuid[])",
+                (ids,),
+            )
+            count = copy_rows(
+                cur,
+                'opportunity_scores',
+                ['listing_id', 'residence_id', 'price_vs_zone_score', 'dom_score', 'standing_score',
+                 'rarity_score', 'developer_score', 'location_score', 'total_score', 'score_percentile',
+                 'signal_type', 'signal_reasons', 'valid_until', 'metadata'],
+                rows,
+            )
+        conn.commit()
+        return count
+
+    def run(self, conn, incremental: bool = False) -> ScoringReport:
+        """Charge le marché actif, score et écrit (tout, ou les seuls listings modifiés)"""
+        started = time.perf_counter()
+        cols = MarketColumns.from_connection(conn)
+        result = self.score(cols)
+        mask = self.changed_mask(cols, result) if incremental else None
+
+        report = ScoringReport(scored=len(cols))
+        report.written = self.write(conn, cols, result, mask)
+        if mask is not None:
+            report.refreshed = int((~mask & cols.scored_before).sum())
+        written_signals = result.signal if mask is None else result.signal[mask]
+        names, counts = np.unique(written_signals.astype(str), return_counts=True)
+        report.signals = dict(zip(names.tolist(), counts.tolist()))
+        report.seconds = round(time.perf_counter() - started, 3)
+
+        logger.info(
+            f"Scoring: {report.scored} listings, {report.written} écrits, {report.refreshed} rafraîchis "
+            f"({'incrémental' if incremental else 'complet'}) en {report.seconds}s - {report.signals}"
+        )
+        return report
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Métriques du pipeline de normalisation - Palantir Thaïlande
+===========================================================
+
+Instrumentation de RealEstatePipeline:
+
+- temps cumulé et nombre d'appels par étape (projet, adresse, géocodage,
+  specs et prix extraits en un balayage, hash, sérialisation)
+- compteurs acceptés / rejetés par raison ("Listing incomplet",
+  "Prix invalide", "Exception ValueError"...)
+- débit (enregistrements/s depuis le démarrage et par seconde de calcul)
+
+Export texte Prometheus ou dict JSON. Sans métriques (metrics=None, défaut)
+le pipeline ne fait qu'un test `is None` par étape.
+
+Usage:
+    metrics = PipelineMetrics()
+    pipeline = RealEstatePipeline(metrics=metrics)
+    for row in pipeline.process_stream('dump.ndjson', 'fazwaz'):
+        ...
+    print(metrics.to_prometheus())
+
+Avec process_many, les métriques des workers sont remontées avec chaque
+bloc et fusionnées dans celles du pipeline parent.
+
+Auteur: Léon 🏝️
+"""
+
+import time
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+# Étapes chronométrées, dans l'ordre de _build_listing
+STAGES = ('project', 'address', 'geocode', 'specs', 'hash', 'serialize')
+
+DEFAULT_NAMESPACE = 'realestate_pipeline'
+
+
+def _label(value: str) -> str:
+    """Échappement d'une valeur de label Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PipelineMetrics:
+    """Chronomètres par étape, compteurs de rejets et débit"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stage_seconds: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.stage_calls: Dict[str, int] = dict.fromkeys(STAGES, 0)
+        self.processed = 0
+        self.accepted = 0
+        self.rejections: Dict[str, int] = {}
+
+    @staticmethod
+    def clock() -> float:
+        return perf_counter()
+
+    def lap(self, stage: str, start: float) -> float:
+        """Ajoute le temps écoulé depuis `start` à l'étape; retourne l'instant courant"""
+        now = perf_counter()
+        self.stage_seconds[stage] += now - start
+        self.stage_calls[stage] += 1
+        return now
+
+    def record(self, reason: Optional[str] = None):
+        """Compte un enregistrement traité (reason = raison du rejet)"""
+        self.processed += 1
+        if reason is None:
+            self.accepted += 1
+        else:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+    @property
+    def rejected(self) -> int:
+        return sum(self.rejections.values())
+
+    # ------------------------------------------------------------------
+    # Agrégation (process_many)
+    # ------------------------------------------------------------------
+
+    def merge(self, other: 'PipelineMetrics'):
+        for stage, seconds in other.stage_seconds.items():
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        for stage, calls in other.stage_calls.items():
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+        self.processed += other.processed
+        self.accepted += other.accepted
+        for reason, count in other.rejections.items():
+            self.rejections[reason] = self.rejections.get(reason, 0) + count
+
+    def drain(self) -> 'PipelineMetrics':
+        """Retourne les compteurs accumulés et repart de zéro (même origine de temps)"""
+        drained = PipelineMetrics()
+        drained.started_at = self.started_at
+        drained.stage_seconds, self.stage_seconds = self.stage_seconds, dict.fromkeys(STAGES, 0.0)
+        drained.stage_calls, self.stage_calls = self.stage_calls, dict.fromkeys(STAGES, 0)
+        drained.processed, drained.accepted, drained.rejections = self.processed, self.accepted, self.rejections
+        self.processed = self.accepted = 0
+        self.rejections = {}
+        return drained
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        uptime = time.time() - self.started_at
+        busy = sum(self.stage_seconds.values())
+        return {
+            'uptime_seconds': round(uptime, 3),
+            'processed': self.processed,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'rejections': dict(self.rejections),
+            'records_per_second': round(self.processed / uptime, 1) if uptime > 0 else 0.0,
+            'records_per_busy_second': round(self.processed / busy, 1) if busy > 0 else 0.0,
+            'stages': {
+                stage: {
+                    'seconds': round(self.stage_seconds[stage], 6),
+                    'calls': self.stage_calls[stage],
+                    'mean_us': round(self.stage_seconds[stage] / self.stage_calls[stage] * 1e6, 2)
+                    if self.stage_calls[stage] else None,
+                }
+                for stage in self.stage_seconds
+            },
+        }
+
+    def to_prometheus(self, namespace: str = DEFAULT_NAMESPACE) -> str:
+        """Format d'exposition texte Prometheus"""
+        data = self.to_dict()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {namespace}_{name} {help_text}")
+            lines.append(f"# TYPE {namespace}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_label(str(v))}"' for key, v in labels.items())
+                lines.append(f"{namespace}_{name}{{{label_text}}} {value}" if label_text else f"{namespace}_{name} {value}")
+
+        metric('records_total', 'counter', "Enregistrements traités par issue", [
+            ({'outcome': 'accepted'}, self.accepted),
+            ({'outcome': 'rejected'}, self.rejected),
+        ])
+        metric('rejections_total', 'counter', "Rejets par raison",
+               [({'reason': reason}, count) for reason, count in sorted(self.rejections.items())])
+        metric('stage_seconds_total', 'counter', "Temps cumulé par étape",
+               [({'stage': stage}, repr(seconds)) for stage, seconds in self.stage_seconds.items()])
+        metric('stage_calls_total', 'counter', "Appels par étape",
+               [({'stage': stage}, calls) for stage, calls in self.stage_calls.items()])
+        metric('throughput_records_per_second', 'gauge', "Débit moyen depuis le démarrage",
+               [({}, data['records_per_second'])])
+        metric('uptime_seconds', 'gauge', "Secondes depuis le démarrage", [({}, data['uptime_seconds'])])
+        return '\n'.join(lines) + '\n'
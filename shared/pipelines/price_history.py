@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Historique des prix en masse - Palantir Thaïlande
+=================================================
+
+Remplace le traitement événement par événement de WF-009-PRICE-UPDATE
+(un interpréteur + une connexion + une requête par webhook) par un diff
+de snapshot en une passe:
+
+1. Derniers prix connus: une requête DISTINCT ON sur price_history
+2. Snapshot courant: listings actifs (ou lot d'observations fourni)
+3. Diff en mémoire → lignes price_history (change_from_previous, change_type)
+4. COPY des lignes + alertes pour les variations significatives (>= 3%)
+
+Mêmes règles que WF-009: variation dans ±0.5% → 'stable'.
+
+Auteur: Léon 🏝️
+"""
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+from listing_loader import copy_rows
+
+logger = logging.getLogger(__name__)
+
+_PCT_QUANTUM = Decimal('0.0001')  # change_from_previous DECIMAL(10,4)
+
+
+@dataclass
+class PriceObservation:
+    """Prix observé d'un listing dans le snapshot courant"""
+    listing_id: str
+    price_thb: Decimal
+    price_per_sqm: Optional[Decimal] = None
+    residence_id: Optional[str] = None
+
+
+@dataclass
+class PriceChange:
+    """Ligne price_history à écrire"""
+    listing_id: str
+    residence_id: Optional[str]
+    price_thb: Decimal
+    price_per_sqm: Optional[Decimal]
+    previous_price_thb: Optional[Decimal]
+    change_from_previous: Optional[Decimal]  # Pourcentage, None au premier relevé
+    change_type: Optional[str]               # increase, decrease, stable
+    significant: bool = False
+
+    def history_row(self) -> tuple:
+        return (
+            self.listing_id,
+            self.residence_id,
+            self.price_thb,
+            self.price_per_sqm,
+            self.change_from_previous,
+            self.change_type,
+        )
+
+
+class PriceDiffEngine:
+    """Compare un snapshot de prix aux derniers prix connus"""
+
+    HISTORY_COLUMNS = ['listing_id', 'residence_id', 'price_thb', 'price_per_sqm', 'change_from_previous', 'change_type']
+
+    def __init__(
+        self,
+        stable_band_pct: Decimal = Decimal('0.5'),
+        alert_threshold_pct: Decimal = Decimal('3'),
+        record_unchanged: bool = False,
+    ):
+        self.stable_band_pct = stable_band_pct
+        self.alert_threshold_pct = alert_threshold_pct
+        self.record_unchanged = record_unchanged
+
+    def diff(
+        self, snapshot: Iterable[PriceObservation], last_prices: Mapping[str, Decimal]
+    ) -> Iterator[PriceChange]:
+        """Variations du snapshot (premiers relevés compris)"""
+        for obs in snapshot:
+            if not obs.price_thb:
+                continue
+
+            previous = last_prices.get(obs.listing_id)
+
+            # Premier relevé: point de départ de l'historique
+            if previous is None:
+                yield PriceChange(obs.listing_id, obs.residence_id, obs.price_thb, obs.price_per_sqm, None, None, None)
+                continue
+
+            if obs.price_thb == previous and not self.record_unchanged:
+                continue
+
+            pct = None
+            change_type = 'stable'
+            if previous > 0:
+                pct = ((obs.price_thb - previous) / previous * 100).quantize(_PCT_QUANTUM)
+                if pct > self.stable_band_pct:
+                    change_type = 'increase'
+                elif pct < -self.stable_band_pct:
+                    change_type = 'decrease'
+
+            yield PriceChange(
+                listing_id=obs.listing_id,
+                residence_id=obs.residence_id,
+                price_thb=obs.price_thb,
+                price_per_sqm=obs.price_per_sqm,
+                previous_price_thb=previous,
+                change_from_previous=pct,
+                change_type=change_type,
+                significant=pct is not None and abs(pct) >= self.alert_threshold_pct,
+            )
+
+    # ------------------------------------------------------------------
+    # Base de données
+    # ------------------------------------------------------------------
+
+    def load_last_prices(self, conn) -> Dict[str, Decimal]:
+        """Dernier prix enregistré par listing (une requête)"""
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT ON (listing_id) listing_id, price_thb
+                FROM price_history
+                WHERE listing_id IS NOT NULL
+                ORDER BY listing_id, recorded_at DESC
+            """)
+            return {str(listing_id): price for listing_id, price in cur}
+
+    def load_snapshot(self, conn) -> List[PriceObservation]:
+        """Prix courants des listings actifs"""
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, residence_id, price_thb, price_per_sqm
+                FROM listings
+                WHERE listing_status = 'active' AND price_thb IS NOT NULL
+            """)
+            return [
+                PriceObservation(str(listing_id), price_thb, price_per_sqm, str(residence_id) if residence_id else None)
+                for listing_id, residence_id, price_thb, price_per_sqm in cur
+            ]
+
+    def write(self, conn, changes: List[PriceChange], alerts: bool = True) -> int:
+        """COPY des lignes price_history (+ alertes), une transaction"""
+        with conn.cursor() as cur:
+            count = copy_rows(cur, 'price_history', self.HISTORY_COLUMNS, (c.history_row() for c in changes))
+
+            if alerts:
+                copy_rows(
+                    cur,
+                    'alerts',
+                    ['alert_type', 'reference_type', 'reference_id', 'title', 'description', 'severity'],
+                    (
+                        (
+                            'price_change',
+                            'listing',
+                            c.listing_id,
+                            f"Prix {c.change_type}: {c.change_from_previous:+}%",
+                            f"฿{c.previous_price_thb:,.0f} → ฿{c.price_thb:,.0f}",
+                            'warning',
+                        )
+                        for c in changes
+                        if c.significant
+                    ),
+                )
+
+        conn.commit()
+        return count
+
+    def run(self, conn, snapshot: Optional[Iterable[PriceObservation]] = None) -> List[PriceChange]:
+        """Diff complet: snapshot (listings actifs par défaut) vs historique, puis écriture"""
+        last_prices = self.load_last_prices(conn)
+        if snapshot is None:
+            snapshot = self.load_snapshot(conn)
+
+        changes = list(self.diff(snapshot, last_prices))
+        self.write(conn, changes)
+
+        significant = sum(1 for c in changes if c.significant)
+        logger.info(f"Historique prix: {len(changes)} lignes écrites, {significant} variations significatives")
+        return changes
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Index flou des noms de projets - Palantir Thaïlande
+===================================================
+
+Matching approximatif "the davis bkk" ↔ "the davis bangkok" sans aller-retour
+base de données: index inversé de trigrammes (même découpage que pg_trgm)
+construit depuis un snapshot de la table `projects`.
+
+Recherche:
+1. Trigrammes de la requête triés du plus rare au plus fréquent
+2. Filtre par préfixe: un candidat de similarité >= seuil partage forcément
+   un des trigrammes les plus rares → seules leurs listes sont parcourues
+3. Vérification exacte (Jaccard sur trigrammes) des candidats
+
+Auteur: Léon 🏝️
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+# Abréviations courantes dans les annonces (développées avant découpage)
+TOKEN_ALIASES = {
+    'bkk': 'bangkok',
+    'rd': 'road',
+    'sq': 'square',
+    'resd': 'residence',
+}
+
+# Similarité minimale par défaut (pg_trgm.similarity_threshold)
+DEFAULT_THRESHOLD = 0.3
+
+_WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def normalize_project_name(name: str) -> str:
+    """Minuscules, ponctuation supprimée, abréviations développées"""
+    words = _WORD_PATTERN.findall(name.lower()) if name else []
+    return ' '.join(TOKEN_ALIASES.get(word, word) for word in words)
+
+
+def trigrams(name: str) -> FrozenSet[str]:
+    """Trigrammes d'un nom, mots complétés comme pg_trgm ('  mot ')"""
+    grams: Set[str] = set()
+    for word in normalize_project_name(name).split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+@dataclass
+class ProjectMatch:
+    """Projet candidat pour un nom brut"""
+    project_id: Any
+    name: str
+    name_normalized: str
+    score: float
+
+
+class ProjectNameIndex:
+    """Index inversé de trigrammes sur les projets connus"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.projects: List[ProjectMatch] = []
+        self._grams: List[FrozenSet[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], threshold: float = DEFAULT_THRESHOLD) -> 'ProjectNameIndex':
+        """Construit l'index depuis des lignes (id, name, name_normalized)"""
+        index = cls(threshold)
+        for project_id, name, name_normalized in rows:
+            index.add(project_id, name, name_normalized)
+        return index
+
+    @classmethod
+    def from_connection(cls, conn, threshold: float = DEFAULT_THRESHOLD) -> 'ProjectNameIndex':
+        """Construit l'index depuis la table projects (connexion DB-API)"""
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, name, name_normalized FROM projects")
+            return cls.from_rows(cur, threshold)
+
+    def add(self, project_id: Any, name: str, name_normalized: Optional[str] = None):
+        """Ajoute un projet à l'index"""
+        grams = trigrams(name_normalized or name)
+        if not grams:
+            return
+
+        idx = len(self.projects)
+        self.projects.append(ProjectMatch(project_id, name, name_normalized or '', 1.0))
+        self._grams.append(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(idx)
+
+    def search(self, name: str, k: int = 5, threshold: Optional[float] = None) -> List[ProjectMatch]:
+        """Top-k projets les plus proches d'un nom (score Jaccard des trigrammes)"""
+        threshold = self.threshold if threshold is None else threshold
+        query = trigrams(name)
+        if not query:
+            return []
+
+        # Filtre par préfixe: partager >= ceil(t·|Q|) trigrammes impose d'en
+        # partager au moins un parmi les |Q| - ceil(t·|Q|) + 1 plus rares
+        ranked = sorted(query, key=lambda gram: len(self._postings.get(gram, ())))
+        min_shared = max(1, math.ceil(threshold * len(query)))
+        prefix = ranked[:len(query) - min_shared + 1]
+
+        candidates: Set[int] = set()
+        for gram in prefix:
+            candidates.update(self._postings.get(gram, ()))
+
+        matches = []
+        for idx in candidates:
+            grams = self._grams[idx]
+            shared = len(query & grams)
+            score = shared / (len(query) + len(grams) - shared)
+            if score >= threshold:
+                project = self.projects[idx]
+                matches.append(ProjectMatch(project.project_id, project.name, project.name_normalized, score))
+
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches[:k]
+
+    def best_match(self, name: str, threshold: Optional[float] = None) -> Optional[ProjectMatch]:
+        """Meilleur projet au-dessus du seuil, ou None"""
+        matches = self.search(name, k=1, threshold=threshold)
+        return matches[0] if matches else None
@@ -15,19 +15,29 @@ Pipeline:
 Auteur: Léon 🏝️
 """
 
+import os
 import re
 import hashlib
 import json
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Iterator, Callable, Union
 from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import defaultdict
+from itertools import islice
 import logging
 
+from alias_matcher import AliasMatcher
+
 # Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+ZERO = Decimal('0')
+ONE = Decimal('1')
+CENT = Decimal('0.01')
+
 
 # ============================================================================
 # DATA CLASSES - Structures de données
@@ -45,6 +55,15 @@ class Location:
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     geo_point: Optional[str] = None  # PostGIS format
+    geo_precision: str = ""  # project, station, soi, zone, district, province (geocoder.py)
+    zone_id: Optional[str] = None  # geo_zones.id (spatial_join.py)
+    microzone_id: Optional[str] = None  # geo_microzones.id
+
+    def copy(self) -> 'Location':
+        """Copie superficielle (champs scalaires uniquement)"""
+        location = Location.__new__(Location)
+        location.__dict__.update(self.__dict__)
+        return location
 
 
 @dataclass
@@ -105,6 +124,41 @@ class Listing:
             self.price = Price(price_thb=Decimal("0"), price_original=Decimal("0"))
 
 
+@dataclass
+class RejectedRecord:
+    """Enregistrement rejeté par le pipeline (canal latéral)"""
+    line_number: int
+    reason: str  # "Listing incomplet", "Prix invalide", "JSON invalide", ...
+    raw_data: Any = None  # dict brut, ou ligne texte si JSON illisible
+    detail: str = ""
+
+    def to_json(self) -> str:
+        """Sérialise en une ligne NDJSON"""
+        return json.dumps(asdict(self), ensure_ascii=False, default=str)
+
+
+@dataclass
+class PipelineStats:
+    """Compteurs d'un traitement par lot"""
+    processed: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    rejections: Dict[str, int] = field(default_factory=dict)
+
+    def record_rejection(self, reason: str):
+        self.rejected += 1
+        self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+
+class ListingRejected(Exception):
+    """Listing refusé par les règles de normalisation"""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(detail or reason)
+        self.reason = reason
+        self.detail = detail or reason
+
+
 # ============================================================================
 # NORMALISATEURS
 # ============================================================================
@@ -145,6 +199,14 @@ class ThaiAddressNormalizer:
         'เกาะสมุย': 'Surat Thani',
     }
 
+    ZONE_PATTERN = re.compile(r'(sukhumvit|sathorn|silom|ratchada|ladprao)\s*(soi)?\s*(\d+)?')
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+
+    def __init__(self):
+        # Tables compilées une fois (priorité = ordre des dicts)
+        self.province_matcher = AliasMatcher(self.PROVINCE_ALIASES)
+        self.district_matcher = AliasMatcher(self.BANGKOK_DISTRICTS)
+
     def normalize(self, address: str) -> Location:
         """Normalise une adresse thaïlandaise"""
         loc = Location(address_raw=address)
@@ -154,23 +216,17 @@ class ThaiAddressNormalizer:
 
         # Nettoyage
         addr_lower = address.lower().strip()
-        addr_normalized = re.sub(r'\s+', ' ', addr_lower)
+        addr_normalized = self.WHITESPACE_PATTERN.sub(' ', addr_lower)
 
         # Détection province
-        for alias, province in self.PROVINCE_ALIASES.items():
-            if alias in addr_normalized:
-                loc.province = province
-                break
+        loc.province = self.province_matcher.first(addr_normalized, loc.province)
 
         # Détection district Bangkok
         if loc.province == 'Bangkok':
-            for area, district in self.BANGKOK_DISTRICTS.items():
-                if area in addr_normalized:
-                    loc.district = district
-                    break
+            loc.district = self.district_matcher.first(addr_normalized, loc.district)
 
         # Extraction zone (Sukhumvit 23, etc.)
-        zone_match = re.search(r'(sukhumvit|sathorn|silom|ratchada|ladprao)\s*(soi)?\s*(\d+)?', addr_normalized)
+        zone_match = self.ZONE_PATTERN.search(addr_normalized)
         if zone_match:
             zone_name = zone_match.group(1).capitalize()
             if zone_match.group(3):
@@ -220,6 +276,14 @@ class PropertySpecsNormalizer:
         'river view': 'river',
     }
 
+    BEDROOM_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(?:bed|bedroom|br)')
+
+    def __init__(self):
+        # Tables compilées une fois (priorité = ordre des dicts)
+        self.bedroom_matcher = AliasMatcher(self.BEDROOM_ALIASES)
+        self.property_type_matcher = AliasMatcher(self.PROPERTY_TYPE_ALIASES)
+        self.view_matcher = AliasMatcher(self.VIEW_TYPE_ALIASES)
+
     def normalize_bedrooms(self, text: str) -> Optional[Decimal]:
         """Extrait et normalise le nombre de chambres"""
         if not text:
@@ -228,54 +292,50 @@ class PropertySpecsNormalizer:
         text_lower = text.lower()
 
         # Alias directs
-        for alias, value in self.BEDROOM_ALIASES.items():
-            if alias in text_lower:
-                return value
+        value = self.bedroom_matcher.first(text_lower)
+        if value is not None:
+            return value
 
         # Pattern numérique
-        match = re.search(r'(\d+(?:\.\d+)?)\s*(?:bed|bedroom|br)', text_lower)
+        match = self.BEDROOM_PATTERN.search(text_lower)
         if match:
             return Decimal(match.group(1))
 
         return None
 
-    def normalize_area(self, text: str) -> Optional[Decimal]:
-        """Extrait et normalise une surface en m²"""
+    def parse_area(self, text: str) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """
+        Surfaces (habitable, terrain) en m² d'un texte
+
+        "45 sqm", "45 ตร.ม.", "480 sq ft" → habitable; "50 sq.w.",
+        "2 rai 1 ngan" → terrain (unités additionnées).
+        """
         if not text:
-            return None
+            return None, None
 
-        # Pattern: "45 sqm", "45 m²", "45 sq.m."
-        match = re.search(r'(\d+(?:\.\d+)?)\s*(?:sqm|sq\.?m\.?|m²|m2)', text.lower())
-        if match:
-            return Decimal(match.group(1))
+        return FIELD_EXTRACTOR.parse_areas(text.lower())
 
-        return None
+    def normalize_area(self, text: str) -> Optional[Decimal]:
+        """Extrait et normalise une surface habitable en m²"""
+        return self.parse_area(text)[0]
+
+    def normalize_land_area(self, text: str) -> Optional[Decimal]:
+        """Extrait une surface de terrain en m² (sq.w., rai, ngan)"""
+        return self.parse_area(text)[1]
 
     def normalize_property_type(self, text: str) -> str:
         """Normalise le type de bien"""
         if not text:
             return ""
 
-        text_lower = text.lower()
-        for alias, ptype in self.PROPERTY_TYPE_ALIASES.items():
-            if alias in text_lower:
-                return ptype
-
-        return ""
+        return self.property_type_matcher.first(text.lower(), "")
 
     def extract_views(self, text: str) -> List[str]:
         """Extrait les types de vue"""
         if not text:
             return []
 
-        text_lower = text.lower()
-        views = []
-
-        for alias, view_type in self.VIEW_TYPE_ALIASES.items():
-            if alias in text_lower:
-                views.append(view_type)
-
-        return list(set(views))
+        return list(dict.fromkeys(self.view_matcher.values(text.lower())))
 
 
 class PriceNormalizer:
@@ -288,29 +348,296 @@ class PriceNormalizer:
         'GBP': Decimal('44'),  # Approximatif
     }
 
-    def normalize(self, price_str: str, currency: str = 'THB') -> Optional[Price]:
-        """Normalise un prix"""
+    # Marqueurs de devise (ordre = priorité: "us$" avant "$")
+    CURRENCY_MARKERS = (
+        ('฿', 'THB'), ('บาท', 'THB'), ('thb', 'THB'), ('baht', 'THB'),
+        ('us$', 'USD'), ('usd', 'USD'), ('$', 'USD'),
+        ('€', 'EUR'), ('eur', 'EUR'),
+        ('£', 'GBP'), ('gbp', 'GBP'),
+    )
+
+    MULTIPLIERS = {
+        'million': Decimal('1000000'),
+        'mil': Decimal('1000000'),
+        'mb': Decimal('1000000'),
+        'm': Decimal('1000000'),
+        'ล้าน': Decimal('1000000'),
+        'แสน': Decimal('100000'),
+        'หมื่น': Decimal('10000'),
+        'k': Decimal('1000'),
+        'พัน': Decimal('1000'),
+    }
+
+    def parse_amount(self, text: str) -> Optional[Decimal]:
+        """
+        Montant d'un texte de prix
+
+        "THB 12,500,000", "฿ 12.5M", "€ 450.000", "1,2 M", "14.16 ล้านบาท".
+        Le premier nombre suffixé l'emporte, sinon le plus grand nombre.
+        """
+        return FIELD_EXTRACTOR.parse_amount(text.lower())
+
+    def detect_currency(self, text: str) -> Optional[str]:
+        """Devise indiquée dans un texte de prix (None si aucune)"""
+        for marker, currency in self.CURRENCY_MARKERS:
+            if marker in text:
+                return currency
+        return None
+
+    def normalize(self, price_str: str, currency: Optional[str] = None) -> Optional[Price]:
+        """Normalise un prix (devise détectée dans le texte si non fournie)"""
         if not price_str:
             return None
 
-        # Extraction numérique
-        numbers = re.findall(r'[\d,]+(?:\.\d+)?', price_str.replace(',', ''))
-        if not numbers:
+        return FIELD_EXTRACTOR.price(price_str, currency)
+
+
+class ListingFieldExtractor:
+    """
+    Specs et prix d'un listing brut en une passe
+
+    Chaque champ est mis en minuscules et découpé une seule fois par une
+    seule regex en jetons nombre + unité (surface, chambres, multiplicateur
+    de prix): le titre donne à la fois chambres, surface et terrain, le
+    champ price montant et devise. Les mots-clés (type, vues, devise,
+    studio) passent par les tables d'alias compilées (recherche de
+    sous-chaînes en C, plus rapide qu'un balayage regex caractère par
+    caractère).
+    """
+
+    # Nombre: "12,500,000", "12.500.000", "12 500 000", "1,2", "45.5"
+    NUMBER = r'\d+(?:[.,]\d+)*(?:(?: \d{3})+(?!\d))?'
+
+    # Unités après un nombre (plus longues d'abord: "m2" avant "m")
+    UNIT = (
+        r'sq\.?\s?(?:meters?|metres?|m|feet|ft|wah?|w)\.?|square\s?(?:meters?|metres?|feet|foot|wah?)'
+        r'|sqm|sqft|m²|m2|ft²|ft2|ตร\.?\s?ม\.?|ตารางเมตร|ตร\.?\s?ว\.?|ตารางวา|rai|ไร่|ngan|งาน'
+        r'|bedrooms?|beds?|br|ห้องนอน'
+        r'|million|mil|mb|m|k|ล้าน|แสน|หมื่น|พัน'
+    )
+
+    TOKEN_PATTERN = re.compile(rf'({NUMBER})(?:\s*({UNIT})(?![a-z]))?', re.ASCII)
+
+    # Unité normalisée (sans points ni espaces) → (sorte, facteur)
+    # 1 sq.ft = 0.092903 m², 1 ตารางวา = 4 m², 1 งาน = 400 m², 1 ไร่ = 1600 m²
+    UNITS = {
+        **dict.fromkeys(('sqm', 'sqmeter', 'sqmeters', 'sqmetre', 'sqmetres', 'm²', 'm2', 'ตรม', 'ตารางเมตร'), ('floor', None)),
+        **dict.fromkeys(('sqft', 'sqfeet', 'sqfoot', 'ft²', 'ft2'), ('floor', Decimal('0.092903'))),
+        **dict.fromkeys(('sqw', 'sqwa', 'sqwah', 'ตรว', 'ตารางวา'), ('land', Decimal('4'))),
+        **dict.fromkeys(('ngan', 'งาน'), ('land', Decimal('400'))),
+        **dict.fromkeys(('rai', 'ไร่'), ('land', Decimal('1600'))),
+        **dict.fromkeys(('bed', 'beds', 'bedroom', 'bedrooms', 'br', 'ห้องนอน'), ('bedrooms', None)),
+        **{suffix: ('multiplier', factor) for suffix, factor in PriceNormalizer.MULTIPLIERS.items()},
+    }
+
+    STUDIO_MARKERS = ('studio', 'สตูดิโอ')
+
+    def __init__(self, memo=None):
+        self.property_type_matcher = AliasMatcher(PropertySpecsNormalizer.PROPERTY_TYPE_ALIASES)
+        self.view_matcher = AliasMatcher(PropertySpecsNormalizer.VIEW_TYPE_ALIASES)
+        # Unités telles qu'écrites ("sq. m.", "ตร.ม.") → (sorte, facteur)
+        self._units = _UnitTable(self.UNITS)
+
+        # Champs size et price, répétés d'un listing à l'autre: mémoïsés si
+        # memo est fourni (memo_cache.MemoCache)
+        self._parse_areas = self.parse_areas
+        self._parse_price = self.parse_price
+        if memo is not None:
+            self._parse_areas = memo.wrap('area', self._parse_areas)
+            self._parse_price = memo.wrap('price', self._parse_price)
+
+    @staticmethod
+    def _number(number: str, price: bool = False, suffixed: bool = False) -> Decimal:
+        """
+        Valeur d'un nombre écrit
+
+        Point et virgule ensemble: le dernier est la décimale ("1.250.000,50").
+        Séparateur répété ou virgule suivie de trois chiffres: milliers. Point
+        suivi de trois chiffres: milliers pour un prix sans suffixe
+        ("€ 450.000"), décimale sinon ("1.250M", "45.125 sqm"). Les groupes
+        séparés par des espaces ne sont joints que dans un prix.
+        """
+        if number.isdigit():
+            return Decimal(number)
+        if ' ' in number:
+            number = number.replace(' ', '') if price else number.rsplit(' ', 1)[1]
+        dot = number.rfind('.')
+        comma = number.rfind(',')
+        if dot < 0:
+            if comma < 0:
+                return Decimal(number)
+            if len(number) - comma == 4 or number.count(',') > 1:
+                return Decimal(number.replace(',', ''))
+            return Decimal(number.replace(',', '.'))
+        if comma < 0:
+            if (price and not suffixed and len(number) - dot == 4) or number.count('.') > 1:
+                return Decimal(number.replace('.', ''))
+            return Decimal(number)
+        if dot > comma:
+            return Decimal(number.replace(',', ''))
+        return Decimal(number.replace('.', '').replace(',', '.'))
+
+    def _area(self, number: str, kind: str, factor: Optional[Decimal]) -> Decimal:
+        value = self._number(number)
+        if factor is None:
+            return value
+        return (value * factor).quantize(CENT) if kind == 'floor' else value * factor
+
+    def parse_areas(self, text: str) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """(habitable, terrain) en m²: première surface, unités foncières additionnées"""
+        floor_area = land_area = None
+        units = self._units
+        for number, unit in self.TOKEN_PATTERN.findall(text):
+            kind, factor = units[unit]
+            if kind == 'land':
+                value = self._area(number, kind, factor)
+                land_area = value if land_area is None else land_area + value
+            elif kind == 'floor' and floor_area is None:
+                floor_area = self._area(number, kind, factor)
+        return floor_area, land_area
+
+    def parse_amount(self, text: str) -> Optional[Decimal]:
+        """Premier nombre suffixé ("12.5M", "3.2 million"), sinon le plus grand nombre"""
+        largest = None
+        units = self._units
+        for number, unit in self.TOKEN_PATTERN.findall(text):
+            kind, factor = units[unit]
+            if kind == 'multiplier':
+                value = self._number(number, True, True) * factor
+                return value.quantize(ONE) if value == value.to_integral_value() else value
+            if kind is None:
+                value = self._number(number, True)
+                if largest is None or value > largest:
+                    largest = value
+        return largest
+
+    def parse_bedrooms(self, text: str) -> Optional[Decimal]:
+        """Chambres d'un champ bedrooms: studio = 0, "N bed(room)", sinon nombre seul"""
+        for marker in self.STUDIO_MARKERS:
+            if marker in text:
+                return ZERO
+
+        units = self._units
+        found = None
+        for number, unit in self.TOKEN_PATTERN.findall(text):
+            kind = units[unit][0]
+            if kind == 'bedrooms':
+                return self._number(number)
+            if kind is None and found is None:
+                found = self._number(number)
+        return found
+
+    def parse_price(self, text: str) -> Optional[Tuple[Decimal, Optional[str]]]:
+        """(montant, devise indiquée ou None) d'un texte de prix en minuscules"""
+        amount = self.parse_amount(text)
+        if amount is None:
             return None
 
-        price_value = Decimal(numbers[0].replace(',', ''))
+        for marker, currency in PriceNormalizer.CURRENCY_MARKERS:
+            if marker in text:
+                return amount, currency
+        return amount, None
 
-        # Conversion en THB
-        currency_upper = currency.upper()
-        rate = self.CURRENCY_RATES.get(currency_upper, Decimal('1'))
-        price_thb = price_value * rate
+    def price(self, price_text: Any, currency: Optional[str] = None) -> Optional[Price]:
+        """Price en THB d'un champ prix (devise détectée dans le texte si non fournie)"""
+        parsed = self._parse_price(str(price_text).lower())
+        if parsed is None:
+            return None
 
+        amount, detected = parsed
+        currency = (currency or detected or 'THB').upper()
+        rate = PriceNormalizer.CURRENCY_RATES.get(currency, ONE)
         return Price(
-            price_thb=price_thb,
-            price_original=price_value,
-            currency_original=currency_upper
+            price_thb=amount * rate if rate != 1 else amount,
+            price_original=amount,
+            currency_original=currency,
         )
 
+    def extract(self, raw_data: Dict[str, Any], title: Optional[str] = None) -> Tuple[PropertySpecs, Optional[Price]]:
+        """
+        PropertySpecs et Price (None si aucun montant) d'un listing brut
+
+        Champs structurés d'abord (size, land_size, bedrooms), le titre n'est
+        découpé que s'il manque la surface habitable ou les chambres.
+        Terrain: unités foncières additionnées ("2 rai 1 ngan"). Chambres:
+        nombre seul ou "N bed(room)", studio = 0.
+        """
+        get = raw_data.get
+        if title is None:
+            title = get('title', '')
+        title_lower = title.lower()
+        tokens = self.TOKEN_PATTERN.findall
+        units = self._units
+
+        # Surfaces du champ size, puis land_size
+        floor_area, land_area = self._parse_areas(str(get('size', '')).lower())
+        if land_area is None:
+            land_size = get('land_size') or get('land_area')
+            if land_size:
+                for number, unit in tokens(str(land_size).lower()):
+                    kind, factor = units[unit]
+                    if kind == 'land' or kind == 'floor':
+                        value = self._area(number, kind, factor)
+                        land_area = value if land_area is None else land_area + value
+
+        # Chambres du champ bedrooms ("2", "1 Beds", "Studio")
+        bedrooms = None
+        bedrooms_text = str(get('bedrooms', '')).lower()
+        if bedrooms_text.isdigit():
+            bedrooms = Decimal(bedrooms_text)
+        elif bedrooms_text:
+            bedrooms = self.parse_bedrooms(bedrooms_text)
+
+        # Titre (un découpage): chambres et surface manquantes
+        if bedrooms is None:
+            for marker in self.STUDIO_MARKERS:
+                if marker in title_lower:
+                    bedrooms = ZERO
+                    break
+        if bedrooms is None or floor_area is None:
+            for number, unit in tokens(title_lower):
+                kind, factor = units[unit]
+                if kind == 'bedrooms':
+                    if bedrooms is None:
+                        bedrooms = self._number(number)
+                elif kind == 'floor' and floor_area is None:
+                    floor_area = self._area(number, kind, factor)
+
+        property_type = self.property_type_matcher.first(f"{title_lower} {str(get('type', '')).lower()}", "")
+        views = self.view_matcher.values(f"{title_lower} {str(get('description', '')).lower()}")
+        bathrooms = get('bathrooms')
+
+        specs = PropertySpecs(
+            property_type=property_type,
+            bedrooms=bedrooms,
+            bathrooms=Decimal(str(bathrooms)) if bathrooms else None,
+            floor_area_sqm=floor_area,
+            land_area_sqm=land_area,
+            view_types=list(dict.fromkeys(views)),
+        )
+
+        price_text = get('price', '')
+        price = self.price(price_text, get('currency')) if price_text else None
+        return specs, price
+
+
+class _UnitTable(dict):
+    """Unités telles qu'écrites → (sorte, facteur), normalisées au premier accès"""
+
+    def __init__(self, units: Dict[str, Tuple[str, Optional[Decimal]]]):
+        super().__init__({'': (None, None)})
+        self.units = units
+
+    def __missing__(self, unit: str) -> Tuple[str, Optional[Decimal]]:
+        key = ''.join(unit.replace('.', '').split())
+        if key.startswith('square'):
+            key = 'sq' + key[6:]
+        kind_factor = self[unit] = self.units[key]
+        return kind_factor
+
+
+# Partagé par les normaliseurs unitaires (parse_area, PriceNormalizer.normalize)
+FIELD_EXTRACTOR = ListingFieldExtractor()
 
 # ============================================================================
 # DÉDUPLICATEUR
@@ -371,6 +698,181 @@ class ListingDeduplicator:
         return min(score, Decimal('1'))
 
 
+@dataclass
+class DuplicateCluster:
+    """Groupe de listings désignant un même bien"""
+    listings: List[Listing]
+    confidence: Decimal  # Score du lien le plus faible du groupe
+
+
+class DedupIndex:
+    """
+    Index de blocage pour la déduplication multi-sources
+
+    Seules les paires partageant un bloc sont scorées:
+    - même project_name_normalized
+    - même zone + même bedrooms + surface dans des tranches de 5 m² voisines
+
+    Les scores valent 0, 0.2, ..., 1: au-dessus de 0.4, deux listings ont
+    soit le même projet, soit même zone + chambres + surface (±5 m²).
+    Le blocage ne perd donc aucune paire pour un seuil > 0.4.
+
+    batch_scorer (similarity_batch.BatchSimilarityScorer) score d'un coup
+    les blocs d'au moins batch_min_block listings.
+    """
+
+    AREA_BUCKET_SQM = Decimal('5')
+
+    def __init__(
+        self,
+        deduplicator: Optional[ListingDeduplicator] = None,
+        threshold: Decimal = Decimal('0.8'),
+        batch_scorer=None,
+        batch_min_block: int = 256,
+    ):
+        if threshold <= Decimal('0.4'):
+            raise ValueError("Le blocage n'est exact que pour un seuil > 0.4")
+
+        self.deduplicator = deduplicator or ListingDeduplicator()
+        self.threshold = threshold
+        self.batch_scorer = batch_scorer
+        self.batch_min_block = batch_min_block
+        self.listings: List[Listing] = []
+        self._blocks: Dict[tuple, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def _area_bucket(self, listing: Listing) -> Optional[int]:
+        area = listing.specs.floor_area_sqm
+        if not area or not listing.location.zone:
+            return None
+        return int(area // self.AREA_BUCKET_SQM)
+
+    def _block_keys(self, listing: Listing) -> List[tuple]:
+        """Blocs auxquels appartient un listing"""
+        keys = []
+        if listing.project_name_normalized:
+            keys.append(('project', listing.project_name_normalized))
+
+        bucket = self._area_bucket(listing)
+        if bucket is not None:
+            keys.append(('specs', listing.location.zone, listing.specs.bedrooms, bucket))
+
+        return keys
+
+    def _probe_keys(self, listing: Listing) -> List[tuple]:
+        """Blocs à consulter pour trouver les candidats d'un listing"""
+        keys = []
+        if listing.project_name_normalized:
+            keys.append(('project', listing.project_name_normalized))
+
+        bucket = self._area_bucket(listing)
+        if bucket is not None:
+            zone, bedrooms = listing.location.zone, listing.specs.bedrooms
+            keys.extend(('specs', zone, bedrooms, b) for b in (bucket - 1, bucket, bucket + 1))
+
+        return keys
+
+    def add(self, listing: Listing) -> int:
+        """Indexe un listing et retourne sa position"""
+        idx = len(self.listings)
+        self.listings.append(listing)
+        for key in self._block_keys(listing):
+            self._blocks[key].append(idx)
+        return idx
+
+    def add_many(self, listings: Iterable[Listing]):
+        for listing in listings:
+            self.add(listing)
+
+    def candidates(self, listing: Listing) -> List[int]:
+        """Positions des listings partageant au moins un bloc"""
+        found = set()
+        for key in self._probe_keys(listing):
+            found.update(self._blocks.get(key, ()))
+        return sorted(found)
+
+    def find_duplicates(self, listing: Listing) -> List[Tuple[Listing, Decimal]]:
+        """Doublons probables d'un listing (indexé ou non), meilleur score d'abord"""
+        matches = []
+        for idx in self.candidates(listing):
+            other = self.listings[idx]
+            if other is listing:
+                continue
+            score = self.deduplicator.compute_similarity_score(listing, other)
+            if score >= self.threshold:
+                matches.append((other, score))
+
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def _neighbour_block(self, key: tuple) -> List[int]:
+        """Tranche de surface suivante: surfaces à moins de 5 m² de part et d'autre"""
+        if key[0] != 'specs':
+            return []
+        return self._blocks.get(key[:3] + (key[3] + 1,), [])
+
+    def _scored_pairs(self) -> Iterator[Tuple[int, int, Decimal]]:
+        """
+        Paires (i < j) partageant un bloc et atteignant le seuil, avec leur score
+
+        Une paire présente dans plusieurs petits blocs n'est scorée qu'une fois;
+        les grands blocs passent par le scoreur vectorisé.
+        """
+        seen = set()
+        for key, members in self._blocks.items():
+            neighbours = self._neighbour_block(key)
+
+            if self.batch_scorer is not None and len(members) + len(neighbours) >= self.batch_min_block:
+                block = members + neighbours
+                block_listings = [self.listings[idx] for idx in block]
+                for a, b, score in self.batch_scorer.score_pairs(block_listings, self.threshold):
+                    i, j = block[a], block[b]
+                    yield (i, j, score) if i < j else (j, i, score)
+                continue
+
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:] + neighbours:
+                    pair = (i, j) if i < j else (j, i)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+
+                    score = self.deduplicator.compute_similarity_score(self.listings[i], self.listings[j])
+                    if score >= self.threshold:
+                        yield pair[0], pair[1], score
+
+    def clusters(self) -> List[DuplicateCluster]:
+        """Regroupe les listings indexés en clusters de doublons (min. 2 listings)"""
+        parent = list(range(len(self.listings)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        weakest: Dict[int, Decimal] = {}
+        for i, j, score in self._scored_pairs():
+            root_i, root_j = find(i), find(j)
+            if root_i == root_j:
+                continue
+
+            parent[root_j] = root_i
+            weakest[root_i] = min([score] + [weakest.pop(r) for r in (root_i, root_j) if r in weakest])
+
+        members: Dict[int, List[Listing]] = defaultdict(list)
+        for idx, listing in enumerate(self.listings):
+            members[find(idx)].append(listing)
+
+        return [
+            DuplicateCluster(listings=group, confidence=weakest[root])
+            for root, group in members.items()
+            if len(group) > 1
+        ]
+
+
 # ============================================================================
 # PIPELINE PRINCIPAL
 # ============================================================================
@@ -378,12 +880,51 @@ class ListingDeduplicator:
 class RealEstatePipeline:
     """Pipeline complet de normalisation immobilière"""
 
-    def __init__(self):
+    PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+    WHITESPACE_PATTERN = re.compile(r'\s+')
+
+    def __init__(
+        self,
+        project_index=None,
+        project_match_threshold: float = 0.5,
+        geocoder=None,
+        memo=None,
+        metrics=None,
+        log_sample_every: int = 1000,
+    ):
         self.address_normalizer = ThaiAddressNormalizer()
         self.specs_normalizer = PropertySpecsNormalizer()
         self.price_normalizer = PriceNormalizer()
         self.deduplicator = ListingDeduplicator()
 
+        # Matching flou des projets (project_name_index.ProjectNameIndex)
+        self.project_index = project_index
+        self.project_match_threshold = project_match_threshold
+
+        # Géocodage hors ligne (geocoder.Geocoder)
+        self.geocoder = geocoder
+
+        # Normalisations des chaînes répétées d'un listing à l'autre
+        # (adresse, nom de projet, surface, prix), mémoïsées si memo est fourni
+        # (memo_cache.MemoCache). Location est mutable (géocodage): copiée.
+        self.memo = memo
+        self._normalize_address = self.address_normalizer.normalize
+        self._normalize_project = self._normalize_text
+        if memo is not None:
+            self._normalize_address = memo.wrap('address', self._normalize_address, copy=Location.copy)
+            self._normalize_project = memo.wrap('project', self._normalize_project)
+
+        # Specs et prix extraits ensemble
+        self.field_extractor = ListingFieldExtractor(memo=memo)
+
+        # Chronomètres par étape et compteurs de rejets
+        # (pipeline_metrics.PipelineMetrics); None = aucune instrumentation
+        self.metrics = metrics
+
+        # process_raw_listing ne journalise qu'un listing normalisé sur N
+        self.log_sample_every = log_sample_every
+        self._normalized_count = 0
+
     def process_raw_listing(self, raw_data: Dict[str, Any], source: str) -> Optional[Listing]:
         """
         Traite un listing brut et retourne un listing normalisé
@@ -391,74 +932,295 @@ class RealEstatePipeline:
         Input: données brutes depuis scraping
         Output: Listing normalisé avec hash canonique
         """
+        metrics = self.metrics
         try:
-            # Extraction données de base
-            external_id = raw_data.get('id', '') or raw_data.get('listing_id', '')
-            external_url = raw_data.get('url', '')
-            title = raw_data.get('title', '')
-
-            if not external_id or not title:
-                logger.warning(f"Listing incomplet: {raw_data}")
-                return None
-
-            # Normalisation projet
-            project_name = raw_data.get('project_name', '') or raw_data.get('building', '')
-            project_name_normalized = self._normalize_text(project_name)
-
-            # Normalisation localisation
-            address = raw_data.get('address', '') or raw_data.get('location', '')
-            location = self.address_normalizer.normalize(address)
-
-            # Normalisation specs
-            specs = PropertySpecs(
-                property_type=self.specs_normalizer.normalize_property_type(title + ' ' + raw_data.get('type', '')),
-                bedrooms=self.specs_normalizer.normalize_bedrooms(title + ' ' + raw_data.get('bedrooms', '')),
-                bathrooms=Decimal(str(raw_data.get('bathrooms', 0))) if raw_data.get('bathrooms') else None,
-                floor_area_sqm=self.specs_normalizer.normalize_area(raw_data.get('size', '')),
-                view_types=self.specs_normalizer.extract_views(title + ' ' + raw_data.get('description', '')),
-            )
+            listing = self._build_listing(raw_data, source)
+        except ListingRejected as e:
+            if metrics is not None:
+                metrics.record(e.reason)
+            logger.warning(e.detail)
+            return None
+        except Exception as e:
+            if metrics is not None:
+                metrics.record(f"Exception {type(e).__name__}")
+            logger.error(f"Erreur traitement listing: {e}")
+            return None
 
-            # Normalisation prix
-            price_str = raw_data.get('price', '')
-            price = self.price_normalizer.normalize(price_str)
-
-            if not price:
-                logger.warning(f"Prix invalide pour {external_id}")
-                return None
-
-            # Calcul prix au m²
-            if specs.floor_area_sqm and specs.floor_area_sqm > 0:
-                price.price_per_sqm = price.price_thb / specs.floor_area_sqm
-
-            # Création listing
-            listing = Listing(
-                source=source,
-                external_id=str(external_id),
-                external_url=external_url,
-                title=title,
-                description=raw_data.get('description', ''),
-                project_name=project_name,
-                project_name_normalized=project_name_normalized,
-                developer_name=raw_data.get('developer', ''),
-                location=location,
-                specs=specs,
-                price=price,
-                images=raw_data.get('images', []),
-                agent_name=raw_data.get('agent_name', ''),
-                agent_phone=raw_data.get('agent_phone', ''),
-                agency_name=raw_data.get('agency', ''),
-                raw_data=raw_data,
+        if metrics is not None:
+            metrics.record()
+
+        # Journal échantillonné: un listing sur log_sample_every (tous en DEBUG)
+        count = self._normalized_count
+        self._normalized_count = count + 1
+        if (self.log_sample_every and count % self.log_sample_every == 0) or logger.isEnabledFor(logging.DEBUG):
+            logger.info(
+                f"Listing normalisé #{count + 1}: {listing.title[:50]}... | Hash: {listing.canonical_hash[:8]}"
             )
+        return listing
+
+    def process_stream(
+        self,
+        records: Union[str, os.PathLike, Iterable[Any]],
+        source: str,
+        as_dict: bool = False,
+        on_reject: Optional[Callable[[RejectedRecord], None]] = None,
+        stats: Optional[PipelineStats] = None,
+    ) -> Iterator[Union[Listing, Dict[str, Any]]]:
+        """
+        Normalise un flux de listings bruts (générateur)
+
+        Input: itérable de dicts, fichier texte ouvert ou chemin d'un fichier NDJSON
+        Output: Listing normalisés (ou dicts Supabase si as_dict=True), un par un
+
+        Les enregistrements sont lus et traités un à un: la mémoire reste
+        constante quelle que soit la taille du dump. Une erreur n'affecte
+        que l'enregistrement concerné, qui part vers on_reject.
+        """
+        stats = stats if stats is not None else PipelineStats()
+
+        for line_number, item, is_text in self._iter_items(records):
+            output, rejected = self._process_item(line_number, item, is_text, source, as_dict)
+            stats.processed += 1
+
+            if rejected is not None:
+                stats.record_rejection(rejected.reason)
+                if on_reject:
+                    on_reject(rejected)
+                continue
 
-            # Hash canonique
-            listing.canonical_hash = self.deduplicator.compute_canonical_hash(listing)
+            stats.accepted += 1
+            yield output
 
-            logger.info(f"Listing normalisé: {title[:50]}... | Hash: {listing.canonical_hash[:8]}")
-            return listing
+        logger.info(
+            f"Flux {source} terminé: {stats.accepted} normalisés, "
+            f"{stats.rejected} rejetés sur {stats.processed}"
+        )
+
+    def process_many(
+        self,
+        records: Union[str, os.PathLike, Iterable[Any]],
+        source: str,
+        workers: Optional[int] = None,
+        chunksize: int = 1000,
+        ordered: bool = True,
+        as_dict: bool = False,
+        on_reject: Optional[Callable[[RejectedRecord], None]] = None,
+        stats: Optional[PipelineStats] = None,
+        worker_stats: Optional[Dict[int, PipelineStats]] = None,
+    ) -> Iterator[Union[Listing, Dict[str, Any]]]:
+        """
+        Normalise un flux sur un pool de processus (générateur)
+
+        Mêmes entrées/sorties que process_stream. Le flux est découpé en blocs
+        de `chunksize` enregistrements répartis sur `workers` processus, chacun
+        avec sa propre copie du pipeline (créée une fois au démarrage du worker).
+        Les lignes NDJSON sont décodées dans les workers.
+
+        ordered=True conserve l'ordre d'entrée; sinon les blocs sont rendus dès
+        qu'ils sont prêts. worker_stats reçoit les compteurs par PID de worker.
+        """
+        workers = workers or os.cpu_count() or 1
+        stats = stats if stats is not None else PipelineStats()
+
+        if workers <= 1:
+            yield from self.process_stream(records, source, as_dict=as_dict, on_reject=on_reject, stats=stats)
+            return
+
+        items = self._iter_items(records)
+        # Borne la mémoire: au plus 2 blocs par worker en vol ou terminés en
+        # attente d'un bloc plus ancien (ordered)
+        max_pending = workers * 2
+        pending = {}
+        done_chunks = {}
+        next_index = 0
+        submitted = 0
+
+        def collect(future):
+            chunk_index, pid, outputs, rejects, chunk_stats, chunk_metrics = future.result()
+            if chunk_metrics is not None and self.metrics is not None:
+                self.metrics.merge(chunk_metrics)
+            stats.processed += chunk_stats.processed
+            stats.accepted += chunk_stats.accepted
+            for rejected in rejects:
+                stats.record_rejection(rejected.reason)
+                if on_reject:
+                    on_reject(rejected)
+            if worker_stats is not None:
+                merged = worker_stats.setdefault(pid, PipelineStats())
+                merged.processed += chunk_stats.processed
+                merged.accepted += chunk_stats.accepted
+                for reason, count in chunk_stats.rejections.items():
+                    merged.rejected += count
+                    merged.rejections[reason] = merged.rejections.get(reason, 0) + count
+            return chunk_index, outputs
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+            exhausted = False
+            while True:
+                # Remplir le pool
+                while not exhausted and len(pending) + len(done_chunks) < max_pending:
+                    chunk = list(islice(items, chunksize))
+                    if not chunk:
+                        exhausted = True
+                        break
+                    future = executor.submit(_process_chunk, submitted, chunk, source, as_dict)
+                    pending[future] = submitted
+                    submitted += 1
+
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del pending[future]
+                    chunk_index, outputs = collect(future)
+                    if ordered:
+                        done_chunks[chunk_index] = outputs
+                    else:
+                        yield from outputs
+
+                # Rendre les blocs contigus dans l'ordre d'entrée
+                while next_index in done_chunks:
+                    yield from done_chunks.pop(next_index)
+                    next_index += 1
+
+        logger.info(
+            f"Flux {source} terminé ({workers} workers): {stats.accepted} normalisés, "
+            f"{stats.rejected} rejetés sur {stats.processed}"
+        )
+
+    def _iter_items(self, records) -> Iterator[Tuple[int, Any, bool]]:
+        """Énumère (n° ligne, élément brut, est_texte) depuis un itérable ou un NDJSON"""
+        if isinstance(records, (str, os.PathLike)):
+            with open(records, encoding='utf-8') as fp:
+                yield from self._iter_items(fp)
+            return
+
+        # Fichier ouvert: une ligne JSON par enregistrement
+        is_text_stream = hasattr(records, 'read')
+
+        for line_number, item in enumerate(records, start=1):
+            is_text = is_text_stream or isinstance(item, (str, bytes))
+            if is_text and not item.strip():
+                continue
+            yield line_number, item, is_text
+
+    def _process_item(
+        self, line_number: int, item: Any, is_text: bool, source: str, as_dict: bool
+    ) -> Tuple[Any, Optional[RejectedRecord]]:
+        """Décode et normalise un élément; retourne (sortie, rejet éventuel)"""
+        if is_text:
+            item = item.strip()
+            try:
+                item = json.loads(item)
+            except ValueError as e:
+                return None, self._reject(RejectedRecord(line_number, "JSON invalide", item, str(e)))
+
+        if not isinstance(item, dict):
+            return None, self._reject(RejectedRecord(line_number, "Format invalide", item, type(item).__name__))
 
+        try:
+            listing = self._build_listing(item, source)
+        except ListingRejected as e:
+            return None, self._reject(RejectedRecord(line_number, e.reason, item, e.detail))
         except Exception as e:
-            logger.error(f"Erreur traitement listing: {e}")
-            return None
+            return None, self._reject(RejectedRecord(line_number, f"Exception {type(e).__name__}", item, str(e)))
+
+        metrics = self.metrics
+        if metrics is None:
+            return (self.to_supabase_dict(listing) if as_dict else listing), None
+
+        metrics.record()
+        if not as_dict:
+            return listing, None
+        start = metrics.clock()
+        output = self.to_supabase_dict(listing)
+        metrics.lap('serialize', start)
+        return output, None
+
+    def _reject(self, rejected: RejectedRecord) -> RejectedRecord:
+        if self.metrics is not None:
+            self.metrics.record(rejected.reason)
+        return rejected
+
+    def _build_listing(self, raw_data: Dict[str, Any], source: str) -> Listing:
+        """Construit le Listing normalisé ou lève ListingRejected"""
+        # Extraction données de base
+        external_id = raw_data.get('id', '') or raw_data.get('listing_id', '')
+        external_url = raw_data.get('url', '')
+        title = raw_data.get('title', '')
+
+        if not external_id or not title:
+            raise ListingRejected("Listing incomplet", f"Listing incomplet: {raw_data}")
+
+        metrics = self.metrics
+        if metrics is not None:
+            lap = metrics.clock()
+
+        # Normalisation projet
+        project_name = raw_data.get('project_name', '') or raw_data.get('building', '')
+        project_name_normalized = self._normalize_project(project_name)
+        match_confidence = Decimal("0")
+
+        # Rattachement au projet connu le plus proche
+        if self.project_index is not None and project_name_normalized:
+            match = self.project_index.best_match(project_name_normalized, self.project_match_threshold)
+            if match:
+                project_name_normalized = match.name_normalized or self._normalize_text(match.name)
+                match_confidence = Decimal(str(round(match.score, 4)))
+
+        if metrics is not None:
+            lap = metrics.lap('project', lap)
+
+        # Normalisation localisation
+        address = raw_data.get('address', '') or raw_data.get('location', '')
+        location = self._normalize_address(address)
+        if metrics is not None:
+            lap = metrics.lap('address', lap)
+        if self.geocoder is not None:
+            self.geocoder.apply(location, project_name_normalized)
+            if metrics is not None:
+                lap = metrics.lap('geocode', lap)
+
+        # Specs et prix (un balayage)
+        specs, price = self.field_extractor.extract(raw_data, title)
+        if metrics is not None:
+            lap = metrics.lap('specs', lap)
+
+        if not price:
+            raise ListingRejected("Prix invalide", f"Prix invalide pour {external_id}")
+
+        # Calcul prix au m²
+        if specs.floor_area_sqm and specs.floor_area_sqm > 0:
+            price.price_per_sqm = price.price_thb / specs.floor_area_sqm
+
+        # Création listing
+        listing = Listing(
+            source=source,
+            external_id=str(external_id),
+            external_url=external_url,
+            title=title,
+            description=raw_data.get('description', ''),
+            project_name=project_name,
+            project_name_normalized=project_name_normalized,
+            developer_name=raw_data.get('developer', ''),
+            location=location,
+            specs=specs,
+            price=price,
+            images=raw_data.get('images', []),
+            agent_name=raw_data.get('agent_name', ''),
+            agent_phone=raw_data.get('agent_phone', ''),
+            agency_name=raw_data.get('agency', ''),
+            match_confidence=match_confidence,
+            raw_data=raw_data,
+        )
+
+        # Hash canonique
+        listing.canonical_hash = self.deduplicator.compute_canonical_hash(listing)
+        if metrics is not None:
+            metrics.lap('hash', lap)
+
+        return listing
 
     def _normalize_text(self, text: str) -> str:
         """Normalise un texte pour matching"""
@@ -469,10 +1231,10 @@ class RealEstatePipeline:
         text = text.lower()
 
         # Suppression ponctuation
-        text = re.sub(r'[^\w\s]', ' ', text)
+        text = self.PUNCTUATION_PATTERN.sub(' ', text)
 
         # Espaces multiples
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = self.WHITESPACE_PATTERN.sub(' ', text).strip()
 
         return text
 
@@ -493,6 +1255,7 @@ class RealEstatePipeline:
                 'bedrooms': str(listing.specs.bedrooms) if listing.specs.bedrooms else None,
                 'bathrooms': str(listing.specs.bathrooms) if listing.specs.bathrooms else None,
                 'floor_area_sqm': str(listing.specs.floor_area_sqm) if listing.specs.floor_area_sqm else None,
+                'land_area_sqm': str(listing.specs.land_area_sqm) if listing.specs.land_area_sqm else None,
                 'property_type': listing.specs.property_type,
                 'view_types': listing.specs.view_types,
             },
@@ -501,6 +1264,7 @@ class RealEstatePipeline:
             'agent_phone': listing.agent_phone,
             'agency_name': listing.agency_name,
             'canonical_hash': listing.canonical_hash,
+            'match_confidence': float(listing.match_confidence),
 
             # Projects/Residences (pour création si n'existe pas)
             'project_name': listing.project_name,
@@ -512,14 +1276,80 @@ class RealEstatePipeline:
             'province': listing.location.province,
             'district': listing.location.district,
             'zone': listing.location.zone,
+            'latitude': listing.location.latitude,
+            'longitude': listing.location.longitude,
+            'geo_point': listing.location.geo_point,
+            'geo_precision': listing.location.geo_precision,
+            'zone_id': listing.location.zone_id,
+            'microzone_id': listing.location.microzone_id,
         }
 
 
+# ============================================================================
+# WORKERS MULTI-PROCESSUS
+# ============================================================================
+
+# Pipeline propre à chaque processus worker (voir process_many)
+_worker_pipeline: Optional[RealEstatePipeline] = None
+
+
+def _init_worker(pipeline: RealEstatePipeline):
+    """Initialise le pipeline du worker (une seule fois par processus)"""
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+    if pipeline.metrics is not None:
+        pipeline.metrics.drain()  # Copie des compteurs du parent: déjà comptés
+
+
+def _process_chunk(chunk_index: int, chunk: List[Tuple[int, Any, bool]], source: str, as_dict: bool):
+    """Traite un bloc d'éléments dans un worker"""
+    stats = PipelineStats()
+    outputs = []
+    rejects = []
+
+    for line_number, item, is_text in chunk:
+        output, rejected = _worker_pipeline._process_item(line_number, item, is_text, source, as_dict)
+        stats.processed += 1
+        if rejected is not None:
+            stats.record_rejection(rejected.reason)
+            rejects.append(rejected)
+        else:
+            stats.accepted += 1
+            outputs.append(output)
+
+    metrics = _worker_pipeline.metrics.drain() if _worker_pipeline.metrics is not None else None
+    return chunk_index, os.getpid(), outputs, rejects, stats, metrics
+
+
 # ============================================================================
 # TEST
 # ============================================================================
 
 if __name__ == '__main__':
+    import sys
+
+    # Mode flux: real_estate_normalizer.py dump.ndjson <source> [rejets.ndjson]
+    if len(sys.argv) >= 3:
+        pipeline = RealEstatePipeline()
+        stats = PipelineStats()
+        rejects_fp = open(sys.argv[3], 'w', encoding='utf-8') if len(sys.argv) > 3 else None
+
+        try:
+            for row in pipeline.process_stream(
+                sys.argv[1],
+                sys.argv[2],
+                as_dict=True,
+                on_reject=(lambda r: rejects_fp.write(r.to_json() + '\n')) if rejects_fp else None,
+                stats=stats,
+            ):
+                sys.stdout.write(json.dumps(row, ensure_ascii=False) + '\n')
+        finally:
+            if rejects_fp:
+                rejects_fp.close()
+
+        print(json.dumps(asdict(stats), ensure_ascii=False), file=sys.stderr)
+        sys.exit(0)
+
     # Exemple de test
     pipeline = RealEstatePipeline()
 
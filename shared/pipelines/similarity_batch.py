@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Scoring de similarité vectorisé - Palantir Thaïlande
+====================================================
+
+Version NumPy de ListingDeduplicator.compute_similarity_score pour un bloc
+entier de listings (ex: tous les listings d'une grande tour de Sukhumvit).
+
+Les listings sont convertis en colonnes entières:
+- projet / zone: identifiants internés (-1 = vide)
+- bedrooms / surface: valeurs décimales mises à l'échelle en entiers
+  (échelle du bloc: assez de décimales pour toutes ses valeurs)
+
+Le score est calculé en "points" entiers (projet = 2, zone = 1, chambres = 1,
+surface = 1; 1 point = 0.2), ce qui reproduit exactement le score Decimal
+du calcul paire par paire.
+
+Auteur: Léon 🏝️
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Score Decimal correspondant à chaque total de points (0 à 5)
+POINT_SCORES = [Decimal('0'), Decimal('0.2'), Decimal('0.4'), Decimal('0.6'), Decimal('0.8'), Decimal('1.0')]
+
+# Mise à l'échelle des décimales (DECIMAL(10,2) dans le schéma), relevée
+# pour un bloc aux valeurs plus fines ("45.125 sqm") jusqu'à MAX_SCALE,
+# au-delà de laquelle les valeurs sont arrondies
+DECIMAL_SCALE = 100
+MAX_SCALE = 10 ** 6
+
+# Tolérance surface du score scalaire: ±5 m² (strict)
+AREA_TOLERANCE_SQM = Decimal('5')
+
+
+class StringInterner:
+    """Attribue un identifiant entier stable à chaque chaîne"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        if not value:
+            return -1
+        return self.ids.setdefault(value, len(self.ids))
+
+
+def _scaled_column(values: Sequence[Any], scale: int) -> Tuple[np.ndarray, bool]:
+    """Valeurs mises à l'échelle (vides = 0, arrondi au plus proche) et exactitude"""
+    column = []
+    exact = True
+    for value in values:
+        if not value:
+            column.append(0)
+            continue
+        scaled = value * scale
+        integral = int(scaled)
+        if integral != scaled:
+            exact = False
+            integral = round(scaled)
+        column.append(integral)
+    return np.array(column, np.int64), exact
+
+
+class ListingColumns:
+    """Colonnes entières d'un bloc de listings"""
+
+    def __init__(
+        self,
+        listings: Sequence[Any],
+        projects: Optional[StringInterner] = None,
+        zones: Optional[StringInterner] = None,
+        scale: int = DECIMAL_SCALE,
+    ):
+        projects = projects or StringInterner()
+        zones = zones or StringInterner()
+        n = len(listings)
+
+        self.project_ids = np.fromiter((projects(l.project_name_normalized) for l in listings), np.int32, n)
+        self.zone_ids = np.fromiter((zones(l.location.zone) for l in listings), np.int32, n)
+
+        bedrooms = [l.specs.bedrooms for l in listings]
+        self.bedrooms_known = np.fromiter((b is not None for b in bedrooms), bool, n)
+
+        # Surface nulle ou absente: jamais comparée (comme `if area1 and area2`)
+        areas = [l.specs.floor_area_sqm for l in listings]
+        self.area_known = np.fromiter((bool(a) for a in areas), bool, n)
+
+        # Échelle relevée (x10) tant qu'une valeur du bloc a plus de décimales
+        while True:
+            self.bedrooms, bedrooms_exact = _scaled_column(bedrooms, scale)
+            self.areas, areas_exact = _scaled_column(areas, scale)
+            if (bedrooms_exact and areas_exact) or scale >= MAX_SCALE:
+                break
+            scale *= 10
+        self.scale = scale
+
+    def __len__(self) -> int:
+        return len(self.project_ids)
+
+
+def similarity_points(cols: ListingColumns, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+    """Points de similarité (0-5) des lignes [start:stop] contre tout le bloc"""
+    rows = slice(start, stop)
+
+    project_i = cols.project_ids[rows, None]
+    same_project = (project_i == cols.project_ids[None, :]) & (project_i >= 0)
+
+    zone_i = cols.zone_ids[rows, None]
+    same_zone = (zone_i == cols.zone_ids[None, :]) & (zone_i >= 0)
+
+    # None == None compte comme identique dans le score scalaire
+    known_i = cols.bedrooms_known[rows, None]
+    known_j = cols.bedrooms_known[None, :]
+    same_bedrooms = (known_i & known_j & (cols.bedrooms[rows, None] == cols.bedrooms[None, :])) | (~known_i & ~known_j)
+
+    tolerance = int(AREA_TOLERANCE_SQM * cols.scale)
+    close_area = (
+        cols.area_known[rows, None]
+        & cols.area_known[None, :]
+        & (np.abs(cols.areas[rows, None] - cols.areas[None, :]) < tolerance)
+    )
+
+    points = same_project.astype(np.int8) * 2
+    points += same_zone
+    points += same_bedrooms
+    points += close_area
+    return points
+
+
+def similarity_matrix(cols: ListingColumns) -> np.ndarray:
+    """Matrice complète des scores (float, 0-1)"""
+    return similarity_points(cols) / 5.0
+
+
+def _min_points(threshold: Decimal) -> int:
+    """Plus petit total de points atteignant le seuil"""
+    for points, score in enumerate(POINT_SCORES):
+        if score >= threshold:
+            return points
+    return len(POINT_SCORES)
+
+
+def top_pairs(
+    cols: ListingColumns,
+    threshold: Decimal = Decimal('0.8'),
+    k: Optional[int] = None,
+    chunk_rows: int = 1024,
+) -> List[Tuple[int, int, Decimal]]:
+    """
+    Paires (i < j) dont le score atteint le seuil, meilleur score d'abord
+
+    Le calcul se fait par tranches de `chunk_rows` lignes pour borner la
+    mémoire (n x chunk_rows octets) sur les très grands blocs.
+    """
+    n = len(cols)
+    min_points = _min_points(threshold)
+    found_i, found_j, found_points = [], [], []
+
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        points = similarity_points(cols, start, stop)
+
+        # Triangle supérieur strict: j > i
+        upper = np.arange(n)[None, :] > np.arange(start, stop)[:, None]
+        rows, columns = np.nonzero((points >= min_points) & upper)
+
+        found_i.append(rows + start)
+        found_j.append(columns)
+        found_points.append(points[rows, columns])
+
+    if not found_i:
+        return []
+
+    pairs_i = np.concatenate(found_i)
+    pairs_j = np.concatenate(found_j)
+    pairs_points = np.concatenate(found_points)
+
+    # Tri stable: score décroissant, puis ordre (i, j)
+    order = np.argsort(-pairs_points, kind='stable')
+    if k is not None:
+        order = order[:k]
+
+    return [(int(pairs_i[o]), int(pairs_j[o]), POINT_SCORES[pairs_points[o]]) for o in order]
+
+
+class BatchSimilarityScorer:
+    """Scoreur de blocs pour DedupIndex (projets et zones internés partagés)"""
+
+    def __init__(self, chunk_rows: int = 1024):
+        self.projects = StringInterner()
+        self.zones = StringInterner()
+        self.chunk_rows = chunk_rows
+
+    def score_pairs(self, listings: Sequence[Any], threshold: Decimal) -> List[Tuple[int, int, Decimal]]:
+        """Paires (positions locales) d'un bloc au-dessus du seuil"""
+        cols = ListingColumns(listings, self.projects, self.zones)
+        return top_pairs(cols, threshold, chunk_rows=self.chunk_rows)
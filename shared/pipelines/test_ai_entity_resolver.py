@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests du pipeline hybride - Palantir Thaïlande
+==============================================
+
+normalize_many avec des agents factices (pas de modèle): chaque annonce
+doit ressortir une fois, quels que soient l'ordre de fin des appels LLM et
+la contre-pression.
+
+Usage:
+    cd shared/pipelines && python -m pytest -q test_ai_entity_resolver.py
+
+Auteur: Léon 🏝️
+"""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from ai_entity_resolver import HybridNormalizer, PropertyListing
+
+
+class _Result:
+    def __init__(self, output):
+        self.output = output
+
+
+def _llm_item(external_id: str) -> dict:
+    return {
+        'external_id': external_id,
+        'external_url': '',
+        'title': f'LLM listing {external_id}',
+        'project': {'name': 'The Base'},
+        'address': {'raw': 'Sukhumvit'},
+        'specs': {'bedrooms': 2, 'floor_area_sqm': 50},
+        'price': {'thb': 5000000, 'original': 5000000},
+    }
+
+
+class FakeAgent:
+    """Agent une annonce: délai aléatoire (les appels finissent dans le désordre)"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    async def run(self, prompt: str):
+        raw = json.loads(prompt.split('immobilière:')[1].split('Source:')[0])
+        await asyncio.sleep(self.rng.random() * 0.003)
+        return _Result(PropertyListing(source='test', **_llm_item(raw['id'])))
+
+
+class FakeBatchAgent(FakeAgent):
+    """Agent par lots: un résultat par annonce"""
+
+    async def run(self, prompt: str):
+        raws = json.loads(prompt.split('immobilières:')[1].split('Source:')[0])
+        await asyncio.sleep(self.rng.random() * 0.003)
+        return _Result([_llm_item(raw['id']) for raw in raws])
+
+
+def _records(rng: random.Random, count: int) -> list:
+    # "call us": prix introuvable par les règles → candidat LLM
+    return [
+        {
+            'id': f'X{i}',
+            'title': 'Nice flat at The Base',
+            'price': 'THB 5,000,000' if rng.random() < 0.5 else 'call us',
+            'size': '50 sqm',
+        }
+        for i in range(count)
+    ]
+
+
+async def _normalize_all(seed: int, **options) -> list:
+    rng = random.Random(seed)
+    normalizer = HybridNormalizer()
+    normalizer.agent = FakeAgent(rng)
+    normalizer.batch_agent = FakeBatchAgent(rng)
+    return [index async for index, _ in normalizer.normalize_many(_records(rng, 120), 'test', **options)]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_normalize_many_default_settings(seed, capsys):
+    assert sorted(asyncio.run(_normalize_all(seed))) == list(range(120))
+
+
+@pytest.mark.parametrize('ordered', [False, True])
+@pytest.mark.parametrize('llm_batch_size', [1, 5])
+@pytest.mark.parametrize('max_pending', [4, 64])
+def test_normalize_many_backpressure(max_pending, llm_batch_size, ordered, capsys):
+    for seed in range(5):
+        indexes = asyncio.run(_normalize_all(
+            seed,
+            llm_concurrency=2,
+            max_pending=max_pending,
+            llm_batch_size=llm_batch_size,
+            llm_batch_wait=0.001,
+            ordered=ordered,
+        ))
+        assert indexes == list(range(120)) if ordered else sorted(indexes) == list(range(120))
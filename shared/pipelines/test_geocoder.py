@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests du géocodeur hors ligne - Palantir Thaïlande
+==================================================
+
+Les alias thaïs du gazetteer doivent être trouvés dans une adresse thaïe
+(voyelles et tons conservés par le texte de recherche).
+
+Usage:
+    cd shared/pipelines && python -m pytest -q test_geocoder.py
+
+Auteur: Léon 🏝️
+"""
+
+import pytest
+
+from geocoder import Geocoder, _search_text
+from real_estate_normalizer import ThaiAddressNormalizer
+
+GEOCODER = Geocoder()
+ADDRESSES = ThaiAddressNormalizer()
+
+
+def _geocode(address: str):
+    return GEOCODER.geocode(ADDRESSES.normalize(address))
+
+
+def test_search_text_keeps_thai_marks():
+    assert _search_text('สุขุมวิท ภูเก็ต, กรุงเทพ') == ' สุขุมวิท ภูเก็ต กรุงเทพ '
+
+
+@pytest.mark.parametrize('address, matched', [
+    ('สีลม', 'Silom'),
+    ('ป่าตอง ภูเก็ต', 'Patong'),
+    ('คอนโด สุขุมวิท กรุงเทพ', 'Sukhumvit'),
+])
+def test_thai_zone_aliases(address, matched):
+    result = _geocode(address)
+    assert result is not None
+    assert (result.precision, result.matched) == ('zone', matched)
+
+
+@pytest.mark.parametrize('address, matched', [
+    ('ภูเก็ต', 'Phuket'),
+    ('กรุงเทพ', 'Bangkok'),
+])
+def test_thai_province_aliases(address, matched):
+    result = _geocode(address)
+    assert result is not None
+    assert (result.precision, result.matched) == ('province', matched)
+
+
+def test_latin_aliases_unchanged():
+    result = _geocode('Silom, Bangkok')
+    assert (result.precision, result.matched) == ('zone', 'Silom')
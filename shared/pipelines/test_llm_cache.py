@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests du cache des normalisations LLM - Palantir Thaïlande
+==========================================================
+
+Une annonce re-scrapée (scraped_at différent, clés dans un autre ordre)
+doit retrouver le résultat LLM de la veille.
+
+Usage:
+    cd shared/pipelines && python -m pytest -q test_llm_cache.py
+
+Auteur: Léon 🏝️
+"""
+
+from ai_entity_resolver import PropertyListing
+from llm_cache import LLMResultCache
+
+RAW = {'id': 'X1', 'title': 'Nice flat', 'price': 'call us', 'scraped_at': '2026-10-17T01:00:00'}
+
+LISTING = {
+    'source': 'fazwaz',
+    'external_id': 'X1',
+    'external_url': '',
+    'title': 'LLM listing X1',
+    'project': {'name': 'The Base'},
+    'address': {'raw': 'Sukhumvit'},
+    'specs': {'bedrooms': 2, 'floor_area_sqm': 50},
+    'price': {'thb': 5000000, 'original': 5000000},
+}
+
+
+def test_rescrape_hits_cache(tmp_path):
+    cache = LLMResultCache(str(tmp_path / 'llm.sqlite'))
+    cache.put(RAW, 'fazwaz', PropertyListing.model_validate(LISTING))
+
+    rescraped = {'scraped_at': '2026-10-18T01:00:00', 'fetched_at': 'now', **{k: v for k, v in RAW.items() if k != 'scraped_at'}}
+    listing = cache.get(rescraped, 'fazwaz')
+    assert listing is not None
+    assert listing.title == 'LLM listing X1'
+    assert listing.raw_data == rescraped
+
+
+def test_content_change_misses_cache(tmp_path):
+    cache = LLMResultCache(str(tmp_path / 'llm.sqlite'))
+    cache.put(RAW, 'fazwaz', PropertyListing.model_validate(LISTING))
+
+    assert cache.get({**RAW, 'price': 'THB 5,000,000'}, 'fazwaz') is None
+    assert cache.get(RAW, 'ddproperty') is None
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests du cache de normalisation - Palantir Thaïlande
+====================================================
+
+Le cache disque doit survivre à un redémarrage: sauvegarde dans un
+processus, rechargement dans un autre.
+
+Usage:
+    cd shared/pipelines && python -m pytest -q test_memo_cache.py
+
+Auteur: Léon 🏝️
+"""
+
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SAVE = """
+import sys
+from memo_cache import normalization_memo
+memo = normalization_memo(sys.argv[1])
+for i in range(3):
+    memo.put('address', f'Sukhumvit Soi {i}', i)
+print(memo.save())
+"""
+
+LOAD = """
+import sys
+from memo_cache import normalization_memo
+print(len(normalization_memo(sys.argv[1])))
+"""
+
+
+def _run(script: str, path: str, seed: str) -> int:
+    # PYTHONHASHSEED distinct: l'empreinte ne doit pas dépendre du hash des chaînes
+    env = {**os.environ, 'PYTHONHASHSEED': seed}
+    result = subprocess.run(
+        [sys.executable, '-c', script, path], cwd=HERE, env=env, capture_output=True, text=True, check=True
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    path = str(tmp_path / 'memo.sqlite')
+    assert _run(SAVE, path, '1') == 3
+    assert _run(LOAD, path, '2') == 3
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Statistiques de zone incrémentales - Palantir Thaïlande
+=======================================================
+
+Remplace la lecture de `v_zone_stats` (jointure geo_zones → projects →
+residences → listings + GROUP BY à chaque requête, sans médiane) par un
+agrégat tenu à jour listing par listing:
+
+- par zone et par zone × chambres
+- volume, moyennes (prix, prix/m², jours en ligne), min/max prix/m²
+- quantiles approchés du prix/m² et du prix (sketch logarithmique à
+  erreur relative bornée, qui accepte les suppressions - contrairement
+  à un t-digest)
+
+Chaque listing actif est mémorisé (zone, chambres, valeurs): une mise à
+jour retire l'ancienne contribution avant d'ajouter la nouvelle. Les
+lectures sont servies depuis un cache par groupe invalidé à l'écriture.
+
+Usage:
+    stats = ZoneStatsAggregator.from_connection(conn)     # amorçage
+    stats.upsert(listing_id, zone_id, bedrooms=2, price_thb=4_500_000,
+                 price_per_sqm=120_000, days_on_market=12)
+    stats.remove(listing_id)                               # vendu/retiré
+    stats.get(zone_id).median_price_per_sqm
+    stats.get(zone_id, bedrooms=2).p75_price_per_sqm
+    stats.snapshot('zone_stats.json.gz')
+    stats = ZoneStatsAggregator.restore('zone_stats.json.gz')
+
+Auteur: Léon 🏝️
+"""
+
+import gzip
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Erreur relative des quantiles (1% → médiane à ±1%)
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+SNAPSHOT_VERSION = 1
+
+ZONE_STATS_SQL = """
+    SELECT
+        l.id, p.geo_zone_id,
+        COALESCE(r.bedrooms, NULLIF(l.raw_specs->>'bedrooms', '')::numeric),
+        l.price_thb, l.price_per_sqm, l.days_on_market
+    FROM listings l
+    JOIN residences r ON r.id = l.residence_id
+    JOIN projects p ON p.id = r.project_id
+    WHERE l.listing_status = 'active' AND p.geo_zone_id IS NOT NULL
+"""
+
+# Clé de groupe: (zone, None) pour la zone, (zone, chambres) pour la typologie
+GroupKey = Tuple[str, Optional[int]]
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return value if value == value else None
+
+
+def bedroom_bucket(bedrooms: Any) -> Optional[int]:
+    """Typologie: 0 = studio, 1, 2, 3... (None si inconnue)"""
+    bedrooms = _number(bedrooms)
+    return int(bedrooms) if bedrooms is not None and bedrooms >= 0 else None
+
+
+# ============================================================================
+# SKETCH DE QUANTILES
+# ============================================================================
+
+class QuantileSketch:
+    """
+    Histogramme à buckets logarithmiques (type DDSketch)
+
+    Le bucket k couvre ]gamma^(k-1), gamma^k]: toute valeur estimée est à
+    ±relative_accuracy de la vraie. Les buckets sont des compteurs, donc
+    remove() est exact et deux sketches de même précision fusionnent.
+    """
+
+    __slots__ = ('relative_accuracy', 'gamma', '_log_gamma', 'counts', 'zero_count', 'count', '_keys')
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: Dict[int, int] = {}
+        self.zero_count = 0   # Valeurs <= 0
+        self.count = 0
+        self._keys: Optional[List[int]] = None  # Clés triées (cache)
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, n: int = 1):
+        self.count += n
+        if value <= 0:
+            self.zero_count += n
+            return
+        key = self._key(value)
+        counts = self.counts
+        if key not in counts:
+            counts[key] = 0
+            self._keys = None
+        counts[key] += n
+
+    def remove(self, value: float, n: int = 1):
+        if value <= 0:
+            self.zero_count -= n
+            self.count -= n
+            return
+        key = self._key(value)
+        remaining = self.counts.get(key, 0) - n
+        if remaining < 0:
+            raise ValueError(f"Valeur absente du sketch: {value}")
+        self.count -= n
+        if remaining:
+            self.counts[key] = remaining
+        else:
+            del self.counts[key]
+            self._keys = None
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.gamma != self.gamma:
+            raise ValueError("Précisions de sketch différentes")
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self._keys = None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile approché (q entre 0 et 1), None si vide"""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        if self._keys is None:
+            self._keys = sorted(self.counts)
+        seen = self.zero_count
+        for key in self._keys:
+            seen += self.counts[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** self._keys[-1] / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'counts': {str(key): n for key, n in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.counts = {int(key): n for key, n in data['counts'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = sketch.zero_count + sum(sketch.counts.values())
+        return sketch
+
+
+# ============================================================================
+# AGRÉGATS
+# ============================================================================
+
+@dataclass(frozen=True)
+class ZoneStats:
+    """Statistiques lues d'un groupe (zone ou zone × chambres)"""
+    zone_id: str
+    bedrooms: Optional[int] = None
+    listing_count: int = 0
+    avg_price: Optional[float] = None
+    avg_price_per_sqm: Optional[float] = None
+    avg_dom: Optional[float] = None
+    min_price_per_sqm: Optional[float] = None
+    max_price_per_sqm: Optional[float] = None
+    p25_price_per_sqm: Optional[float] = None
+    median_price_per_sqm: Optional[float] = None
+    p75_price_per_sqm: Optional[float] = None
+    p90_price_per_sqm: Optional[float] = None
+    median_price: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _Group:
+    """Accumulateur d'un groupe (sommes, compteurs, sketches, membres)"""
+
+    __slots__ = ('members', 'price_sum', 'price_n', 'ppsqm_sum', 'ppsqm_n', 'dom_sum', 'dom_n',
+                 'ppsqm_sketch', 'price_sketch', 'min_ppsqm', 'max_ppsqm', 'extremes_stale')
+
+    def __init__(self, relative_accuracy: float):
+        self.members: Dict[str, Tuple] = {}
+        self.price_sum = self.ppsqm_sum = self.dom_sum = 0.0
+        self.price_n = self.ppsqm_n = self.dom_n = 0
+        self.ppsqm_sketch = QuantileSketch(relative_accuracy)
+        self.price_sketch = QuantileSketch(relative_accuracy)
+        self.min_ppsqm: Optional[float] = None
+        self.max_ppsqm: Optional[float] = None
+        self.extremes_stale = False
+
+    def add(self, listing_id: str, state: Tuple):
+        _, _, price, ppsqm, dom = state
+        self.members[listing_id] = state
+        if price is not None:
+            self.price_sum += price
+            self.price_n += 1
+            self.price_sketch.add(price)
+        if ppsqm is not None:
+            self.ppsqm_sum += ppsqm
+            self.ppsqm_n += 1
+            self.ppsqm_sketch.add(ppsqm)
+            if not self.extremes_stale:
+                if self.min_ppsqm is None or ppsqm < self.min_ppsqm:
+                    self.min_ppsqm = ppsqm
+                if self.max_ppsqm is None or ppsqm > self.max_ppsqm:
+                    self.max_ppsqm = ppsqm
+        if dom is not None:
+            self.dom_sum += dom
+            self.dom_n += 1
+
+    def remove(self, listing_id: str):
+        _, _, price, ppsqm, dom = self.members.pop(listing_id)
+        if price is not None:
+            self.price_sum -= price
+            self.price_n -= 1
+            self.price_sketch.remove(price)
+        if ppsqm is not None:
+            self.ppsqm_sum -= ppsqm
+            self.ppsqm_n -= 1
+            self.ppsqm_sketch.remove(ppsqm)
+            # Min/max exacts: recalculés à la lecture si l'extrême sort
+            if ppsqm == self.min_ppsqm or ppsqm == self.max_ppsqm:
+                self.extremes_stale = True
+        if dom is not None:
+            self.dom_sum -= dom
+            self.dom_n -= 1
+        # Repart de zéro quand un compteur se vide (pas de dérive flottante)
+        if not self.price_n:
+            self.price_sum = 0.0
+        if not self.ppsqm_n:
+            self.ppsqm_sum = 0.0
+        if not self.dom_n:
+            self.dom_sum = 0.0
+
+    def read(self, key: GroupKey) -> ZoneStats:
+        if self.extremes_stale:
+            values = [state[3] for state in self.members.values() if state[3] is not None]
+            self.min_ppsqm = min(values, default=None)
+            self.max_ppsqm = max(values, default=None)
+            self.extremes_stale = False
+
+        ppsqm = self.ppsqm_sketch
+        return ZoneStats(
+            zone_id=key[0],
+            bedrooms=key[1],
+            listing_count=len(self.members),
+            avg_price=self.price_sum / self.price_n if self.price_n else None,
+            avg_price_per_sqm=self.ppsqm_sum / self.ppsqm_n if self.ppsqm_n else None,
+            avg_dom=self.dom_sum / self.dom_n if self.dom_n else None,
+            min_price_per_sqm=self.min_ppsqm,
+            max_price_per_sqm=self.max_ppsqm,
+            p25_price_per_sqm=ppsqm.quantile(0.25),
+            median_price_per_sqm=ppsqm.quantile(0.5),
+            p75_price_per_sqm=ppsqm.quantile(0.75),
+            p90_price_per_sqm=ppsqm.quantile(0.9),
+            median_price=self.price_sketch.quantile(0.5),
+        )
+
+
+class ZoneStatsAggregator:
+    """Statistiques par zone et zone × chambres, tenues à jour par listing"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        # listing_id → (zone, chambres, prix, prix/m², jours en ligne)
+        self._listings: Dict[str, Tuple] = {}
+        self._groups: Dict[GroupKey, _Group] = {}
+        self._cache: Dict[GroupKey, ZoneStats] = {}
+        self.zone_names: Dict[str, str] = {}
+        self.version = 0  # Incrémenté à chaque modification
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def __contains__(self, listing_id) -> bool:
+        return str(listing_id) in self._listings
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def upsert(
+        self,
+        listing_id,
+        zone_id,
+        bedrooms: Any = None,
+        price_thb: Any = None,
+        price_per_sqm: Any = None,
+        days_on_market: Any = None,
+    ):
+        """Ajoute ou met à jour un listing actif (zone None = retiré des stats)"""
+        listing_id = str(listing_id)
+        if zone_id is None:
+            self.remove(listing_id)
+            return
+
+        state = (
+            str(zone_id), bedroom_bucket(bedrooms),
+            _number(price_thb), _number(price_per_sqm), _number(days_on_market),
+        )
+        previous = self._listings.get(listing_id)
+        if previous == state:
+            return
+        if previous is not None:
+            self._detach(listing_id, previous)
+
+        self._listings[listing_id] = state
+        for key in self._keys(state):
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(self.relative_accuracy)
+            group.add(listing_id, state)
+            self._cache.pop(key, None)
+        self.version += 1
+
+    def remove(self, listing_id) -> bool:
+        """Retire un listing (vendu, expiré, inactif); False s'il était inconnu"""
+        listing_id = str(listing_id)
+        state = self._listings.pop(listing_id, None)
+        if state is None:
+            return False
+        self._detach(listing_id, state)
+        self.version += 1
+        return True
+
+    def apply(self, rows: Iterable[Sequence[Any]]) -> int:
+        """Applique des tuples (id, zone, chambres, prix, prix/m², jours en ligne)"""
+        count = 0
+        for row in rows:
+            self.upsert(*row)
+            count += 1
+        return count
+
+    def _keys(self, state: Tuple) -> List[GroupKey]:
+        zone_id, bedrooms = state[0], state[1]
+        if bedrooms is None:
+            return [(zone_id, None)]
+        return [(zone_id, None), (zone_id, bedrooms)]
+
+    def _detach(self, listing_id: str, state: Tuple):
+        for key in self._keys(state):
+            group = self._groups[key]
+            group.remove(listing_id)
+            if not group.members:
+                del self._groups[key]
+            self._cache.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def get(self, zone_id, bedrooms: Any = None) -> ZoneStats:
+        """Stats d'une zone (ou d'une typologie de la zone); vide si inconnue"""
+        key = (str(zone_id), bedroom_bucket(bedrooms))
+        stats = self._cache.get(key)
+        if stats is None:
+            group = self._groups.get(key)
+            stats = group.read(key) if group is not None else ZoneStats(zone_id=key[0], bedrooms=key[1])
+            self._cache[key] = stats
+        return stats
+
+    def quantile(self, zone_id, q: float, bedrooms: Any = None) -> Optional[float]:
+        """Quantile quelconque du prix/m² d'un groupe"""
+        group = self._groups.get((str(zone_id), bedroom_bucket(bedrooms)))
+        return group.ppsqm_sketch.quantile(q) if group is not None else None
+
+    def zones(self) -> Dict[str, ZoneStats]:
+        """Stats de toutes les zones ayant au moins un listing"""
+        return {key[0]: self.get(*key) for key in self._groups if key[1] is None}
+
+    def typologies(self, zone_id) -> Dict[int, ZoneStats]:
+        """Stats par nombre de chambres d'une zone"""
+        zone_id = str(zone_id)
+        return {
+            key[1]: self.get(*key)
+            for key in sorted(k for k in self._groups if k[0] == zone_id and k[1] is not None)
+        }
+
+    # ------------------------------------------------------------------
+    # Amorçage et persistance
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_connection(cls, conn, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> 'ZoneStatsAggregator':
+        """Construit l'agrégat depuis les listings actifs (une requête)"""
+        stats = cls(relative_accuracy)
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, name_en FROM geo_zones")
+            stats.zone_names = {str(zone_id): name for zone_id, name in cur}
+            cur.execute(ZONE_STATS_SQL)
+            count = stats.apply(cur)
+        logger.info(f"Stats de zone: {count} listings, {len(stats.zones())} zones")
+        return stats
+
+    def snapshot(self, path: str):
+        """Sauvegarde l'état (listings + noms de zones) en JSON gzip"""
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'relative_accuracy': self.relative_accuracy,
+            'zone_names': self.zone_names,
+            'listings': [[listing_id, *state] for listing_id, state in self._listings.items()],
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as fp:
+            json.dump(data, fp, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def restore(cls, path: str) -> 'ZoneStatsAggregator':
+        """Recharge un snapshot (les agrégats sont reconstruits)"""
+        with gzip.open(path, 'rt', encoding='utf-8') as fp:
+            data = json.load(fp)
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Version de snapshot non supportée: {data.get('version')}")
+
+        stats = cls(data['relative_accuracy'])
+        stats.zone_names = data['zone_names']
+        stats.apply(data['listings'])
+        return stats
@@ -397,9 +397,23 @@ CREATE TRIGGER trigger_residences_updated
     BEFORE UPDATE ON residences
     FOR EACH ROW EXECUTE FUNCTION update_updated_at();
 
+-- Listings: updated_at = dernier changement de contenu ou de statut, quel
+-- que soit l'auteur de l'UPDATE. Un simple passage de scrape (last_seen_at
+-- seul) ne le modifie pas. Base existante: migrations/001_listings_updated_at.sql
+CREATE OR REPLACE FUNCTION update_listing_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF to_jsonb(NEW) - 'last_seen_at' - 'updated_at'
+        IS DISTINCT FROM to_jsonb(OLD) - 'last_seen_at' - 'updated_at' THEN
+        NEW.updated_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE TRIGGER trigger_listings_updated
     BEFORE UPDATE ON listings
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+    FOR EACH ROW EXECUTE FUNCTION update_listing_updated_at();
 
 -- ============================================================================
 -- 10. DONNÉES INITIALES